@@ -18,11 +18,27 @@ __license__ = """
 
 __version__ = '0.1.4'
 
-from .top_level import ColorSpaceConverter
+from .top_level import ColorSpaceConverter, convert
 from .gry_converter import GryConverter, rgb2gry, gry2ch3, gry_conv
-from .hsv_converter import HsvConverter, rgb2hsv, hsv2rgb, hsv_conv
-from .lab_converter import LabConverter, rgb2lab, lab2rgb, lab_conv
+from .hsv_converter import HsvConverter, rgb2hsv, hsv2rgb, hsv_conv, rgb2hsl, hsl2rgb, rgb2hsi, hsi2rgb
+from .lab_converter import LabConverter, rgb2lab, lab2rgb, lab_conv, delta_e, nearest_color
 from .lms_converter import LmsConverter, rgb2lms, lms2rgb, lms_conv
-from .xyz_converter import XyzConverter, rgb2xyz, xyz2rgb, xyz_conv
+from .xyz_converter import XyzConverter, rgb2xyz, xyz2rgb, xyz_conv, rgb2lin, lin2rgb, lin2xyz, xyz2lin
 from .yuv_converter import YuvConverter, rgb2yuv, yuv2rgb, yuv_conv
-from .converter_baseclass import ConverterBaseclass
+from .converter_baseclass import ConverterBaseclass, BufferLayout, as_array
+from .unique_colors import unique_conv, unique_colors, low_cardinality
+from .quantizer import ColorQuantizer, nearest_brute
+from .oklab_converter import rgb2oklab, oklab2rgb, lin2oklab, oklab2lin
+from .luv_converter import rgb2luv, luv2rgb, xyz2luv, luv2xyz
+from .lch_converter import rgb2lch, lch2rgb, rgb2oklch, oklch2rgb, lab2lch, lch2lab
+from .ictcp_converter import rgb2ictcp, ictcp2rgb, lin2ictcp, ictcp2lin
+from .jzazbz_converter import rgb2jzazbz, jzazbz2rgb, xyz2jzazbz, jzazbz2xyz
+from .roi_converter import RoiConverter
+from .multi_converter import convert_many
+from .color_model import ColorModel, adaptation_matrix
+from .gamut import map_gamut, quantize, clip_gamut, soft_clip, reduce_chroma
+from .transfer_functions import srgb_decode, srgb_encode, pq_decode, pq_encode, hlg_decode, hlg_encode, get_transfer
+from .registry import Converter, register, unregister, get_converter
+from .shm_executor import SharedMemoryExecutor
+from .matrix_registry import register_matrix, get_matrix, matrix_names
+from .color_stats import color_stats, ColorHistogram
@@ -21,22 +21,48 @@ __license__ = """
 """
 
 from color_space_converter import __version__
-from color_space_converter.top_level import ColorSpaceConverter, METHODS, FILE_EXTS, normalize_img
+from color_space_converter.top_level import ColorSpaceConverter, METHODS, FILE_EXTS, FLOAT_EXTS, encode_img, fixed_range
+from color_space_converter.xyz_converter import input_bounds
+from color_space_converter.bin.manifest import Manifest, walk_files, MANIFEST_NAME
+from color_space_converter.bin.pipeline import Stage, run_pipeline, format_stats
 
 import getopt
 import sys, os
+import threading
+import struct
+import zlib
 import imageio
+import numpy as np
+
+PALETTE_EXTS = ['png', 'gif', 'bmp', 'tiff']
+
+# formats supporting 16 bits per channel
+DEEP_EXTS = ['png', 'tiff']
 
 
 def usage():
 
-    print("Usage: color-space-converter <options>\n")
+    print("Usage: color-space-converter <options>")
+    print("       color-space-converter serve <options> (see color-space-converter serve -h)\n")
     print("Options:")
     print("-s <path>,     --src=<str>        Specify source image file or folder to process")
     print("-m <method>,   --method=<str>     Provide color transfer method. Available methods are:")
     print("                                  "+', '.join(['"'+m+'"' for m in METHODS]))
     print("-i <path>,     --inverse=<bool>   Specify conversion direction (forward=False or backwards=True)")
     print("-S <path>,     --standard=<str>   Specify standard with either 'HDTV' or 'SDTV' for headroom handling")
+    print("               --range=<str>      Input range as 'lower,upper', 'dtype' or 'auto' (image maximum)")
+    print("-p <policy>,   --policy=<str>     Output scaling with 'minmax' (default), 'percentile' or 'fixed'")
+    print("-d <depth>,    --depth=<int>      Output bits per channel with either 8 (default) or 16 for png and tiff")
+    print("-f <format>,   --format=<str>     Output file format, e.g. 'png', 'tiff' or 'npy' and 'exr' for floats")
+    print("-o <path>,     --dst=<str>        Output folder mirroring the source folder (defaults to the source folder)")
+    print("-r ,           --recursive        Descend into subfolders of the source folder")
+    print("               --include=<str>    Comma-separated glob patterns of files to convert (defaults to images)")
+    print("               --exclude=<str>    Comma-separated glob patterns of files and folders to skip")
+    print("               --manifest=<str>   Manifest file of converted files (defaults to the output folder)")
+    print("               --force            Convert all files regardless of the manifest")
+    print("               --workers=<str>    Threads of read, convert and write stages as 'r,c,w' (default '2,1,2')")
+    print("               --queue=<str>      Images buffered before read, convert and write stages as 'r,c,w' or for")
+    print("                                  all stages as single number (default 4)")
     print("-w ,           --win              Select files from window")
     print("-h,            --help             Print this help message")
     print("")
@@ -45,7 +71,10 @@ def usage():
 def parse_options(argv):
 
     try:
-        opts, args = getopt.getopt(argv, "hs:m:iS:w", ["help", "src=", "method=", "inverse", "standard=", "win"])
+        opts, args = getopt.getopt(argv, "hs:m:iS:wp:d:f:o:r", ["help", "src=", "method=", "inverse", "standard=",
+                                                                "range=", "win", "policy=", "depth=", "format=",
+                                                                "dst=", "recursive", "include=", "exclude=",
+                                                                "manifest=", "force", "workers=", "queue="])
     except getopt.GetoptError as e:
         print(e)
         sys.exit(2)
@@ -57,7 +86,19 @@ def parse_options(argv):
     cfg['method'] = None
     cfg['inverse'] = False
     cfg['standard'] = 'HDTV'
+    cfg['range'] = 'auto'
     cfg['win'] = None
+    cfg['policy'] = 'minmax'
+    cfg['depth'] = 8
+    cfg['format'] = None
+    cfg['dst_path'] = None
+    cfg['recursive'] = False
+    cfg['include'] = tuple('*.' + ext for ext in FILE_EXTS)
+    cfg['exclude'] = ()
+    cfg['manifest'] = None
+    cfg['force'] = False
+    cfg['workers'] = (2, 1, 2)
+    cfg['queue'] = (4,)
 
     if opts:
         for (opt, arg) in opts:
@@ -72,8 +113,31 @@ def parse_options(argv):
                 cfg['inverse'] = True
             if opt in ("-S", "--standard"):
                 cfg['standard'] = arg.strip(" \"\'")
+            if opt == "--range":
+                arg = arg.strip(" \"\'")
+                cfg['range'] = arg if arg in ('auto', 'dtype') else tuple(float(v) for v in arg.split(','))
             if opt in ("-w", "--win"):
                 cfg['win'] = True
+            if opt in ("-p", "--policy"):
+                cfg['policy'] = arg.strip(" \"\'")
+            if opt in ("-d", "--depth"):
+                cfg['depth'] = int(arg)
+            if opt in ("-f", "--format"):
+                cfg['format'] = arg.strip(" .\"\'").lower()
+            if opt in ("-o", "--dst"):
+                cfg['dst_path'] = arg.strip(" \"\'")
+            if opt in ("-r", "--recursive"):
+                cfg['recursive'] = True
+            if opt in ("--include", "--exclude"):
+                cfg[opt[2:]] = tuple(p.strip() for p in arg.strip(" \"\'").split(',') if p.strip())
+            if opt == "--manifest":
+                cfg['manifest'] = arg.strip(" \"\'")
+            if opt == "--force":
+                cfg['force'] = True
+            if opt == "--workers":
+                cfg['workers'] = tuple(int(v) for v in arg.strip(" \"\'").split(','))[:3]
+            if opt == "--queue":
+                cfg['queue'] = tuple(int(v) for v in arg.strip(" \"\'").split(','))[:3]
 
     # create dictionary containing all parameters for the light field
     return cfg
@@ -106,11 +170,122 @@ def select_file(init_dir=None, title=''):
     return file_path if file_path else None
 
 
+def read_indexed(uri):
+    ''' read paletted image as index array and palette or return None if image is not paletted '''
+
+    # pillow serves as imageio's backend for indexed formats
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    if not uri.lower().endswith(tuple(PALETTE_EXTS)):
+        return None
+
+    with Image.open(uri) as img:
+        if img.mode != 'P' or getattr(img, 'n_frames', 1) > 1:
+            return None
+        idx = np.asarray(img)
+        pal = np.asarray(img.getpalette('RGB'), dtype='uint8').reshape(-1, 3)
+        info = {key: img.info[key] for key in ('transparency',) if key in img.info}
+
+    return idx, pal, info
+
+
+def write_indexed(uri, idx, pal, info=None):
+    ''' write index array and 8-bit RGB palette as paletted image '''
+
+    from PIL import Image
+
+    img = Image.fromarray(idx, mode='P')
+    img.putpalette(pal.ravel().tolist(), rawmode='RGB')
+    img.save(uri, **(info or {}))
+
+    return True
+
+
+def convert_palette(idx, pal, cfg):
+    ''' convert colors referenced by the index array and return encoded 8-bit palette or None if not representable '''
+
+    # convert used entries only as unused ones would otherwise affect normalization
+    used = np.unique(idx)
+    used = used[used < len(pal)]
+    obj = ColorSpaceConverter(src=pal[used][:, np.newaxis, :], method=cfg['method'], inverse=cfg['inverse'],
+                              standard=cfg['standard'], input_range=cfg['range'])
+    res = obj.main()
+
+    # palettes only hold either monochromatic or 3-channel colors
+    if res.shape[-1] not in (1, 3):
+        return None
+
+    res = encode_img(res, cfg['policy'], 'uint8', output_bounds(pal, cfg)).reshape(len(used), -1)
+    new = np.zeros(pal.shape, dtype='uint8')
+    new[used] = np.repeat(res, 3, axis=-1) if res.shape[-1] == 1 else res
+
+    return new
+
+
+def output_bounds(src, cfg):
+    ''' provide per-space bounds of the output for the fixed policy or None otherwise '''
+
+    if cfg['policy'] != 'fixed':
+        return None
+
+    # nominal RGB maximum given by the input range or the type of the source
+    white = float(input_bounds(src, cfg['range'] if isinstance(cfg['range'], tuple) else 'dtype')[1])
+
+    return fixed_range(cfg['method'] if cfg['method'] in METHODS else 'yuv', cfg['inverse'], cfg['standard'], white)
+
+
+def write_png16(uri, img):
+    ''' write 16-bit gray or RGB image as PNG, which pillow only supports for gray images '''
+
+    img = img[..., np.newaxis] if img.ndim == 2 else img
+    if img.shape[-1] not in (1, 3):
+        raise BaseException('PNG requires 1 or 3 channels')
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    # big-endian samples where each row is preceded by filter type 0
+    rows = np.ascontiguousarray(img, dtype='>u2').reshape(img.shape[0], -1).view('uint8')
+    raw = np.hstack([np.zeros((img.shape[0], 1), dtype='uint8'), rows]).tobytes()
+    hdr = struct.pack('>IIBBBBB', img.shape[1], img.shape[0], 16, 0 if img.shape[-1] == 1 else 2, 0, 0, 0)
+
+    with open(uri, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', hdr) + chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+    return True
+
+
+def write_img(uri, res, src, cfg):
+    ''' write floating point formats as is and quantize others by the output stage '''
+
+    ext = os.path.splitext(uri)[-1][1:].lower()
+
+    if ext == 'npy':
+        np.save(uri, res)
+    elif ext in FLOAT_EXTS:
+        imageio.imwrite(uri=uri, im=res.astype('float32'))
+    else:
+        dtype = 'uint16' if cfg['depth'] == 16 and ext in DEEP_EXTS else 'uint8'
+        res = encode_img(res, cfg['policy'], dtype, output_bounds(src, cfg))
+        write_png16(uri, res) if dtype == 'uint16' and ext == 'png' else imageio.imwrite(uri=uri, im=res)
+
+    return True
+
+
 def main():
 
     # program info
     print("\ncolor-space-converter v%s \n" % __version__)
 
+    # keep a warm process serving conversion jobs
+    if sys.argv[1:2] == ['serve']:
+        from color_space_converter.bin.server import main as serve
+        return serve(sys.argv[2:])
+
     # parse options
     cfg = parse_options(sys.argv[1:])
 
@@ -124,39 +299,134 @@ def main():
         print('Canceled due to missing image file path\n')
         sys.exit()
 
-    # select light field image(s) considering provided folder or file
+    # method handling
+    cfg['method'] = cfg['method'] if cfg['method'] in METHODS else 'default'
+
+    # select image(s) relative to the source folder considering provided folder or file
     if os.path.isdir(cfg['src_path']):
-        filenames = [f for f in os.listdir(cfg['src_path']) if f.lower().endswith(FILE_EXTS)]
+        src_root = cfg['src_path']
+        filenames = list(walk_files(src_root, cfg['include'], cfg['exclude'], recursive=cfg['recursive']))
     elif not os.path.isfile(cfg['src_path']):
         print('File(s) not found \n')
         sys.exit()
     else:
-        filenames = [cfg['src_path']]
+        src_root, filename = os.path.split(cfg['src_path'])
+        filenames = [filename]
 
-    # method handling
-    cfg['method'] = cfg['method'] if cfg['method'] in METHODS else 'default'
-
-    # file handling
-    output_path = os.path.dirname(cfg['src_path'])
+    # output tree mirrors the source tree where folders are tracked by a manifest in the output folder
+    dst_root = cfg['dst_path'] or src_root
+    mf_path = cfg['manifest'] or (os.path.join(dst_root, MANIFEST_NAME) if os.path.isdir(cfg['src_path']) else None)
+    manifest = Manifest(mf_path, cfg, __version__)
+    outputs = manifest.outputs
 
     # user notifications
     print("Converting to %s color space ... \n" % cfg['method'])
-    if cfg['method'] != METHODS[0]:
+    if cfg['format'] not in FLOAT_EXTS:
         print(
-            'Output image is saved as uint8 which may yield undesirable results depending on the numerical range of '
-            'the color space. \nFor lossless conversion, API usage is recommended. For more details on this, see '
-            ' https://hahnec.github.io/color-space-converter/.'
+            'Output image is saved as uint%s which may yield undesirable results depending on the numerical range of '
+            'the color space. \nFor lossless conversion, choose the npy or exr format or API usage. For more details '
+            'on this, see https://hahnec.github.io/color-space-converter/.' % (16 if cfg['depth'] == 16 else 8)
             )
 
-    # process the images
-    for f in filenames:
-        src = imageio.imread(uri=f)
-        obj = ColorSpaceConverter(src=src, method=cfg['method'], inverse=cfg['inverse'], standard=cfg['standard'])
-        res = obj.main()
-        res = normalize_img(res)
-        filename = os.path.splitext(os.path.basename(cfg['src_path']))[0]+'_'+cfg['method']
-        file_ext = os.path.splitext(cfg['src_path'])[-1]
-        imageio.imwrite(uri=os.path.join(output_path, filename+'.'+file_ext[1:]), im=res)
+    # skip outputs of previous runs and sources with current outputs
+    jobs = []
+    for rel in filenames:
+        stem, file_ext = os.path.splitext(rel)
+        dst_rel = stem + '_' + cfg['method'] + ('.' + cfg['format'] if cfg['format'] else file_ext)
+        src_path, dst_path = os.path.join(src_root, rel), os.path.join(dst_root, dst_rel)
+        if rel in outputs or not cfg['force'] and manifest.is_current(rel, src_path, dst_path, dst_rel):
+            continue
+        jobs.append({'rel': rel, 'src_path': src_path, 'dst_path': dst_path, 'dst_rel': dst_rel})
+
+    # overlap decoding, conversion and encoding of images where the manifest records completely written files only
+    lock = threading.Lock()
+
+    def record(job):
+        with lock:
+            manifest.add(job['rel'], job['src_path'], job['dst_rel'])
+
+    with manifest:
+        stats = convert_files(jobs, cfg, callback=record)
+
+    print('Converted %s file(s) while %s file(s) were up-to-date \n' % (len(jobs), len(filenames) - len(jobs)))
+    if jobs:
+        print(format_stats(stats) + '\n')
+
+    return True
+
+
+def read_file(job, cfg):
+    ''' decode source image where paletted images are kept in indexed form to convert their palette only '''
+
+    file_ext = os.path.splitext(job['dst_path'])[-1]
+    indexed = read_indexed(job['src_path']) if file_ext[1:].lower() in PALETTE_EXTS and cfg['depth'] == 8 else None
+    if indexed is not None:
+        job['indexed'] = indexed
+    else:
+        job['src'] = imageio.imread(uri=job['src_path'])
+
+    return job
+
+
+def convert_job(job, cfg):
+    ''' convert decoded image or palette while falling back to the full image for non-representable palettes '''
+
+    if 'indexed' in job:
+        job['pal'] = convert_palette(*job['indexed'][:2], cfg)
+        if job['pal'] is not None:
+            return job
+        job['src'] = imageio.imread(uri=job['src_path'])
+
+    obj = ColorSpaceConverter(src=job['src'], method=cfg['method'], inverse=cfg['inverse'], standard=cfg['standard'],
+                              input_range=cfg['range'])
+    job['res'] = obj.main()
+
+    return job
+
+
+def write_file(job, cfg):
+    ''' encode the result under a temporary name and rename it once complete '''
+
+    dst_path = job['dst_path']
+    os.makedirs(os.path.dirname(os.path.abspath(dst_path)), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(dst_path), '.~' + os.path.basename(dst_path))
+
+    if job.get('pal') is not None:
+        write_indexed(tmp_path, job['indexed'][0], job['pal'], job['indexed'][2])
+    else:
+        write_img(tmp_path, job['res'], job['src'], cfg)
+
+    os.replace(tmp_path, dst_path)
+
+    return job
+
+
+def convert_files(jobs, cfg, callback=None):
+    ''' run read, convert and write stages concurrently and return the pipeline statistics '''
+
+    workers = tuple(cfg.get('workers', ()))[:3]
+    readers, converters, writers = workers + (2, 1, 2)[len(workers):]
+
+    # a single queue depth applies to all stages
+    depths = tuple(cfg.get('queue', ()))[:3] or (4,)
+    depths = depths * 3 if len(depths) == 1 else depths + (4, 4, 4)[len(depths):]
+
+    def write(job):
+        write_file(job, cfg)
+        callback(job) if callback else None
+
+    stages = [Stage('read', lambda job: read_file(job, cfg), readers, depths[0]),
+              Stage('convert', lambda job: convert_job(job, cfg), converters, depths[1]),
+              Stage('write', write, writers, depths[2])]
+
+    return run_pipeline(jobs, stages)
+
+
+def convert_file(src_path, dst_path, cfg):
+    ''' convert a single image where the output is written under a temporary name and renamed once complete '''
+
+    job = {'src_path': src_path, 'dst_path': dst_path}
+    write_file(convert_job(read_file(job, cfg), cfg), cfg)
 
     return True
 
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import fnmatch
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.color_space_converter.jsonl'
+
+# settings that render a previous output outdated once changed
+SETTING_KEYS = ('method', 'inverse', 'standard', 'range', 'policy', 'depth', 'format')
+
+
+def walk_files(root: str = None, include: tuple = ('*',), exclude: tuple = (), recursive: bool = True):
+    """ Yield paths relative to the root in sorted order where glob patterns match relative paths or file names.
+
+    :param root: directory to traverse
+    :type root: str
+    :param include: glob patterns of which one has to match, e.g. ('*.png', 'scans/*')
+    :type include: tuple, optional
+    :param exclude: glob patterns of which none may match, which also prune directories
+    :type exclude: tuple, optional
+    :param recursive: option to descend into subdirectories
+    :type recursive: bool, optional
+    :return: relative file paths with forward slashes
+    :rtype: generator
+
+    """
+
+    def match(rel, patterns):
+        return any(fnmatch.fnmatch(rel.lower(), p.lower()) or fnmatch.fnmatch(os.path.basename(rel).lower(), p.lower())
+                   for p in patterns)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        rel_dir = '' if rel_dir == '.' else rel_dir + '/'
+
+        # traverse deterministically while skipping hidden and excluded folders
+        dirnames[:] = [d for d in sorted(dirnames) if recursive and not d.startswith('.')
+                       and not match(rel_dir + d, exclude)]
+        for name in sorted(filenames):
+            rel = rel_dir + name
+            if not name.startswith('.') and match(rel, include) and not match(rel, exclude):
+                yield rel
+
+
+def file_hash(path: str = None, block_size: int = 2**20) -> str:
+    """ Compute the SHA-256 digest of a file reading blocks of limited size.
+
+    :param path: file path
+    :type path: str
+    :param block_size: number of bytes read at once
+    :type block_size: int, optional
+    :return: hexadecimal digest
+    :rtype: str
+
+    """
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+class Manifest(object):
+
+    def __init__(self, path: str = None, settings: dict = None, version: str = ''):
+        """
+
+        Persistent record of converted files for incremental runs. Records are appended as JSON lines once an output
+        is complete so that an interrupted run resumes with the remaining files. Records are kept per source and
+        output path so that runs with other methods or formats into the same folder keep theirs, where later records
+        supersede earlier ones and the file is compacted when loaded.
+
+        :param path: manifest file path or None to keep records in memory only
+        :param settings: conversion settings where changes invalidate records (see :data:`SETTING_KEYS`)
+        :param version: library version where changes invalidate records
+        """
+
+        self.path = path
+        # settings in their serialized form (e.g. tuples as lists) for comparison with loaded records
+        self.settings = json.loads(json.dumps({key: settings[key] for key in SETTING_KEYS if key in (settings or {})}))
+        self.version = version
+        self._records = {}
+
+        # last record per source and output path wins while truncated lines of an interrupted write are skipped
+        lines = 0
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self._records[rec['path'], rec['output']] = rec
+                        lines += 1
+                    except (ValueError, KeyError):
+                        continue
+
+        if lines > len(self._records):
+            self.compact()
+
+        self._file = None
+
+    @property
+    def outputs(self) -> set:
+        """ Relative output paths of all records, which are not to be taken as inputs """
+        return set(rec.get('output') for rec in self._records.values())
+
+    def is_current(self, rel: str = None, src: str = None, dst: str = None, dst_rel: str = None) -> bool:
+        """ Determine whether the output of a source is up-to-date. The content hash is only computed if size or
+        modification time changed and matching content renews the record.
+
+        :param rel: source path relative to the input root
+        :param src: source file path
+        :param dst: output file path
+        :param dst_rel: output path relative to the output root
+        :return: True if conversion can be skipped
+        """
+
+        rec = self._records.get((rel, dst_rel))
+        if rec is None or not os.path.exists(dst):
+            return False
+        if rec.get('version') != self.version or rec.get('settings') != self.settings:
+            return False
+
+        stat = os.stat(src)
+        if rec.get('size') == stat.st_size and rec.get('mtime') == stat.st_mtime_ns:
+            return True
+
+        # touched files with unchanged content
+        if rec.get('size') == stat.st_size and rec.get('hash') == file_hash(src):
+            self.add(rel, src, dst_rel, digest=rec['hash'])
+            return True
+
+        return False
+
+    def add(self, rel: str = None, src: str = None, dst_rel: str = None, digest: str = None) -> dict:
+        """ Append the record of a completed output and flush it to disk.
+
+        :param rel: source path relative to the input root
+        :param src: source file path
+        :param dst_rel: output path relative to the output root
+        :param digest: content hash if known already
+        :return: record
+        """
+
+        stat = os.stat(src)
+        rec = {'path': rel, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest or file_hash(src),
+               'output': dst_rel, 'settings': self.settings, 'version': self.version}
+        self._records[rel, dst_rel] = rec
+
+        if self.path is None:
+            return rec
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(rec, sort_keys=True) + '\n')
+        self._file.flush()
+
+        return rec
+
+    def compact(self) -> None:
+        """ Rewrite the manifest with one record per source and output atomically """
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            for rec in self._records.values():
+                f.write(json.dumps(rec, sort_keys=True) + '\n')
+        os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import queue
+import threading
+import time
+
+# marks the end of the stream within queues
+_STOP = object()
+
+
+class Stage(object):
+
+    def __init__(self, name: str, fun, workers: int = 1, depth: int = None):
+        """
+
+        Pipeline stage applying a function to each item by a number of worker threads. Functions returning None drop
+        the item. Busy time accumulates the function calls only so that the utilization tells idle from busy workers.
+
+        :param name: stage name used in reports
+        :param fun: function taking an item and returning the item for the next stage
+        :param workers: number of threads
+        :param depth: capacity of the queue feeding this stage or None for the depth of the pipeline
+        """
+
+        self.name = name
+        self.fun = fun
+        self.workers = max(1, int(workers))
+        self.depth = depth
+        self.busy = 0.
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def utilization(self, wall: float = None) -> float:
+        """ Fraction of the wall time the workers of this stage spent processing """
+        return self.busy / (wall * self.workers) if wall else 0.
+
+
+def run_pipeline(items, stages: list = None, depth: int = 4) -> dict:
+    """ Stream items through stages running concurrently where bounded queues between stages limit the number of items
+    in flight (e.g. decoded images) and apply back pressure to faster stages. Each queue holds as many items as the
+    stage it feeds allows or the given depth otherwise. Numpy and image codecs release the GIL so that threads overlap
+    disk access, conversion and encoding.
+
+    :param items: iterable of inputs to the first stage
+    :param stages: sequence of :class:`Stage` objects
+    :type stages: list
+    :param depth: capacity of queues feeding stages without a depth of their own
+    :type depth: int, optional
+    :return: wall time and per stage counts, busy time and utilization
+    :rtype: dict
+
+    """
+
+    queues = [queue.Queue(maxsize=max(1, depth if stage.depth is None else stage.depth)) for stage in stages]
+    errors = []
+    remain = [stage.workers for stage in stages]
+    lock = threading.Lock()
+
+    def work(idx, stage):
+        src, dst = queues[idx], queues[idx + 1] if idx + 1 < len(stages) else None
+        while True:
+            item = src.get()
+            if item is _STOP:
+                break
+            if errors:
+                continue
+            try:
+                t = time.perf_counter()
+                res = stage.fun(item)
+                with stage._lock:
+                    stage.busy += time.perf_counter() - t
+                    stage.count += 1
+                if res is not None and idx + 1 < len(stages):
+                    dst.put(res)
+            except BaseException as e:
+                errors.append(e)
+
+        # last worker of a stage notifies all workers of the next one
+        with lock:
+            remain[idx] -= 1
+            last = remain[idx] == 0
+        if last and idx + 1 < len(stages):
+            for _ in range(stages[idx + 1].workers):
+                dst.put(_STOP)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=work, args=(i, stage), daemon=True)
+               for i, stage in enumerate(stages) for _ in range(stage.workers)]
+    for thread in threads:
+        thread.start()
+
+    # feed first stage while stopping early on failure
+    for item in items:
+        if errors:
+            break
+        queues[0].put(item)
+    for _ in range(stages[0].workers):
+        queues[0].put(_STOP)
+
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+
+    return {'wall': wall, 'stages': [{'name': s.name, 'workers': s.workers, 'count': s.count, 'busy': s.busy,
+                                      'utilization': s.utilization(wall)} for s in stages]}
+
+
+def format_stats(stats: dict = None) -> str:
+    """ Render pipeline statistics as text where the stage of highest utilization is the bottleneck """
+
+    top = max(stats['stages'], key=lambda s: s['utilization'])['name'] if stats['stages'] else None
+    lines = ['Pipeline finished in %.2f s' % stats['wall']]
+    for s in stats['stages']:
+        lines.append('  %-8s %2d worker(s) %6d item(s) %8.2f s busy %5.1f %% utilization%s' %
+                     (s['name'], s['workers'], s['count'], s['busy'], 100 * s['utilization'],
+                      ' (bottleneck)' if s['name'] == top else ''))
+
+    return '\n'.join(lines)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+from color_space_converter import __version__
+from color_space_converter.top_level import METHODS, convert
+from color_space_converter.bin.cli import parse_options, read_file, convert_job, write_file
+
+import getopt
+import io
+import ipaddress
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+import numpy as np
+
+# request keys overriding command line settings of conversion jobs
+JOB_KEYS = ('method', 'inverse', 'standard', 'range', 'policy', 'depth', 'format')
+
+# types of request keys overriding command line settings
+JOB_TYPES = {'method': str, 'inverse': bool, 'standard': str, 'policy': str, 'depth': int, 'format': str}
+
+# content types of jobs, which browsers cannot send across origins without a preflight request the server refuses
+CONTENT_TYPES = ('application/json', 'application/octet-stream')
+
+# maximum request body in bytes accepted by default
+MAX_BYTES = 2**28
+
+
+class Metrics(object):
+
+    def __init__(self, limit: int = 4):
+        """
+
+        Thread-safe job counters and latencies of a server where a semaphore limits the number of concurrent jobs.
+
+        :param limit: maximum number of jobs running at once
+        """
+
+        self.limit = limit
+        self.start = time.time()
+        self.counts = {'jobs': 0, 'failed': 0, 'rejected': 0, 'active': 0}
+        self.seconds = 0.
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.counts['rejected'] += 1
+            return False
+        with self._lock:
+            self.counts['active'] += 1
+        return True
+
+    def release(self, seconds: float = 0., failed: bool = False) -> None:
+        with self._lock:
+            self.counts['active'] -= 1
+            self.counts['jobs'] += 1
+            self.counts['failed'] += int(failed)
+            self.seconds += seconds
+        self._slots.release()
+
+    def report(self) -> dict:
+        with self._lock:
+            mean = self.seconds / self.counts['jobs'] if self.counts['jobs'] else 0.
+            return dict(self.counts, limit=self.limit, uptime=time.time() - self.start, seconds=self.seconds,
+                        mean_latency=mean)
+
+
+def job_config(params: dict = None, defaults: dict = None) -> dict:
+    """ Merge request parameters into the default settings while validating their types and the method. """
+
+    # booleans are integers in Python and only accepted for 'inverse'
+    for key, val in params.items():
+        if key in JOB_TYPES and (not isinstance(val, JOB_TYPES[key]) or isinstance(val, bool) != (key == 'inverse')):
+            raise TypeError('Job setting %r expects %s, but got %r' % (key, JOB_TYPES[key].__name__, val))
+    rng = params.get('range', 'auto')
+    if rng not in ('auto', 'dtype') and not (isinstance(rng, (list, tuple)) and len(rng) == 2 and
+                                            all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in rng)):
+        raise TypeError('Job setting \'range\' expects a pair of numbers, \'auto\' or \'dtype\', but got %r' % (rng,))
+
+    cfg = dict(defaults)
+    cfg.update({key: params[key] for key in JOB_KEYS if key in params})
+    cfg['method'] = cfg['method'] or 'default'
+    if cfg['method'] not in METHODS + ['default']:
+        raise ValueError('Unknown method %r' % cfg['method'])
+    cfg['range'] = tuple(cfg['range']) if isinstance(cfg['range'], (list, tuple)) else cfg['range']
+
+    return cfg
+
+
+def parse_query(query: str = '') -> dict:
+    """ Parse job settings from a URL query string, e.g. 'method=lab&inverse=true&range=0,1023'. """
+
+    params = dict(parse_qsl(query))
+    if 'inverse' in params:
+        params['inverse'] = params['inverse'].lower() in ('1', 'true', 'yes')
+    if 'depth' in params:
+        params['depth'] = int(params['depth'])
+    if 'range' in params and params['range'] not in ('auto', 'dtype'):
+        params['range'] = tuple(float(v) for v in params['range'].split(','))
+
+    return params
+
+
+def is_loopback(host: str = None) -> bool:
+    """ Check whether a host name or address only accepts connections from the local machine. """
+
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def resolve_path(path: str = None, root: str = None) -> str:
+    """ Resolve a path relative to the served root directory and refuse paths leading outside of it. """
+
+    root = os.path.realpath(root)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([full, root]) != root:
+        raise PermissionError('Path %r outside of the served root directory' % path)
+
+    return full
+
+
+def convert_path(params: dict = None, cfg: dict = None, root: str = None) -> dict:
+    """ Convert an image file below the root directory to the given or default output path as done by the command
+    line interface. """
+
+    src_path = resolve_path(params['src'], root or os.getcwd())
+    if not os.path.isfile(src_path):
+        raise FileNotFoundError(params['src'])
+    stem, file_ext = os.path.splitext(src_path)
+    dst_path = stem + '_' + cfg['method'] + ('.' + cfg['format'] if cfg['format'] else file_ext)
+    dst_path = resolve_path(params['dst'], root or os.getcwd()) if params.get('dst') else dst_path
+    write_file(convert_job(read_file({'src_path': src_path, 'dst_path': dst_path}, cfg), cfg), cfg)
+
+    return {'dst': dst_path}
+
+
+def convert_buffer(img: np.ndarray = None, cfg: dict = None) -> np.ndarray:
+    """ Convert an array, e.g. sent as npy payload or attached from shared memory, and return the float result. """
+
+    return convert(img, method=cfg['method'] if cfg['method'] != 'default' else 'yuv', inverse=cfg['inverse'],
+                   standard=cfg['standard'], input_range=cfg['range'])
+
+
+def read_shared(name: str = None, shape: tuple = None, dtype: str = None) -> np.ndarray:
+    """ Copy an array from a named shared memory block created by the client, which remains owned by the client. """
+
+    from multiprocessing import shared_memory, resource_tracker
+
+    # attached blocks must not be tracked as the tracker would unlink them once the server exits
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    try:
+        return np.ndarray(tuple(shape), dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    """ Request handler providing health and metrics endpoints as well as conversion of files and buffers. """
+
+    server_version = 'color-space-converter/' + __version__
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        if not getattr(self.server, 'quiet', True):
+            super(Handler, self).log_message(*args)
+
+    def address_string(self):
+        # unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else 'unix'
+
+    def send_body(self, code: int = 200, body: bytes = b'', content_type: str = 'application/json'):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, code: int = 200, obj: dict = None):
+        self.send_body(code, json.dumps(obj).encode())
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/health':
+            self.send_json(200, {'status': 'ok', 'version': __version__})
+        elif path == '/metrics':
+            self.send_json(200, self.server.metrics.report())
+        else:
+            self.send_json(404, {'error': 'Unknown endpoint %s' % path})
+
+    def do_POST(self):
+        path, _, query = self.path.partition('?')
+
+        # refuse bodies beyond the size limit without reading them
+        try:
+            size = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            size = -1
+        if not 0 <= size <= self.server.max_bytes:
+            self.close_connection = True
+            return self.send_json(413 if size > 0 else 400, {'error': 'Invalid or too large request body'})
+
+        body = self.rfile.read(size)
+        if path != '/convert':
+            return self.send_json(404, {'error': 'Unknown endpoint %s' % path})
+
+        # refuse other content types such as text/plain, which any web page may post to a local server
+        if self.headers.get('Content-Type', '').split(';')[0].strip().lower() not in CONTENT_TYPES:
+            return self.send_json(415, {'error': 'Content-Type has to be one of %s' % ', '.join(CONTENT_TYPES)})
+
+        # reject jobs beyond the concurrency limit once the queue timeout expires
+        metrics = self.server.metrics
+        if not metrics.acquire(self.server.timeout_s):
+            return self.send_json(503, {'error': 'Server busy'})
+
+        # slots are released before responding so that slow clients do not block conversions
+        t, failed = time.perf_counter(), True
+        try:
+            code, (body, content_type), failed = 200, self.run_job(body, query, t), False
+        except PermissionError as e:
+            code, body, content_type = 403, self.error(e), 'application/json'
+        except (ValueError, KeyError, TypeError, FileNotFoundError) as e:
+            code, body, content_type = 400, self.error(e), 'application/json'
+        except BaseException as e:
+            code, body, content_type = 500, self.error(e), 'application/json'
+        finally:
+            metrics.release(time.perf_counter() - t, failed)
+
+        self.send_body(code, body, content_type)
+
+    @staticmethod
+    def error(e: BaseException) -> bytes:
+        return json.dumps({'error': '%s: %s' % (type(e).__name__, e)}).encode()
+
+    def run_job(self, body: bytes = b'', query: str = '', start: float = 0.) -> tuple:
+        """ Convert a file, shared memory block or npy payload and return the response body and its type. """
+
+        # arrays are sent as npy payload with settings in the query or referenced in shared memory
+        if self.headers.get('Content-Type', '').split(';')[0].strip().lower() == 'application/octet-stream':
+            params = parse_query(query)
+            img = np.load(io.BytesIO(body), allow_pickle=False)
+        else:
+            params = json.loads(body or b'{}')
+            img = read_shared(params['shm'], params['shape'], params['dtype']) if 'shm' in params else None
+
+        cfg = job_config(params, self.server.defaults)
+        if img is not None:
+            buf = io.BytesIO()
+            np.save(buf, convert_buffer(img, cfg), allow_pickle=False)
+            return buf.getvalue(), 'application/octet-stream'
+        if 'src' not in params:
+            raise ValueError('Job requires src path, shm buffer or npy payload')
+        res = convert_path(params, cfg, self.server.root)
+
+        return json.dumps(dict(res, seconds=time.perf_counter() - start)).encode(), 'application/json'
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def server_bind(self):
+        # remove stale socket of a previous server
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+
+
+def warm_up(methods: list = None) -> None:
+    """ Run each conversion once on a small image to populate matrix, range and LUT caches. """
+
+    img = np.linspace(0, 255, 48, dtype='uint8').reshape(4, 4, 3)
+    for method in methods or METHODS:
+        convert(convert(img, method=method), method=method, inverse=True)
+
+
+def create_server(address=('127.0.0.1', 0), cfg: dict = None, limit: int = 4, timeout: float = 30.,
+                  root: str = None, max_bytes: int = MAX_BYTES, allow_remote: bool = False):
+    """
+    Create a threaded HTTP server that keeps the interpreter, imports and caches warm across jobs. String addresses
+    bind a unix socket and tuples a TCP host and port (port 0 picks a free one). As jobs run with the rights of the
+    server, file paths are confined to the root directory and hosts other than loopback need to be allowed explicitly.
+
+    :param address: unix socket path or (host, port) tuple
+    :param cfg: default settings of conversion jobs (see :func:`parse_options`)
+    :param limit: maximum number of concurrent jobs
+    :param timeout: seconds a job waits for a free slot before it is rejected
+    :param root: directory that source and destination paths are resolved in (defaults to the working directory)
+    :param max_bytes: maximum size of a request body
+    :param allow_remote: option to listen on hosts other than loopback, which come without authentication
+    :return: server object to call serve_forever() on
+    """
+
+    if not isinstance(address, str) and not is_loopback(address[0]) and not allow_remote:
+        raise BaseException('Refusing to listen on non-loopback host %r without allowing remote access' % address[0])
+
+    server = UnixHTTPServer(address, Handler) if isinstance(address, str) else ThreadingHTTPServer(address, Handler)
+    server.daemon_threads = True
+    server.defaults = dict(cfg or parse_options([]))
+    server.metrics = Metrics(limit)
+    server.timeout_s = timeout
+    server.root = os.path.realpath(root or os.getcwd())
+    server.max_bytes = max_bytes
+    server.quiet = True
+
+    return server
+
+
+def usage():
+
+    print("Usage: color-space-converter serve <options>\n")
+    print("Options:")
+    print("               --host=<str>       Address to listen on (default 127.0.0.1)")
+    print("               --port=<int>       Port to listen on (default 8765)")
+    print("               --socket=<path>    Listen on a unix socket instead of a TCP port")
+    print("               --jobs=<int>       Maximum number of concurrent conversions (default number of CPUs)")
+    print("               --timeout=<float>  Seconds a job may wait for a free slot before being rejected")
+    print("               --root=<path>      Directory that job paths are confined to (default working directory)")
+    print("               --max-size=<int>   Maximum request body in MB (default %s)" % (MAX_BYTES // 2**20))
+    print("               --allow-remote     Listen on non-loopback hosts, which exposes jobs without authentication")
+    print("-h,            --help             Print this help message")
+    print("")
+    print("Endpoints: GET /health, GET /metrics and POST /convert with JSON {'src': ..., 'dst': ..., 'method': ...}")
+    print("")
+
+
+def main(argv=None):
+
+    try:
+        opts, args = getopt.getopt(sys.argv[2:] if argv is None else argv, "h",
+                                   ["help", "host=", "port=", "socket=", "jobs=", "timeout=", "root=", "max-size=",
+                                    "allow-remote"])
+    except getopt.GetoptError as e:
+        print(e)
+        sys.exit(2)
+
+    host, port, sock, jobs, timeout = '127.0.0.1', 8765, None, os.cpu_count() or 1, 30.
+    root, max_bytes, allow_remote = None, MAX_BYTES, False
+    for (opt, arg) in opts:
+        if opt in ("-h", "--help"):
+            usage()
+            sys.exit()
+        if opt == "--host":
+            host = arg.strip(" \"\'")
+        if opt == "--port":
+            port = int(arg)
+        if opt == "--socket":
+            sock = arg.strip(" \"\'")
+        if opt == "--jobs":
+            jobs = int(arg)
+        if opt == "--timeout":
+            timeout = float(arg)
+        if opt == "--root":
+            root = arg.strip(" \"\'")
+        if opt == "--max-size":
+            max_bytes = int(float(arg) * 2**20)
+        if opt == "--allow-remote":
+            allow_remote = True
+
+    if not sock and not is_loopback(host):
+        if not allow_remote:
+            print("Refusing to listen on %s without --allow-remote as jobs are not authenticated" % host)
+            sys.exit(2)
+        print("Warning: jobs sent to %s:%s are not authenticated" % (host, port))
+
+    warm_up()
+    server = create_server(sock or (host, port), limit=jobs, timeout=timeout, root=root, max_bytes=max_bytes,
+                           allow_remote=allow_remote)
+    print("Serving color-space-converter v%s on %s with %s job(s) \n" % (__version__, sock or '%s:%s' % (host, port),
+                                                                          jobs))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if sock and os.path.exists(sock):
+            os.remove(sock)
+
+    return True
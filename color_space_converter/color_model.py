@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+from collections import namedtuple
+
+from color_space_converter.lab_converter import xyz2lab, lab2xyz
+from color_space_converter.matrix_registry import register_matrix, get_matrix, has_matrix
+from color_space_converter.transfer_functions import TRANSFERS, get_transfer
+from color_space_converter.xyz_converter import rgb2lin, calc_dtype
+
+# CIE 1931 2° chromaticities of standard illuminants
+WHITE_POINTS = {
+    'A': (0.44757, 0.40745),
+    'C': (0.31006, 0.31616),
+    'D50': (0.34567, 0.35850),
+    'D55': (0.33242, 0.34743),
+    'D65': (0.31270, 0.32900),
+    'D75': (0.29902, 0.31485),
+    'E': (1 / 3., 1 / 3.),
+}
+
+# chromaticities of red, green and blue primaries followed by the native white point
+PRIMARIES = {
+    'sRGB': ((0.640, 0.330), (0.300, 0.600), (0.150, 0.060), 'D65'),
+    'Adobe RGB': ((0.640, 0.330), (0.210, 0.710), (0.150, 0.060), 'D65'),
+    'Display P3': ((0.680, 0.320), (0.265, 0.690), (0.150, 0.060), 'D65'),
+    'BT.2020': ((0.708, 0.292), (0.170, 0.797), (0.131, 0.046), 'D65'),
+    'ProPhoto RGB': ((0.7347, 0.2653), (0.1596, 0.8404), (0.0366, 0.0001), 'D50'),
+}
+PRIMARIES['BT.709'] = PRIMARIES['sRGB']
+
+# cone response matrices for chromatic adaptation
+ADAPTATIONS = {
+    'Bradford': np.array([[0.8951, 0.2664, -0.1614], [-0.7502, 1.7135, 0.0367], [0.0389, -0.0685, 1.0296]]),
+    'CAT02': np.array([[0.7328, 0.4296, -0.1624], [-0.7036, 1.6975, 0.0061], [0.0030, 0.0136, 0.9834]]),
+    'Von Kries': np.array([[0.40024, 0.70760, -0.08081], [-0.22630, 1.16532, 0.04570], [0, 0, 0.91822]]),
+    'XYZ': np.eye(3),
+}
+
+
+class ColorModel(namedtuple('ColorModel', ['primaries', 'white', 'transfer', 'adaptation', 'reference'],
+                            defaults=('sRGB', None, 'sRGB', 'Bradford', None))):
+    """ RGB color model given by its primaries, white point and transfer function. The reference white of the xyz
+    connection space (e.g. 'D50' for print workflows) defaults to the model white and differing white points are
+    matched by chromatic adaptation. Primaries and white points are either names (see :data:`PRIMARIES` and
+    :data:`WHITE_POINTS`) or xy chromaticities while the transfer is a name (see :data:`TRANSFERS`) or gamma value.
+    Models are immutable and hashable so that derived matrices are computed once per model and registered (see
+    :func:`get_matrix`).
+
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, primaries='sRGB', white=None, transfer='sRGB', adaptation='Bradford', reference=None):
+
+        # convert sequences to tuples for hashing
+        primaries = primaries if isinstance(primaries, str) else tuple(tuple(p) for p in primaries)
+        white = white if white is None or isinstance(white, str) else tuple(white)
+        reference = reference if reference is None or isinstance(reference, str) else tuple(reference)
+
+        if isinstance(primaries, str) and primaries not in PRIMARIES:
+            raise BaseException('Primaries \'%s\' not recognized' % primaries)
+        if adaptation not in ADAPTATIONS:
+            raise BaseException('Chromatic adaptation \'%s\' not recognized' % adaptation)
+        if isinstance(transfer, str) and transfer not in TRANSFERS:
+            raise BaseException('Transfer function \'%s\' not recognized' % transfer)
+
+        # fall back to the native white point of the primaries
+        if white is None:
+            white = PRIMARIES[primaries][3] if isinstance(primaries, str) else 'D65'
+        reference = white if reference is None else reference
+
+        return super(ColorModel, cls).__new__(cls, primaries, white, transfer, adaptation, reference)
+
+    @property
+    def xyz_matrix(self) -> np.ndarray:
+        """ Matrix converting linear RGB to xyz space (Y = 1 for white) relative to the reference white """
+        return get_matrix(model_matrix(self))
+
+    @property
+    def inv_matrix(self) -> np.ndarray:
+        """ Matrix converting xyz space relative to the reference white to linear RGB """
+        return get_matrix(model_matrix(self), inverse=True)
+
+    @property
+    def white_xyz(self) -> np.ndarray:
+        """ Reference white in xyz space with Y = 100 """
+        return white_xyz(self.reference) * 100
+
+    def decode(self, rgb: np.ndarray = None) -> np.ndarray:
+        """ Decode normalized RGB values to linear RGB by the transfer function of the model
+
+        :param rgb: normalized array ranging from 0 to 1
+        :type rgb: :class:`~numpy:numpy.ndarray`
+        :return: linear RGB array
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return get_transfer(self.transfer)[0](rgb)
+
+    def encode(self, lin: np.ndarray = None) -> np.ndarray:
+        """ Encode linear RGB values by the transfer function of the model
+
+        :param lin: linear RGB array
+        :type lin: :class:`~numpy:numpy.ndarray`
+        :return: array in red, green and blue (RGB) space ranging from 0 to 1
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return get_transfer(self.transfer)[1](lin)
+
+    def rgb2lin(self, rgb: np.ndarray = None, input_range: tuple = None) -> np.ndarray:
+        """ Normalize and decode RGB values to linear RGB (see :func:`rgb2lin`)
+
+        :param rgb: input array in red, green and blue (RGB) space
+        :type rgb: :class:`~numpy:numpy.ndarray`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
+        :return: linear RGB array ranging from 0 to 1
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return rgb2lin(rgb, input_range=input_range, transfer=self.transfer)
+
+    def lin2xyz(self, lin: np.ndarray = None) -> np.ndarray:
+        """ Convert linear RGB to xyz space with Y = 100 for the reference white
+
+        :param lin: linear RGB array ranging from 0 to 1
+        :type lin: :class:`~numpy:numpy.ndarray`
+        :return: array in xyz space
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return np.matmul(lin, (100 * self.xyz_matrix.T).astype(calc_dtype(lin)))
+
+    def xyz2lin(self, xyz: np.ndarray = None) -> np.ndarray:
+        """ Convert xyz space with Y = 100 for the reference white to linear RGB
+
+        :param xyz: input array in xyz space
+        :type xyz: :class:`~numpy:numpy.ndarray`
+        :return: linear RGB array
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        xyz = np.asarray(xyz, dtype=calc_dtype(xyz))
+
+        return np.matmul(xyz, (self.inv_matrix.T / 100).astype(xyz.dtype))
+
+    def rgb2xyz(self, rgb: np.ndarray = None, input_range: tuple = None) -> np.ndarray:
+        """ Convert RGB color space to xyz color space
+
+        :param rgb: input array in red, green and blue (RGB) space
+        :type rgb: :class:`~numpy:numpy.ndarray`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
+        :return: array in xyz space
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return self.lin2xyz(self.rgb2lin(rgb, input_range=input_range))
+
+    def xyz2rgb(self, xyz: np.ndarray = None) -> np.ndarray:
+        """ Convert xyz color space to RGB color space
+
+        :param xyz: input array in xyz space
+        :type xyz: :class:`~numpy:numpy.ndarray`
+        :return: array in red, green and blue (RGB) space
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return self.encode(self.xyz2lin(xyz))
+
+    def rgb2lab(self, rgb: np.ndarray = None, input_range: tuple = None) -> np.ndarray:
+        """ Convert RGB color space to Lab color space relative to the reference white
+
+        :param rgb: input array in red, green and blue (RGB) space
+        :type rgb: :class:`~numpy:numpy.ndarray`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
+        :return: array in Lab space
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return xyz2lab(self.rgb2xyz(rgb, input_range=input_range), ref_white=self.white_xyz)
+
+    def lab2rgb(self, lab: np.ndarray = None) -> np.ndarray:
+        """ Convert Lab color space relative to the reference white to RGB color space
+
+        :param lab: input array in Lab space
+        :type lab: :class:`~numpy:numpy.ndarray`
+        :return: array in red, green and blue (RGB) space
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        return self.xyz2rgb(lab2xyz(lab, ref_white=self.white_xyz))
+
+    def convert(self, rgb: np.ndarray = None, model=None, input_range: tuple = None) -> np.ndarray:
+        """ Convert RGB values of this model to RGB values of another model (e.g. from sRGB to Display P3)
+
+        :param rgb: input array in red, green and blue (RGB) space of this model
+        :type rgb: :class:`~numpy:numpy.ndarray`
+        :param model: target color model
+        :type model: :class:`ColorModel`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
+        :return: array in red, green and blue (RGB) space of the target model ranging from 0 to 1
+        :rtype: ~numpy:np.ndarray
+
+        """
+
+        lin = self.rgb2lin(rgb, input_range=input_range)
+
+        return model.encode(np.matmul(lin, get_matrix(conversion_matrix(self, model)).T.astype(lin.dtype)))
+
+
+def chromaticity(value=None) -> tuple:
+    """ Resolve a white point name or xy chromaticities
+
+    :param value: name of a white point (see :data:`WHITE_POINTS`) or xy chromaticities
+    :return: xy chromaticities
+    :rtype: tuple
+
+    """
+
+    if isinstance(value, str):
+        if value not in WHITE_POINTS:
+            raise BaseException('White point \'%s\' not recognized' % value)
+        return WHITE_POINTS[value]
+
+    return value
+
+
+def white_xyz(white=None) -> np.ndarray:
+    """ Compute the xyz tristimulus values of a white point with Y = 1
+
+    :param white: name of a white point (see :data:`WHITE_POINTS`) or xy chromaticities
+    :return: xyz vector
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    x, y = chromaticity(white)
+
+    return np.array([x / y, 1., (1 - x - y) / y])
+
+
+def adaptation_matrix(src_white=None, dst_white=None, method: str = 'Bradford') -> np.ndarray:
+    """ Compute the von Kries type matrix adapting xyz values from a source to a destination white point once and
+    register it (see :func:`get_matrix`)
+
+    :param src_white: name of a white point (see :data:`WHITE_POINTS`) or xy chromaticities
+    :param dst_white: name of a white point (see :data:`WHITE_POINTS`) or xy chromaticities
+    :param method: cone response with either 'Bradford', 'CAT02', 'Von Kries' or 'XYZ' (see :data:`ADAPTATIONS`)
+    :type method: str, optional
+    :return: 3x3 matrix
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if method not in ADAPTATIONS:
+        raise BaseException('Chromatic adaptation \'%s\' not recognized' % method)
+
+    name = 'adaptation%r' % ((chromaticity(src_white), chromaticity(dst_white), method),)
+    if not has_matrix(name):
+        # scale cone responses by the ratio of destination and source white
+        cone = ADAPTATIONS[method]
+        gain = np.dot(cone, white_xyz(dst_white)) / np.dot(cone, white_xyz(src_white))
+        register_matrix(name, np.dot(np.linalg.inv(cone), gain[:, None] * cone))
+
+    return get_matrix(name)
+
+
+def model_matrix(model: ColorModel = None) -> str:
+    """ Derive the matrix converting linear RGB of a model to xyz space once and register it where the inverse is
+    provided by the registry as well
+
+    :param model: color model
+    :type model: :class:`ColorModel`
+    :return: registered matrix name (see :func:`get_matrix`)
+    :rtype: str
+
+    """
+
+    name = 'model%r' % (tuple(model),)
+    if not has_matrix(name):
+        # normalized primary matrix from chromaticities with columns scaled to sum up to the white point
+        prim = PRIMARIES[model.primaries][:3] if isinstance(model.primaries, str) else model.primaries
+        xyz = np.array([[x / y, 1., (1 - x - y) / y] for x, y in (chromaticity(p) for p in prim)]).T
+        mat = xyz * np.linalg.solve(xyz, white_xyz(model.white))
+
+        # adapt model white to reference white of the connection space
+        if chromaticity(model.white) != chromaticity(model.reference):
+            mat = np.dot(adaptation_matrix(model.white, model.reference, model.adaptation), mat)
+
+        register_matrix(name, mat)
+
+    return name
+
+
+def conversion_matrix(src: ColorModel = None, dst: ColorModel = None) -> str:
+    """ Derive the matrix converting linear RGB of a source to linear RGB of a destination model once and register it
+
+    :param src: source color model
+    :type src: :class:`ColorModel`
+    :param dst: destination color model
+    :type dst: :class:`ColorModel`
+    :return: registered matrix name (see :func:`get_matrix`)
+    :rtype: str
+
+    """
+
+    name = 'conversion%r' % ((tuple(src), tuple(dst)),)
+    if not has_matrix(name):
+        mat = get_matrix(model_matrix(src))
+
+        # adapt between reference whites if these differ
+        if chromaticity(src.reference) != chromaticity(dst.reference):
+            mat = np.dot(adaptation_matrix(src.reference, dst.reference, src.adaptation), mat)
+
+        register_matrix(name, np.dot(get_matrix(model_matrix(dst), inverse=True), mat))
+
+    return name
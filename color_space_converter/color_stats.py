@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.converter_baseclass import as_array
+from color_space_converter.registry import get_converter
+from color_space_converter.top_level import convert, fixed_range, HUE_CHANNELS, TILE_SIZE
+from color_space_converter.xyz_converter import input_bounds
+
+# two-sided 95 % quantile of the normal distribution
+Z_95 = 1.959963984540054
+
+
+class ColorHistogram(object):
+
+    # accumulators and their merge operations
+    MERGE = {'count': np.add, 'sum': np.add, 'sq': np.add, 'min': np.minimum, 'max': np.maximum, 'cos': np.add,
+             'sin': np.add, 'counts': np.add, 'joint': np.add}
+
+    def __init__(self, method: str = 'hsv', bins: int = 32, ranges: tuple = None, standard: str = 'HDTV',
+                 input_range: tuple = 'dtype', joint: bool = False):
+        """
+
+        Histogram sketch of colors in a target space with fixed memory, which accumulates per channel histograms,
+        moments and extrema and optionally a joint histogram over all channels. Sketches of equal settings merge by
+        addition (e.g. from several worker processes) and serialize to JSON-compatible dictionaries so that dataset
+        statistics are obtained without storing converted images. All images share the input range of the sketch so
+        that their colors are comparable, where 'dtype' maps the full range of each input type to 0 and 1 and spaces
+        preserving the input scale (e.g. 'hsv') keep the upper bound of a given range (e.g. 255 for (0, 255)).
+
+        :param method: registered color space
+        :param bins: number of bins per channel
+        :param ranges: lower and upper bounds per channel, which default to the bounds of the space (see
+                       :func:`fixed_range`) where values beyond fall into the outermost bins
+        :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+        :param input_range: lower and upper input values or 'dtype' for the full range of each input type
+        :param joint: option to accumulate the joint histogram of bins**channels counts
+        """
+
+        get_converter(method)
+        if input_range != 'dtype' and (isinstance(input_range, str) or input_range is None or len(input_range) != 2):
+            raise BaseException('Input range \'%s\' not recognized as pair of bounds or \'dtype\'' % str(input_range))
+        self.input_range = 'dtype' if input_range == 'dtype' else tuple(float(val) for val in input_range)
+        self.white = 1. if self.input_range == 'dtype' else self.input_range[1]
+
+        lo, hi = ranges if ranges is not None else fixed_range(method, False, standard, self.white)
+        self.method, self.bins, self.standard = method, int(bins), standard
+        self.lo, self.hi = np.array(lo, dtype='float64'), np.array(hi, dtype='float64')
+        self.hue = HUE_CHANNELS.get(method)
+
+        num = len(self.lo)
+        self.acc = {'count': 0, 'sum': np.zeros(num), 'sq': np.zeros(num), 'min': np.full(num, np.inf),
+                    'max': np.full(num, -np.inf), 'cos': 0., 'sin': 0., 'counts': np.zeros((num, self.bins), 'int64')}
+        if joint:
+            self.acc['joint'] = np.zeros((self.bins,) * num, dtype='int64')
+
+    @property
+    def settings(self) -> tuple:
+        return self.method, self.bins, self.standard, self.input_range, tuple(self.lo), tuple(self.hi), \
+            'joint' in self.acc
+
+    @property
+    def count(self) -> int:
+        return int(self.acc['count'])
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self.acc['counts']
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.lo, self.hi, self.bins + 1, axis=-1)
+
+    def add(self, values: np.ndarray = None) -> 'ColorHistogram':
+        """
+        Accumulate colors that are given in the target space already.
+
+        :param values: array with channels along the last axis
+        :return: this sketch updated in place
+        """
+
+        res = np.asarray(values, dtype='float64').reshape(-1, len(self.lo))
+        if not len(res):
+            return self
+
+        idx = np.clip(((res - self.lo) * (self.bins / np.maximum(self.hi - self.lo, 1e-12))).astype('int64'), 0,
+                      self.bins - 1)
+        part = {'count': len(res), 'sum': res.sum(axis=0), 'sq': np.square(res).sum(axis=0), 'min': res.min(axis=0),
+                'max': res.max(axis=0), 'counts': np.stack([np.bincount(idx[:, c], minlength=self.bins)
+                                                            for c in range(res.shape[-1])])}
+        if self.hue is not None:
+            rad = np.deg2rad(res[:, self.hue])
+            part['cos'], part['sin'] = np.cos(rad).sum(), np.sin(rad).sum()
+        if 'joint' in self.acc:
+            flat = np.ravel_multi_index(tuple(idx.T), self.acc['joint'].shape)
+            part['joint'] = np.bincount(flat, minlength=self.acc['joint'].size).reshape(self.acc['joint'].shape)
+
+        for key, val in part.items():
+            self.acc[key] = self.MERGE[key](self.acc[key], val)
+
+        return self
+
+    def update(self, img: np.ndarray = None, tile_size: int = TILE_SIZE) -> 'ColorHistogram':
+        """
+        Convert an RGB image tile by tile within the input range of the sketch and accumulate its colors.
+
+        :param img: input array in RGB space (or any object supported by :func:`as_array`)
+        :param tile_size: approximate number of pixels per tile
+        :return: this sketch updated in place
+        """
+
+        arr = as_array(img)
+        rng = input_bounds(arr, self.input_range)
+
+        # bring the range of the input type to the nominal white of spaces preserving the input scale
+        scale = self.white / float(rng[1])
+        rng = (rng[0] * scale, self.white)
+
+        step = max(1, tile_size // max(1, int(np.prod(arr.shape[1:-1]))))
+        for i in range(0, arr.shape[0], step):
+            tile = arr[i:i+step] * scale if scale != 1 else arr[i:i+step]
+            self.add(convert(tile, method=self.method, standard=self.standard, input_range=rng))
+
+        return self
+
+    def merge(self, other: 'ColorHistogram' = None) -> 'ColorHistogram':
+        """ Add the counts of a sketch of equal settings to this one. """
+
+        if other.settings != self.settings:
+            raise BaseException('Histograms of different settings cannot be merged')
+        for key in self.acc:
+            self.acc[key] = self.MERGE[key](self.acc[key], other.acc[key])
+
+        return self
+
+    def __iadd__(self, other: 'ColorHistogram' = None) -> 'ColorHistogram':
+        return self.merge(other)
+
+    def __add__(self, other: 'ColorHistogram' = None) -> 'ColorHistogram':
+        return ColorHistogram.from_dict(self.to_dict()).merge(other)
+
+    def to_dict(self) -> dict:
+        """ Provide settings and accumulators as JSON-compatible dictionary. """
+
+        acc = {key: val.tolist() if isinstance(val, (np.ndarray, np.generic)) else val for key, val in self.acc.items()}
+
+        return {'method': self.method, 'bins': self.bins, 'standard': self.standard,
+                'input_range': self.input_range if self.input_range == 'dtype' else list(self.input_range),
+                'ranges': [self.lo.tolist(), self.hi.tolist()], 'acc': acc}
+
+    @classmethod
+    def from_dict(cls, obj: dict = None) -> 'ColorHistogram':
+        """ Restore a sketch from a dictionary provided by :meth:`to_dict`. """
+
+        hist = cls(obj['method'], obj['bins'], obj['ranges'], obj['standard'], obj['input_range'],
+                   'joint' in obj['acc'])
+        for key, val in obj['acc'].items():
+            hist.acc[key] = np.array(val, dtype=hist.acc[key].dtype) if isinstance(hist.acc[key], np.ndarray) else val
+
+        return hist
+
+    def stats(self, percentiles: tuple = (5, 50, 95)) -> dict:
+        """
+        Summarize the accumulated colors where percentiles are read from the histogram within a bin width and hue
+        channels yield circular means and deviations in degrees.
+
+        :param percentiles: percentiles from 0 to 100 to be estimated
+        :return: pixel count and per channel 'mean', 'std', 'min', 'max', 'percentiles' and 'histogram'
+        """
+
+        acc, cnt = self.acc, max(self.count, 1)
+        mean = acc['sum'] / cnt
+        std = np.sqrt(np.maximum(acc['sq'] / cnt - mean**2, 0))
+
+        # circular mean and deviation of hue angles
+        if self.hue is not None:
+            length = min(np.hypot(acc['cos'], acc['sin']) / cnt, 1.)
+            mean[self.hue] = np.rad2deg(np.arctan2(acc['sin'], acc['cos'])) % 360
+            std[self.hue] = np.rad2deg(np.sqrt(-2 * np.log(length))) if length > 0 else np.inf
+
+        # percentiles by linear interpolation of the cumulative histogram
+        edges = self.edges
+        cdf = np.cumsum(acc['counts'], axis=-1) / cnt
+        pcts = {p: np.array([np.interp(p / 100., np.r_[0, cdf[c]], edges[c]) for c in range(len(cdf))])
+                for p in percentiles}
+
+        return {'count': self.count, 'mean': mean, 'std': std, 'min': acc['min'].copy(), 'max': acc['max'].copy(),
+                'percentiles': pcts, 'histogram': (acc['counts'].copy(), edges)}
+
+
+def color_stats(img: np.ndarray = None, method: str = 'lab', standard: str = 'HDTV', input_range: tuple = None,
+                bins: int = 256, ranges: tuple = None, percentiles: tuple = (5, 50, 95), sample: float = None,
+                seed: int = None, tile_size: int = TILE_SIZE) -> dict:
+    """
+    Aggregate color statistics of an image in a target space by a single tiled pass where only a tile is converted
+    at a time so that the converted image is never held in memory. Means, standard deviations and extrema are
+    accumulated exactly while percentiles are read from the histogram within the accuracy of a bin width. Hue channels
+    yield circular means and deviations in degrees.
+
+    Large images may be subsampled where each tile forms a stratum from which the given fraction of pixels is drawn
+    at random. The returned mean error is then the half width of the 95 % confidence interval of the stratified mean.
+
+    :param img: input array in RGB space (or any object supported by :func:`as_array`)
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param method: registered color space
+    :type method: :class:`str`
+    :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+    :type standard: :class:`string`
+    :param input_range: lower and upper input values mapped to 0 and 1 (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param bins: number of histogram bins per channel
+    :type bins: int, optional
+    :param ranges: lower and upper histogram bounds per channel, which default to the bounds of the space
+    :type ranges: tuple, optional
+    :param percentiles: percentiles from 0 to 100 to be estimated
+    :type percentiles: tuple, optional
+    :param sample: fraction of pixels drawn per tile or None to process all pixels
+    :type sample: float, optional
+    :param seed: seed of the random generator for subsampling
+    :type seed: int, optional
+    :param tile_size: approximate number of pixels per tile
+    :type tile_size: int, optional
+    :return: pixel counts and per channel 'mean', 'std', 'min', 'max', 'mean_error', 'percentiles' and 'histogram'
+    :rtype: dict
+    """
+
+    arr = as_array(img)
+    if sample is not None and not 0 < sample <= 1:
+        raise BaseException('Sample fraction %s not in (0, 1]' % sample)
+
+    # resolve input range of the entire image and histogram bounds of the space
+    rng = input_bounds(arr, input_range)
+    hist = ColorHistogram(method, bins, ranges, standard, input_range=rng)
+
+    # number of rows per tile
+    step = max(1, tile_size // max(1, int(np.prod(arr.shape[1:-1]))))
+    gen = np.random.default_rng(seed)
+
+    num, var = 0, 0.
+    for i in range(0, arr.shape[0], step):
+        tile = arr[i:i+step]
+        total = int(np.prod(tile.shape[:-1]))
+
+        # draw pixels of the stratum at random
+        if sample is not None and sample < 1:
+            size = min(total, max(2, int(np.ceil(sample * total))))
+            idx = np.sort(gen.choice(total, size=size, replace=False))
+            tile = tile.reshape(-1, tile.shape[-1])[idx][:, np.newaxis]
+
+        res = convert(tile, method=method, standard=standard, input_range=rng)
+        res = res.reshape(-1, res.shape[-1])
+
+        hist.add(res)
+
+        # variance of the stratified mean where each stratum is weighted by its number of pixels
+        if len(res) < total and len(res) > 1:
+            var = var + total**2 * np.var(res, axis=0, ddof=1) / len(res) * (1 - len(res) / total)
+        num += total
+
+    res = hist.stats(percentiles)
+    res['total'] = num
+    res['mean_error'] = Z_95 * np.sqrt(var) / num if np.any(var) else np.zeros_like(res['mean'])
+
+    return res
@@ -17,6 +17,46 @@ __license__ = """
 """
 
 import numpy as np
+from collections import namedtuple
+
+# memory layout of raw buffers where strides default to C order and offset is given in bytes
+BufferLayout = namedtuple('BufferLayout', ['shape', 'dtype', 'strides', 'offset'], defaults=(None, 0))
+
+
+def as_array(src=None, layout: BufferLayout = None) -> np.ndarray:
+    """ Provide an array view of the source data without copying. Supported are numpy arrays, objects exposing
+    DLPack (e.g. tensors from ML frameworks) or the array interface (e.g. PIL images) and raw buffers such as bytes,
+    bytearray or memoryview, which require a layout.
+
+    :param src: source data
+    :param layout: shape, dtype, strides and byte offset of raw buffers
+    :type layout: :class:`BufferLayout`, optional
+    :return: array sharing memory with the source where possible
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if isinstance(src, np.ndarray) or src is None:
+        return src
+
+    # raw buffers are interpreted given the layout
+    if layout is not None:
+        return np.ndarray(shape=layout.shape, dtype=layout.dtype, buffer=memoryview(src), offset=layout.offset,
+                          strides=layout.strides)
+
+    if hasattr(src, '__dlpack__'):
+        try:
+            return np.from_dlpack(src)
+        except (BufferError, RuntimeError, TypeError):
+            pass
+
+    if hasattr(src, '__array_interface__') or hasattr(src, '__array_struct__') or hasattr(src, '__array__'):
+        return np.asarray(src)
+
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        raise BaseException('Provided "src" is a raw buffer that requires a layout.')
+
+    return src
 
 
 class ConverterBaseclass(object):
@@ -29,7 +69,8 @@ class ConverterBaseclass(object):
 
         :param args: passed arguments are assigned to variables in the following order:
                         1) src image 2) conversion method 3) inverse option 4) standard option
-        :param kwargs: supported keyword arguments are as follows: 'src', 'method', 'inverse' and 'standard'
+        :param kwargs: supported keyword arguments are as follows: 'src', 'method', 'inverse', 'standard',
+                        'input_range' and 'layout' where the latter describes raw buffers passed as 'src'
         """
 
         # assign variables from arguments
@@ -43,6 +84,10 @@ class ConverterBaseclass(object):
         self._met = kwargs['method'] if 'method' in kwargs else self._met
         self._inv = kwargs['inverse'] if 'inverse' in kwargs else self._inv
         self._stn = kwargs['standard'] if 'standard' in kwargs else self._stn
+        self._rng = kwargs['input_range'] if 'input_range' in kwargs else None
+
+        # wrap buffers, tensors and images without copying
+        self._arr = as_array(self._arr, kwargs['layout'] if 'layout' in kwargs else None)
 
         # validate variables
         self.validate_types()
@@ -53,7 +98,8 @@ class ConverterBaseclass(object):
 
     def validate_types(self) -> bool:
         """
-        This function analyzes the variable type from supported keywords 'src', 'method', 'inverse' and 'standard'.
+        This function analyzes the variable type from supported keywords 'src', 'method', 'inverse', 'standard' and
+        'input_range'.
         An exception is thrown if the data types are not as expected.
         """
 
@@ -65,6 +111,8 @@ class ConverterBaseclass(object):
             raise BaseException('Provided "inverse" argument is not of type bool.')
         elif not isinstance(self._stn, str):
             raise BaseException('Provided "standard" argument is not of type str.')
+        elif not isinstance(self._rng, (tuple, list, str)) and not (self._rng is None):
+            raise BaseException('Provided "input_range" argument is neither a tuple nor of type str.')
         else:
             return True
 
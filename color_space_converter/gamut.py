@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.lab_converter import rgb2lab, lab2rgb
+from color_space_converter.lch_converter import lab2lch, lch2lab
+from color_space_converter.xyz_converter import calc_dtype
+
+# tolerance below which values count as in gamut
+GAMUT_EPS = 1e-6
+
+
+def clip_gamut(rgb: np.ndarray = None, white: float = 1., out: np.ndarray = None) -> np.ndarray:
+    """ Clip each channel to the range from 0 to white
+
+    :param rgb: array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param white: nominal maximum of the RGB values
+    :type white: float, optional
+    :param out: array the result is written to, which may be the input
+    :type out: :class:`~numpy:numpy.ndarray`, optional
+    :return: array within gamut
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    return np.clip(rgb, 0, white, out=out)
+
+
+def soft_clip(rgb: np.ndarray = None, white: float = 1., out: np.ndarray = None, knee: float = .8) -> np.ndarray:
+    """ Compress highlights of out-of-gamut pixels above a knee smoothly towards white while negative values are
+    clipped. Pixels within gamut (including white) are left untouched.
+
+    :param rgb: array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param white: nominal maximum of the RGB values
+    :type white: float, optional
+    :param out: array the result is written to, which may be the input
+    :type out: :class:`~numpy:numpy.ndarray`, optional
+    :param knee: fraction of white above which channels of out-of-gamut pixels are compressed
+    :type knee: float, optional
+    :return: array within gamut
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    out = np.maximum(rgb, 0, out=out)
+
+    # tangens hyperbolicus shoulder with unit slope at the knee touches only highlights of pixels exceeding white
+    thr, rem = knee * white, (1 - knee) * white
+    mask = out > thr
+    mask &= np.any(out > (1 + GAMUT_EPS) * white, axis=-1, keepdims=True)
+    out[mask] = thr + rem * np.tanh((out[mask] - thr) / rem)
+
+    # remove residuals within tolerance
+    return np.minimum(out, white, out=out)
+
+
+def reduce_chroma(rgb: np.ndarray = None, white: float = 1., out: np.ndarray = None, transfer: str = 'sRGB',
+                  iterations: int = 12) -> np.ndarray:
+    """ Map out-of-gamut colors into gamut by reducing their chroma in CIE LCh at constant lightness and hue. Only
+    pixels outside the gamut are converted and searched by bisection while the remainder is left untouched.
+
+    :param rgb: array in red, green and blue (RGB) space with channels in the last dimension
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param white: nominal maximum of the RGB values
+    :type white: float, optional
+    :param out: array the result is written to, which may be the input
+    :type out: :class:`~numpy:numpy.ndarray`, optional
+    :param transfer: transfer function of the RGB values (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param iterations: number of bisection steps
+    :type iterations: int, optional
+    :return: array within gamut
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if out is None:
+        out = rgb.copy()
+    elif out is not rgb:
+        np.copyto(out, rgb)
+
+    mask = np.any((out < -GAMUT_EPS * white) | (out > (1 + GAMUT_EPS) * white), axis=-1)
+    if out.shape[-1] == 3 and mask.any():
+        lch = lab2lch(rgb2lab(out[mask][:, np.newaxis] / white, input_range=(0, 1), transfer=transfer))
+        np.clip(lch[..., 0], 0, 100, out=lch[..., 0])
+        chroma = lch[..., 1].copy()
+
+        # bisection on the chroma scale where the lower bound is always in gamut
+        lo, hi = np.zeros_like(chroma), np.ones_like(chroma)
+        for _ in range(iterations):
+            mid = (lo + hi) / 2
+            lch[..., 1] = chroma * mid
+            cand = lab2rgb(lch2lab(lch), transfer=transfer)
+            valid = np.all((cand >= -GAMUT_EPS) & (cand <= 1 + GAMUT_EPS), axis=-1)
+            lo, hi = np.where(valid, mid, lo), np.where(valid, hi, mid)
+
+        lch[..., 1] = chroma * lo
+        out[mask] = lab2rgb(lch2lab(lch), transfer=transfer)[:, 0] * white
+
+    # remove residuals of the search and tolerance
+    return np.clip(out, 0, white, out=out)
+
+
+GAMUT_METHODS = {'clip': clip_gamut, 'soft': soft_clip, 'chroma': reduce_chroma}
+
+
+def quantize(rgb: np.ndarray = None, dtype: np.dtype = 'uint8', white: float = 1., inplace: bool = False) -> np.ndarray:
+    """ Scale values in gamut from 0 to white to the full range of an unsigned integer type with rounding
+
+    :param rgb: array within gamut
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param dtype: unsigned integer type such as 'uint8' or 'uint16'
+    :type dtype: :class:`~numpy:numpy.dtype`, optional
+    :param white: nominal maximum of the RGB values
+    :type white: float, optional
+    :param inplace: option to use the input as scratch memory
+    :type inplace: bool, optional
+    :return: quantized array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.unsignedinteger):
+        raise BaseException('Quantization type \'%s\' not supported' % dtype)
+
+    res = np.multiply(rgb, np.iinfo(dtype).max / white, out=rgb if inplace else None)
+    np.rint(res, out=res)
+
+    return res.astype(dtype)
+
+
+def map_gamut(rgb: np.ndarray = None, method: str = 'clip', dtype: np.dtype = None, white: float = 1.,
+              inplace: bool = False, **kwargs) -> np.ndarray:
+    """ Bring RGB values into gamut and optionally quantize them in place of the final write of a conversion so that
+    results are ready for encoding without normalization passes over the whole image.
+
+    :param rgb: array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param method: gamut handling with either 'clip', 'soft' (highlight compression) or 'chroma' (LCh reduction)
+    :type method: str, optional
+    :param dtype: unsigned integer type for quantization (e.g. 'uint8' or 'uint16') or None for floating point output
+    :type dtype: :class:`~numpy:numpy.dtype`, optional
+    :param white: nominal maximum of the RGB values (e.g. 255 for inverse conversions preserving the input scale)
+    :type white: float, optional
+    :param inplace: option to overwrite the input, which is the case for fresh results of conversions
+    :type inplace: bool, optional
+    :param kwargs: options passed on to the gamut method, e.g. 'knee' or 'transfer'
+    :return: array within gamut
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if method not in GAMUT_METHODS:
+        raise BaseException('Gamut method \'%s\' not recognized' % method)
+
+    # floating point scratch memory where integer results are promoted anyway
+    arr = np.asarray(rgb, dtype=calc_dtype(rgb))
+    out = arr if inplace or arr is not rgb else None
+
+    res = GAMUT_METHODS[method](arr, white=white, out=out, **kwargs)
+
+    return quantize(res, dtype=dtype, white=white, inplace=True) if dtype is not None else res
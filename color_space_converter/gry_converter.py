@@ -19,9 +19,13 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
+from color_space_converter.linear_stage import LinearStage
+from color_space_converter.matrix_registry import register_matrix
 
-MAT_GRY_HDTV = np.array([0.2126, 0.7152, 0.0722])
-MAT_GRY_SDTV = np.array([0.299, 0.587, 0.114])
+MAT_GRY_HDTV = register_matrix('gry_hdtv', [0.2126, 0.7152, 0.0722])[0]
+MAT_GRY_SDTV = register_matrix('gry_sdtv', [0.299, 0.587, 0.114])[0]
+
+GRY_STAGES = {'HDTV': LinearStage(MAT_GRY_HDTV), 'SDTV': LinearStage(MAT_GRY_SDTV)}
 
 
 class GryConverter(ConverterBaseclass):
@@ -41,16 +45,16 @@ class GryConverter(ConverterBaseclass):
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
 
-        if not self._inv:
-            self._arr = rgb2gry(self._arr)
+        if not inv:
+            arr = rgb2gry(arr)
         else:
-            self._arr = gry2ch3(self._arr)
+            arr = gry2ch3(arr)
 
-        return self._arr
+        return arr
 
 
 def rgb2gry(rgb: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
@@ -65,22 +69,10 @@ def rgb2gry(rgb: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
 
     """
 
-    # store shape
-    shape = rgb.shape
-
-    # reshape image to channel vectors
-    rgb = rgb.reshape(-1, 3).T
-
     # choose standard
-    mat = MAT_GRY_HDTV if standard == 'HDTV' else MAT_GRY_SDTV
+    stage = GRY_STAGES['HDTV' if standard == 'HDTV' else 'SDTV']
 
-    # convert to gray
-    arr = np.dot(mat, rgb)
-
-    # reshape to 2-D image
-    arr = arr.reshape(shape[:2] + (1,))
-
-    return arr
+    return stage(rgb)
 
 
 def gry2ch3(gry: np.ndarray = None) -> np.ndarray:
@@ -19,6 +19,8 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import input_white
 
 
 class HsvConverter(ConverterBaseclass):
@@ -38,75 +40,270 @@ class HsvConverter(ConverterBaseclass):
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
 
-        if not self._inv:
-            self._arr = rgb2hsv(self._arr)
+        if not inv:
+            arr = rgb2hsv(arr)
         else:
-            self._arr = hsv2rgb(self._arr)
+            arr = hsv2rgb(arr)
 
-        return self._arr
+        return arr
 
 
-def rgb2hsv(rgb: np.ndarray = None) -> np.ndarray:
+def hue_chroma(rgb: np.ndarray = None, hue: np.ndarray = None) -> tuple:
+    """ Compute the hexagonal hue along with channel maximum and chroma, which is the kernel shared by HSV, HSL and
+    HSI. Each hue sector is written once by masked ufuncs where ties resolve in R, G, B order.
+
+    :param rgb: input float array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param hue: output array for the hue in degrees (optional)
+    :type hue: :class:`~numpy:numpy.ndarray`
+    :return: hue, maximum and chroma
+    :rtype: tuple
+
+    """
+
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxv = np.maximum(r, g)
+    np.maximum(maxv, b, out=maxv)
+    chroma = np.minimum(r, g)
+    np.minimum(chroma, b, out=chroma)
+    np.subtract(maxv, chroma, out=chroma)
+
+    # sector masks of the maximum channel
+    sec_r = r == maxv
+    sec_g = g == maxv
+    sec_g &= ~sec_r
+    sec_b = ~(sec_r | sec_g)
+
+    # channel differences of each sector
+    hue = np.empty_like(maxv) if hue is None else hue
+    np.subtract(g, b, out=hue, where=sec_r)
+    np.subtract(b, r, out=hue, where=sec_g)
+    np.subtract(r, g, out=hue, where=sec_b)
+
+    # scale by chroma (differences vanish for achromatic pixels) and add sector offsets
+    np.divide(hue, chroma, out=hue, where=chroma > 0)
+    hue *= 60.
+    np.add(hue, 120., out=hue, where=sec_g)
+    np.add(hue, 240., out=hue, where=sec_b)
+    np.mod(hue, 360., out=hue)
+
+    return hue, maxv, chroma
+
+
+def hue_weights(hue: np.ndarray = None) -> np.ndarray:
+    """ Compute per-channel weights of the chroma that is subtracted from the channel maximum given the hue. Weights
+    follow from k = (n + H / 60) mod 6 as min(max(min(k, 4 - k), 0), 1) with n being 5, 3 and 1 for R, G and B.
+
+    :param hue: hue in degrees
+    :type hue: :class:`~numpy:numpy.ndarray`
+    :return: weights in the range of 0 to 1 with 3 channels
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    hue = np.asarray(hue, dtype='float') / 60.
+    wgt = np.empty(hue.shape + (3,))
+    tmp = np.empty_like(hue)
+
+    for ch, n in enumerate((5, 3, 1)):
+        k = wgt[..., ch]
+        np.add(hue, n, out=k)
+        np.mod(k, 6., out=k)
+        np.subtract(4., k, out=tmp)
+        np.minimum(k, tmp, out=k)
+        np.clip(k, 0., 1., out=k)
+
+    return wgt
+
+
+def rgb2hsv(rgb: np.ndarray = None, unique: bool = False) -> np.ndarray:
     """ Convert RGB color space to HSV color space
 
     :param rgb: input array in red, green and blue (RGB) space
     :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
     :return: array in hue, saturation and value (HSV) space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    rgb = rgb.astype('float')
-    maxv = np.amax(rgb, axis=2)
-    maxc = np.argmax(rgb, axis=2)
-    minv = np.amin(rgb, axis=2)
-    minc = np.argmin(rgb, axis=2)
-
-    # slicing implementation of HSV channel definitions
-    hsv = np.zeros(rgb.shape, dtype='float')
-    hsv[maxc == minc, 0] = np.zeros(hsv[maxc == minc, 0].shape)
-    hsv[maxc == 0, 0] = (((rgb[..., 1] - rgb[..., 2]) * 60.0 /
-                          (maxv - minv + np.spacing(1))) % 360.0)[maxc == 0]
-    hsv[maxc == 1, 0] = (((rgb[..., 2] - rgb[..., 0]) * 60.0 /
-                          (maxv - minv + np.spacing(1))) + 120.0)[maxc == 1]
-    hsv[maxc == 2, 0] = (((rgb[..., 0] - rgb[..., 1]) * 60.0 /
-                          (maxv - minv + np.spacing(1))) + 240.0)[maxc == 2]
-    hsv[maxv == 0, 1] = np.zeros(hsv[maxv == 0, 1].shape)
-    hsv[maxv != 0, 1] = (1 - minv / (maxv + np.spacing(1)))[maxv != 0]
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2hsv, rgb)
+
+    rgb = np.asarray(rgb, dtype='float')
+    hsv = np.empty(rgb.shape)
+    _, maxv, chroma = hue_chroma(rgb, hue=hsv[..., 0])
+
+    # saturation is zero for black pixels
+    np.divide(chroma, np.add(maxv, np.spacing(1)), out=hsv[..., 1])
     hsv[..., 2] = maxv
 
     return hsv
 
 
-def hsv2rgb(hsv: np.ndarray = None) -> np.ndarray:
+def hsv2rgb(hsv: np.ndarray = None, unique: bool = False) -> np.ndarray:
     """ Convert HSV color space to RGB color space
 
     :param hsv: input array in hue, saturation and value (HSV) space
     :type hsv: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :return: array in red, green and blue (RGB) space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(hsv):
+        return unique_conv(hsv2rgb, hsv)
+
+    hsv = np.asarray(hsv, dtype='float')
+
+    # subtract weighted chroma from value
+    rgb = hue_weights(hsv[..., 0])
+    rgb *= (hsv[..., 1] * hsv[..., 2])[..., np.newaxis]
+    np.subtract(hsv[..., 2, np.newaxis], rgb, out=rgb)
+
+    return rgb
+
+
+def rgb2hsl(rgb: np.ndarray = None, unique: bool = False, white: float = None) -> np.ndarray:
+    """ Convert RGB color space to HSL color space where lightness keeps the input scale like value and intensity of
+    HSV and HSI while saturation ranges from 0 to 1 relative to the given white
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param white: nominal RGB maximum, e.g. 255 for 8-bit input, where None uses the maximum of the input type
+    :type white: float, optional
+    :return: array in hue, saturation and lightness (HSL) space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # saturation refers to the white of the input type unless given
+    white = input_white(np.asarray(rgb)) if white is None else white
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2hsl, rgb, white=white)
+
+    rgb = np.asarray(rgb, dtype='float')
+    hsl = np.empty(rgb.shape)
+    _, maxv, chroma = hue_chroma(rgb, hue=hsl[..., 0])
+
+    # lightness as mid-range and saturation relative to the largest chroma at that lightness
+    maxv *= 2
+    maxv -= chroma
+    np.copyto(hsl[..., 2], maxv)
+    maxv -= white
+    np.abs(maxv, out=maxv)
+    np.subtract(white + np.spacing(white), maxv, out=maxv)
+    np.divide(chroma, maxv, out=hsl[..., 1])
+    hsl[..., 2] *= .5
+
+    return hsl
+
+
+def hsl2rgb(hsl: np.ndarray = None, unique: bool = False, white: float = 1.) -> np.ndarray:
+    """ Convert HSL color space to RGB color space
+
+    :param hsl: input array in hue, saturation and lightness (HSL) space
+    :type hsl: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param white: nominal RGB maximum used for the forward conversion, e.g. 255 for 8-bit input (see :func:`rgb2hsl`)
+    :type white: float, optional
+    :return: array in red, green and blue (RGB) space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(hsl):
+        return unique_conv(hsl2rgb, hsl, white=white)
+
+    hsl = np.asarray(hsl, dtype='float')
+
+    # chroma and maximum from saturation and lightness
+    chroma = white + np.spacing(white) - np.abs(2 * hsl[..., 2] - white)
+    chroma *= hsl[..., 1]
+    maxv = chroma / 2
+    maxv += hsl[..., 2]
+
+    # subtract weighted chroma from maximum
+    rgb = hue_weights(hsl[..., 0])
+    rgb *= chroma[..., np.newaxis]
+    np.subtract(maxv[..., np.newaxis], rgb, out=rgb)
+
+    return rgb
+
+
+def rgb2hsi(rgb: np.ndarray = None, unique: bool = False) -> np.ndarray:
+    """ Convert RGB color space to HSI color space using the hexagonal hue of HSV
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :return: array in hue, saturation and intensity (HSI) space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2hsi, rgb)
+
+    rgb = np.asarray(rgb, dtype='float')
+    hsi = np.empty(rgb.shape)
+    _, maxv, chroma = hue_chroma(rgb, hue=hsi[..., 0])
+
+    # intensity as channel mean and saturation as its relative distance to the minimum
+    np.mean(rgb, axis=2, out=hsi[..., 2])
+    maxv -= chroma
+    np.subtract(hsi[..., 2], maxv, out=hsi[..., 1])
+    np.divide(hsi[..., 1], np.add(hsi[..., 2], np.spacing(1)), out=hsi[..., 1])
+
+    return hsi
+
+
+def hsi2rgb(hsi: np.ndarray = None, unique: bool = False) -> np.ndarray:
+    """ Convert HSI color space to RGB color space
+
+    :param hsi: input array in hue, saturation and intensity (HSI) space
+    :type hsi: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
     :return: array in red, green and blue (RGB) space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    hi = np.floor(hsv[..., 0] / 60.0) % 6
-    hi = hi.astype('uint8')
-    v = hsv[..., 2].astype('float')
-    f = (hsv[..., 0] / 60.0) - np.floor(hsv[..., 0] / 60.0)
-    p = v * (1.0 - hsv[..., 1])
-    q = v * (1.0 - (f * hsv[..., 1]))
-    t = v * (1.0 - ((1.0 - f) * hsv[..., 1]))
-
-    rgb = np.zeros(hsv.shape)
-    rgb[hi == 0, :] = np.dstack((v, t, p))[hi == 0, :]
-    rgb[hi == 1, :] = np.dstack((q, v, p))[hi == 1, :]
-    rgb[hi == 2, :] = np.dstack((p, v, t))[hi == 2, :]
-    rgb[hi == 3, :] = np.dstack((p, q, v))[hi == 3, :]
-    rgb[hi == 4, :] = np.dstack((t, p, v))[hi == 4, :]
-    rgb[hi == 5, :] = np.dstack((v, p, q))[hi == 5, :]
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(hsi):
+        return unique_conv(hsi2rgb, hsi)
+
+    hsi = np.asarray(hsi, dtype='float')
+    rgb = hue_weights(hsi[..., 0])
+
+    # chroma preserving the channel mean given the sum of weights and maximum as minimum plus chroma
+    chroma = np.sum(rgb, axis=2)
+    np.subtract(3., chroma, out=chroma)
+    np.divide(3 * hsi[..., 1] * hsi[..., 2], chroma, out=chroma)
+    maxv = hsi[..., 2] * (1 - hsi[..., 1])
+    maxv += chroma
+
+    # subtract weighted chroma from maximum
+    rgb *= chroma[..., np.newaxis]
+    np.subtract(maxv[..., np.newaxis], rgb, out=rgb)
 
     return rgb
 
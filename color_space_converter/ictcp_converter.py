@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.matrix_registry import register_matrix, get_matrix
+from color_space_converter.transfer_functions import pq_encode, pq_decode, PQ_PEAK
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import rgb2lin, lin2rgb, calc_dtype
+
+# ITU-R BT.2087 linear BT.709 to BT.2020 primaries
+MAT_709_2020 = np.array([[0.627403895934699, 0.329283038377884, 0.043313065687417],
+                         [0.069097289358232, 0.919540395075459, 0.011362315566309],
+                         [0.016391438875150, 0.088013307877226, 0.895595253247624]])
+
+# ITU-R BT.2100 linear BT.2020 to LMS and PQ encoded LMS to ICtCp
+MAT_ICTCP_LMS = np.array([[1688, 2146, 262], [683, 2951, 462], [99, 309, 3688]]) / 4096.
+MAT_ICTCP = np.array([[2048, 2048, 0], [6610, -13613, 7003], [17933, -17390, -543]]) / 4096.
+
+register_matrix('ictcp_lms_bt2020', MAT_ICTCP_LMS)
+register_matrix('ictcp_lms_bt709', np.dot(MAT_ICTCP_LMS, MAT_709_2020))
+register_matrix('ictcp', MAT_ICTCP)
+
+
+def rgb2ictcp(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+              luminance: float = 100.) -> np.ndarray:
+    """ Convert RGB color space to ICtCp color space of ITU-R BT.2100 using PQ
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :return: array in ICtCp space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2ictcp, rgb, input_range=input_range, luminance=luminance)
+
+    return lin2ictcp(rgb2lin(rgb, input_range=input_range), luminance=luminance)
+
+
+def ictcp2rgb(ictcp: np.ndarray = None, unique: bool = False, luminance: float = 100.) -> np.ndarray:
+    """ Convert ICtCp color space of ITU-R BT.2100 to RGB color space
+
+    :param ictcp: input array in ICtCp space
+    :type ictcp: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(ictcp):
+        return unique_conv(ictcp2rgb, ictcp, luminance=luminance)
+
+    return lin2rgb(ictcp2lin(ictcp, luminance=luminance))
+
+
+def lin2ictcp(lin: np.ndarray = None, luminance: float = 100., primaries: str = 'BT.709') -> np.ndarray:
+    """ Convert linear RGB to ICtCp color space where values above 1 represent highlights beyond white
+
+    :param lin: linear RGB array (see :func:`rgb2lin`)
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :param primaries: 'BT.709' (sRGB) or 'BT.2020' primaries of the linear input
+    :type primaries: str, optional
+    :return: array in ICtCp space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    dtype = calc_dtype(lin)
+    mat = get_matrix('ictcp_lms_bt2020' if primaries == 'BT.2020' else 'ictcp_lms_bt709')
+    lms = pq_encode(np.matmul(lin, (mat.T * luminance / PQ_PEAK).astype(dtype)))
+
+    return np.matmul(lms, MAT_ICTCP.T.astype(dtype))
+
+
+def ictcp2lin(ictcp: np.ndarray = None, luminance: float = 100., primaries: str = 'BT.709') -> np.ndarray:
+    """ Convert ICtCp color space to linear RGB
+
+    :param ictcp: input array in ICtCp space
+    :type ictcp: :class:`~numpy:numpy.ndarray`
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :param primaries: 'BT.709' (sRGB) or 'BT.2020' primaries of the linear output
+    :type primaries: str, optional
+    :return: linear RGB array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    dtype = calc_dtype(ictcp)
+    inv = get_matrix('ictcp_lms_bt2020' if primaries == 'BT.2020' else 'ictcp_lms_bt709', inverse=True)
+    lms = pq_decode(np.matmul(ictcp, get_matrix('ictcp', inverse=True).T.astype(dtype)))
+
+    return np.matmul(lms, (inv.T * PQ_PEAK / luminance).astype(dtype))
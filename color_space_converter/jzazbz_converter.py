@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.matrix_registry import register_matrix, get_matrix
+from color_space_converter.transfer_functions import pq_encode, pq_decode, PQ_M2, PQ_PEAK
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import rgb2lin, lin2rgb, lin2xyz, xyz2lin, calc_dtype
+
+# Safdar et al., "Perceptually uniform color space for image signals including high dynamic range and wide gamut",
+# Optics Express 25 (13), 2017
+JZ_B = 1.15
+JZ_G = 0.66
+JZ_D = -0.56
+JZ_D0 = 1.6295499532821566e-11
+JZ_M2 = 1.7 * PQ_M2
+
+# adjusted xyz to cone response and PQ encoded cone response to intensity and opponent axes
+MAT_JZ_LMS = np.array([[0.41478972, 0.579999, 0.0146480], [-0.2015100, 1.120649, 0.0531008],
+                       [-0.0166008, 0.264800, 0.6684799]])
+MAT_JZ = np.array([[0.5, 0.5, 0], [3.524000, -4.066708, 0.542708], [0.199076, 1.096799, -1.295875]])
+
+# cone response of xyz whose X and Y are adjusted to remove the blue curvature of hue lines
+register_matrix('jz_lms', np.dot(MAT_JZ_LMS, [[JZ_B, 0, 1 - JZ_B], [1 - JZ_G, JZ_G, 0], [0, 0, 1]]))
+register_matrix('jz', MAT_JZ)
+
+
+def rgb2jzazbz(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+               luminance: float = 100., transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert RGB color space to Jzazbz color space
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in Jzazbz space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2jzazbz, rgb, input_range=input_range, luminance=luminance, transfer=transfer,
+                           model=model)
+
+    if model is not None:
+        return xyz2jzazbz(model.rgb2xyz(rgb, input_range=input_range), luminance=luminance)
+
+    lin = rgb2lin(rgb, input_range=input_range, transfer=transfer)
+
+    return xyz2jzazbz(lin2xyz(lin), luminance=luminance)
+
+
+def jzazbz2rgb(jab: np.ndarray = None, unique: bool = False, luminance: float = 100.,
+               transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert Jzazbz color space to RGB color space
+
+    :param jab: input array in Jzazbz space
+    :type jab: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param luminance: luminance of RGB white in cd/m^2
+    :type luminance: float, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(jab):
+        return unique_conv(jzazbz2rgb, jab, luminance=luminance, transfer=transfer, model=model)
+
+    if model is not None:
+        return model.xyz2rgb(jzazbz2xyz(jab, luminance=luminance))
+
+    return lin2rgb(xyz2lin(jzazbz2xyz(jab, luminance=luminance)), transfer=transfer)
+
+
+def xyz2jzazbz(xyz: np.ndarray = None, luminance: float = 100.) -> np.ndarray:
+    """ Convert xyz space (Y = 100 for white) to Jzazbz color space
+
+    :param xyz: input array in xyz space
+    :type xyz: :class:`~numpy:numpy.ndarray`
+    :param luminance: luminance of white (Y = 100) in cd/m^2
+    :type luminance: float, optional
+    :return: array in Jzazbz space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    xyz = np.asarray(xyz, dtype=calc_dtype(xyz))
+
+    # adjust X and Y to remove the blue curvature of hue lines
+    mat = get_matrix('jz_lms') * luminance / 100. / PQ_PEAK
+    lms = pq_encode(np.matmul(xyz, mat.T.astype(xyz.dtype)), m2=JZ_M2)
+    jab = np.matmul(lms, MAT_JZ.T.astype(xyz.dtype))
+
+    # intensity to lightness
+    jab[..., 0] = (1 + JZ_D) * jab[..., 0] / (1 + JZ_D * jab[..., 0]) - JZ_D0
+
+    return jab
+
+
+def jzazbz2xyz(jab: np.ndarray = None, luminance: float = 100.) -> np.ndarray:
+    """ Convert Jzazbz color space to xyz space (Y = 100 for white)
+
+    :param jab: input array in Jzazbz space
+    :type jab: :class:`~numpy:numpy.ndarray`
+    :param luminance: luminance of white (Y = 100) in cd/m^2
+    :type luminance: float, optional
+    :return: array in xyz space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    jab = np.array(jab, dtype=calc_dtype(jab))
+
+    # lightness to intensity
+    jab[..., 0] += JZ_D0
+    jab[..., 0] = jab[..., 0] / (1 + JZ_D - JZ_D * jab[..., 0])
+
+    inv = get_matrix('jz_lms', inverse=True) * 100. * PQ_PEAK / luminance
+    lms = pq_decode(np.matmul(jab, get_matrix('jz', inverse=True).T.astype(jab.dtype)), m2=JZ_M2)
+
+    return np.matmul(lms, inv.T.astype(jab.dtype))
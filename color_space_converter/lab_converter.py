@@ -19,6 +19,8 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
+from color_space_converter.quantizer import ColorQuantizer
+from color_space_converter.unique_colors import low_cardinality, unique_conv, unique_colors
 from color_space_converter.xyz_converter import XyzConverter, rgb2xyz, xyz2rgb
 
 # Observer. = 2°, Illuminant = D65 (from Adobe)
@@ -32,95 +34,124 @@ class LabConverter(XyzConverter, ConverterBaseclass):
     def __init__(self, *args, **kwargs):
         super(LabConverter, self).__init__(*args, **kwargs)
 
-    def lab_conv(self, img: np.ndarray = None, inverse: bool = False) -> np.ndarray:
+    def lab_conv(self, img: np.ndarray = None, inverse: bool = False, input_range: tuple = None) -> np.ndarray:
         """ Convert RGB color space to Lab color space or vice versa given the inverse option.
 
         :param img: input array in either RGB or Lab color space
         :type img: :class:`~numpy:numpy.ndarray`
         :param inverse: option that determines whether conversion is from rgb2lab (False) or lab2rgb (True)
         :type inverse: :class:`boolean`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
         :return: color space converted array
         :rtype: ~numpy:np.ndarray
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
+        rng = input_range if input_range is not None else self._rng
 
-        if not self._inv:
-            self._arr = rgb2lab(self._arr)
+        if not inv:
+            arr = rgb2lab(arr, input_range=rng)
         else:
-            self._arr = lab2rgb(self._arr)
+            arr = lab2rgb(arr)
 
-        return self._arr
+        return arr
 
 
-def rgb2lab(rgb: np.ndarray = None) -> np.ndarray:
+def rgb2lab(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+            transfer: str = 'sRGB', model=None) -> np.ndarray:
     """ Convert RGB color space to Lab color space
 
     :param rgb: input array in red, green and blue (RGB) space
     :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
     :return: array in Lab space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    xyz = rgb2xyz(rgb)
-    lab = xyz2lab(xyz)
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2lab, rgb, input_range=input_range, transfer=transfer, model=model)
+
+    xyz = rgb2xyz(rgb, input_range=input_range, transfer=transfer, model=model)
+    lab = xyz2lab(xyz, ref_white=None if model is None else model.white_xyz)
 
     return lab
 
 
-def lab2rgb(lab: np.ndarray = None) -> np.ndarray:
+def lab2rgb(lab: np.ndarray = None, unique: bool = False, transfer: str = 'sRGB', model=None) -> np.ndarray:
     """ Convert Lab color space to RGB color space
 
     :param lab: input array in Lab space
     :type lab: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
     :return: array in red, green and blue (RGB) space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    xyz = lab2xyz(lab)
-    rgb = xyz2rgb(xyz)
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(lab):
+        return unique_conv(lab2rgb, lab, transfer=transfer, model=model)
+
+    xyz = lab2xyz(lab, ref_white=None if model is None else model.white_xyz)
+    rgb = xyz2rgb(xyz, transfer=transfer, model=model)
 
     return rgb
 
 
-def lab_conv(img: np.ndarray = None, inverse: bool = False) -> np.ndarray:
+def lab_conv(img: np.ndarray = None, inverse: bool = False, input_range: tuple = None) -> np.ndarray:
     """ Convert RGB color space to Lab color space or vice versa given the inverse option.
 
     :param img: input array in either RGB or Lab color space
     :type img: :class:`~numpy:numpy.ndarray`
     :param inverse: option that determines whether conversion is from rgb2lab (False) or lab2rgb (True)
     :type inverse: :class:`boolean`
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
     :return: color space converted array
     :rtype: ~numpy:np.ndarray
 
     """
 
     if not inverse:
-        arr = rgb2lab(img)
+        arr = rgb2lab(img, input_range=input_range)
     else:
         arr = lab2rgb(img)
 
     return arr
 
 
-def xyz2lab(xyz: np.ndarray = None) -> np.ndarray:
+def xyz2lab(xyz: np.ndarray = None, ref_white: np.ndarray = None) -> np.ndarray:
     """ Convert xyz color space to Lab color space
 
     :param xyz: input array in xyz space
     :type xyz: :class:`~numpy:numpy.ndarray`
+    :param ref_white: xyz values of the reference white with Y = 100 where None defaults to D65
+    :type ref_white: :class:`~numpy:numpy.ndarray`, optional
     :return: array in Lab space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    xyz[..., 0] /= REF_X
-    xyz[..., 1] /= REF_Y
-    xyz[..., 2] /= REF_Z
+    # normalize by reference white into a new array leaving the input untouched
+    xyz = xyz / (np.array([REF_X, REF_Y, REF_Z]) if ref_white is None else ref_white)
 
     for ch in range(xyz.shape[2]):
         mask = xyz[..., ch] > 0.008856
@@ -135,11 +166,13 @@ def xyz2lab(xyz: np.ndarray = None) -> np.ndarray:
     return lab
 
 
-def lab2xyz(lab: np.ndarray = None) -> np.ndarray:
+def lab2xyz(lab: np.ndarray = None, ref_white: np.ndarray = None) -> np.ndarray:
     """ Convert Lab color space to RGB color space
 
     :param lab: input array in Lab space
     :type lab: :class:`~numpy:numpy.ndarray`
+    :param ref_white: xyz values of the reference white with Y = 100 where None defaults to D65
+    :type ref_white: :class:`~numpy:numpy.ndarray`, optional
     :return: array in red, green and blue (RGB) space
     :rtype: ~numpy:np.ndarray
 
@@ -155,8 +188,221 @@ def lab2xyz(lab: np.ndarray = None) -> np.ndarray:
         xyz[..., ch][mask] = np.power(xyz[..., ch], 3)[mask]
         xyz[..., ch][~mask] = (xyz[..., ch] - 16 / 116.)[~mask] / 7.787
 
-    xyz[..., 0] *= REF_X
-    xyz[..., 1] *= REF_Y
-    xyz[..., 2] *= REF_Z
+    xyz *= np.array([REF_X, REF_Y, REF_Z]) if ref_white is None else ref_white
 
     return xyz
+
+
+def delta_e76(lab1: np.ndarray = None, lab2: np.ndarray = None) -> np.ndarray:
+    """ Compute CIE 1976 color difference as the Euclidean distance in Lab space
+
+    :param lab1: reference array in Lab space with channels in the last dimension
+    :type lab1: :class:`~numpy:numpy.ndarray`
+    :param lab2: sample array in Lab space broadcastable to the reference array
+    :type lab2: :class:`~numpy:numpy.ndarray`
+    :return: color difference array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    return np.sqrt(np.sum(np.square(lab1 - lab2), axis=-1))
+
+
+def delta_e94(lab1: np.ndarray = None, lab2: np.ndarray = None, textiles: bool = False) -> np.ndarray:
+    """ Compute CIE 1994 color difference where the first array serves as reference since the metric is not symmetric
+
+    :param lab1: reference array in Lab space with channels in the last dimension
+    :type lab1: :class:`~numpy:numpy.ndarray`
+    :param lab2: sample array in Lab space broadcastable to the reference array
+    :type lab2: :class:`~numpy:numpy.ndarray`
+    :param textiles: option that determines whether weights for textiles (True) or graphic arts (False) are used
+    :type textiles: bool, optional
+    :return: color difference array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # choose application weights
+    k_l, k_1, k_2 = (2., .048, .014) if textiles else (1., .045, .015)
+
+    c_1 = np.hypot(lab1[..., 1], lab1[..., 2])
+    c_2 = np.hypot(lab2[..., 1], lab2[..., 2])
+    d_l = lab1[..., 0] - lab2[..., 0]
+    d_c = c_1 - c_2
+    d_h2 = np.square(lab1[..., 1] - lab2[..., 1]) + np.square(lab1[..., 2] - lab2[..., 2]) - np.square(d_c)
+
+    return np.sqrt(np.square(d_l / k_l) + np.square(d_c / (1 + k_1 * c_1)) +
+                   np.maximum(d_h2, 0) / np.square(1 + k_2 * c_1))
+
+
+def delta_e2000(lab1: np.ndarray = None, lab2: np.ndarray = None) -> np.ndarray:
+    """ Compute CIEDE2000 color difference following Sharma et al. (2005) with unit parametric factors
+
+    :param lab1: reference array in Lab space with channels in the last dimension
+    :type lab1: :class:`~numpy:numpy.ndarray`
+    :param lab2: sample array in Lab space broadcastable to the reference array
+    :type lab2: :class:`~numpy:numpy.ndarray`
+    :return: color difference array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    l_1, a_1, b_1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    l_2, a_2, b_2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    # chroma compensation of the a axis
+    c_m7 = np.power((np.hypot(a_1, b_1) + np.hypot(a_2, b_2)) / 2, 7)
+    g = .5 * (1 - np.sqrt(c_m7 / (c_m7 + 25.**7)))
+    c_1 = np.hypot((1 + g) * a_1, b_1)
+    c_2 = np.hypot((1 + g) * a_2, b_2)
+    h_1 = np.degrees(np.arctan2(b_1, (1 + g) * a_1)) % 360
+    h_2 = np.degrees(np.arctan2(b_2, (1 + g) * a_2)) % 360
+
+    # hue difference and mean hue where achromatic colors have no hue
+    c_p = c_1 * c_2
+    d_h = h_2 - h_1
+    d_h = np.where(c_p == 0, 0, d_h - 360 * np.sign(d_h) * (np.abs(d_h) > 180))
+    h_s = h_1 + h_2
+    h_m = np.where(c_p == 0, h_s, (h_s + 360 * (np.abs(h_1 - h_2) > 180) * np.where(h_s < 360, 1, -1)) / 2)
+
+    d_l = l_2 - l_1
+    d_c = c_2 - c_1
+    d_hh = 2 * np.sqrt(c_p) * np.sin(np.radians(d_h / 2))
+
+    # weighting functions
+    l_m2 = np.square((l_1 + l_2) / 2 - 50)
+    c_m = (c_1 + c_2) / 2
+    t = 1 - .17 * np.cos(np.radians(h_m - 30)) + .24 * np.cos(np.radians(2 * h_m)) + \
+        .32 * np.cos(np.radians(3 * h_m + 6)) - .20 * np.cos(np.radians(4 * h_m - 63))
+    s_l = 1 + .015 * l_m2 / np.sqrt(20 + l_m2)
+    s_c = 1 + .045 * c_m
+    s_h = 1 + .015 * c_m * t
+    r_t = -2 * np.sqrt(np.power(c_m, 7) / (np.power(c_m, 7) + 25.**7)) * \
+        np.sin(np.radians(60 * np.exp(-np.square((h_m - 275) / 25))))
+
+    return np.sqrt(np.square(d_l / s_l) + np.square(d_c / s_c) + np.square(d_hh / s_h) +
+                   r_t * (d_c / s_c) * (d_hh / s_h))
+
+
+DELTA_E = {'76': delta_e76, '94': delta_e94, '2000': delta_e2000}
+
+
+def delta_e(arr1: np.ndarray = None, arr2: np.ndarray = None, method: str = '2000', space: str = 'lab',
+            chunk_size: int = 2**16, palette: bool = False, input_range: tuple = 'dtype') -> np.ndarray:
+    """ Compute color differences between two arrays in chunks of pixels to keep temporary memory bounded where RGB
+    inputs are converted to Lab chunk by chunk. Passing a palette of shape (K, 3) as second array together with the
+    palette flag yields the difference of each pixel to each palette color.
+
+    :param arr1: reference array in either Lab or RGB space with channels in the last dimension
+    :type arr1: :class:`~numpy:numpy.ndarray`
+    :param arr2: sample array of same shape as the reference array or palette with shape (K, 3)
+    :type arr2: :class:`~numpy:numpy.ndarray`
+    :param method: color difference formula with either '76', '94' or '2000'
+    :type method: str, optional
+    :param space: option that determines whether inputs are given in 'lab' or 'rgb' space
+    :type space: str, optional
+    :param chunk_size: number of pixels processed at once
+    :type chunk_size: int, optional
+    :param palette: option that determines whether the second array is a palette compared against each pixel
+    :type palette: bool, optional
+    :param input_range: lower and upper RGB input values mapped to 0 and 1 or 'dtype' (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: color difference array of shape arr1.shape[:-1] or arr1.shape[:-1] + (K,) for palettes
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if method not in DELTA_E:
+        raise BaseException('Color difference method \'%s\' not recognized' % method)
+
+    arr1, arr2 = np.asarray(arr1), np.asarray(arr2)
+    fun = DELTA_E[method]
+
+    # compare each pixel with each palette color
+    pal = bool(palette)
+    if pal and arr2.ndim != 2:
+        raise BaseException('Palette of shape (K, 3) expected, but got %s' % str(arr2.shape))
+    shape = arr1.shape[:-1] + ((arr2.shape[0],) if pal else ())
+
+    # reshape arrays to color vectors where a palette is converted once
+    arr1 = arr1.reshape(-1, 3)
+    arr2 = as_lab(arr2, space, input_range)[np.newaxis, ...] if pal else arr2.reshape(-1, 3)
+    step = max(1, chunk_size // arr2.shape[1]) if pal else chunk_size
+
+    res = np.empty((arr1.shape[0], arr2.shape[1]) if pal else arr1.shape[0])
+    for i in range(0, arr1.shape[0], step):
+        lab1 = as_lab(arr1[i:i+step], space, input_range)
+        res[i:i+step] = fun(lab1[:, np.newaxis, :], arr2) if pal else \
+            fun(lab1, as_lab(arr2[i:i+step], space, input_range))
+
+    return res.reshape(shape)
+
+
+def nearest_color(img: np.ndarray = None, palette: np.ndarray = None, method: str = '2000', space: str = 'lab',
+                  chunk_size: int = 2**16, input_range: tuple = 'dtype') -> (np.ndarray, np.ndarray):
+    """ Find the closest palette color for each pixel. The distinct image colors are indexed first so that each color
+    is compared against the palette only once, which happens in chunks such that a full pixel-by-palette distance
+    matrix is never allocated. For CIE76, candidates are additionally narrowed down by a grid index.
+
+    :param img: input array in either Lab or RGB space with channels in the last dimension
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param palette: palette array with shape (K, 3) in the same space as the input array
+    :type palette: :class:`~numpy:numpy.ndarray`
+    :param method: color difference formula with either '76', '94' or '2000'
+    :type method: str, optional
+    :param space: option that determines whether inputs are given in 'lab' or 'rgb' space
+    :type space: str, optional
+    :param chunk_size: maximum number of color differences computed at once
+    :type chunk_size: int, optional
+    :param input_range: lower and upper RGB input values mapped to 0 and 1 or 'dtype' (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: palette index map and color difference map both of shape img.shape[:-1]
+    :rtype: (~numpy:np.ndarray, ~numpy:np.ndarray)
+
+    """
+
+    if method not in DELTA_E:
+        raise BaseException('Color difference method \'%s\' not recognized' % method)
+
+    # index distinct colors
+    colors, inverse = unique_colors(img)
+    colors, palette = as_lab(colors, space, input_range), as_lab(np.asarray(palette).reshape(-1, 3), space, input_range)
+    fun = DELTA_E[method]
+
+    # use grid index for the Euclidean distance
+    if method == '76':
+        idx, dst = ColorQuantizer(palette, chunk_size=chunk_size).query(colors)
+        return idx[inverse].reshape(img.shape[:-1]), np.sqrt(dst)[inverse].reshape(img.shape[:-1])
+
+    idx = np.empty(colors.shape[0], dtype=np.intp)
+    dst = np.empty(colors.shape[0])
+    step = max(1, chunk_size // palette.shape[0])
+    for i in range(0, colors.shape[0], step):
+        res = fun(colors[i:i+step, np.newaxis, :], palette[np.newaxis, ...])
+        idx[i:i+step] = np.argmin(res, axis=-1)
+        dst[i:i+step] = np.take_along_axis(res, idx[i:i+step, np.newaxis], axis=-1)[:, 0]
+
+    return idx[inverse].reshape(img.shape[:-1]), dst[inverse].reshape(img.shape[:-1])
+
+
+def as_lab(arr: np.ndarray = None, space: str = 'lab', input_range: tuple = 'dtype') -> np.ndarray:
+    """ Provide an array in Lab space where RGB arrays are converted within a fixed input range so that each color
+    maps to the same Lab value regardless of the other colors
+
+    :param arr: array in either Lab or RGB space with channels in the last dimension
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :param space: option that determines whether inputs are given in 'lab' or 'rgb' space
+    :type space: str, optional
+    :param input_range: lower and upper RGB input values mapped to 0 and 1 or 'dtype' (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: array in Lab space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if space not in ('lab', 'rgb'):
+        raise BaseException('Color space \'%s\' not supported for color differences' % space)
+    elif space == 'lab':
+        return np.asarray(arr, dtype='float')
+
+    return rgb2lab(np.reshape(arr, (-1, 1, 3)), input_range=input_range).reshape(np.shape(arr))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.lab_converter import rgb2lab, lab2rgb
+from color_space_converter.oklab_converter import rgb2oklab, oklab2rgb
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import calc_dtype
+
+
+def lab2lch(lab: np.ndarray = None) -> np.ndarray:
+    """ Convert opponent color coordinates (e.g. Lab, Luv or Oklab) to lightness, chroma and hue in degrees
+
+    :param lab: input array with lightness and two opponent axes
+    :type lab: :class:`~numpy:numpy.ndarray`
+    :return: array in LCh space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    lab = np.asarray(lab, dtype=calc_dtype(lab))
+    lch = np.empty_like(lab)
+    lch[..., 0] = lab[..., 0]
+    np.hypot(lab[..., 1], lab[..., 2], out=lch[..., 1])
+    np.arctan2(lab[..., 2], lab[..., 1], out=lch[..., 2])
+    np.degrees(lch[..., 2], out=lch[..., 2])
+    np.mod(lch[..., 2], 360, out=lch[..., 2])
+
+    return lch
+
+
+def lch2lab(lch: np.ndarray = None) -> np.ndarray:
+    """ Convert lightness, chroma and hue in degrees to opponent color coordinates
+
+    :param lch: input array in LCh space
+    :type lch: :class:`~numpy:numpy.ndarray`
+    :return: array with lightness and two opponent axes
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    lch = np.asarray(lch, dtype=calc_dtype(lch))
+    hue = np.radians(lch[..., 2])
+
+    lab = np.empty_like(lch)
+    lab[..., 0] = lch[..., 0]
+    np.multiply(lch[..., 1], np.cos(hue), out=lab[..., 1])
+    np.multiply(lch[..., 1], np.sin(hue), out=lab[..., 2])
+
+    return lab
+
+
+def rgb2lch(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+            transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert RGB color space to CIE LCh color space (polar Lab)
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in LCh space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2lch, rgb, input_range=input_range, transfer=transfer, model=model)
+
+    return lab2lch(rgb2lab(rgb, input_range=input_range, transfer=transfer, model=model))
+
+
+def lch2rgb(lch: np.ndarray = None, unique: bool = False, transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert CIE LCh color space to RGB color space
+
+    :param lch: input array in LCh space
+    :type lch: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(lch):
+        return unique_conv(lch2rgb, lch, transfer=transfer, model=model)
+
+    return lab2rgb(lch2lab(lch), transfer=transfer, model=model)
+
+
+def rgb2oklch(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None) -> np.ndarray:
+    """ Convert RGB color space to OkLCh color space (polar Oklab)
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: array in OkLCh space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2oklch, rgb, input_range=input_range)
+
+    return lab2lch(rgb2oklab(rgb, input_range=input_range))
+
+
+def oklch2rgb(lch: np.ndarray = None, unique: bool = False) -> np.ndarray:
+    """ Convert OkLCh color space to RGB color space
+
+    :param lch: input array in OkLCh space
+    :type lch: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(lch):
+        return unique_conv(oklch2rgb, lch)
+
+    return oklab2rgb(lch2lab(lch))
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+from collections import namedtuple
+from functools import reduce
+
+
+class LinearStage(namedtuple('LinearStage', ['matrix', 'offset'])):
+    """
+    Affine color transform y = M x + b acting on the last axis of an array. Adjacent stages are composed ahead of time
+    by :meth:`then` or :func:`fuse` so that a chain of matrix conversions costs a single multiplication, which is
+    carried out as ``img @ M.T`` to yield a contiguous result without transposed copies.
+
+    :param matrix: matrix with one row per output channel and one column per input channel
+    :param offset: vector added to each output color (defaults to zeros)
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, matrix: np.ndarray = None, offset: np.ndarray = None):
+
+        mat = np.array(matrix, dtype='float64', ndmin=2)
+        off = np.zeros(mat.shape[0]) if offset is None else np.array(offset, dtype='float64').reshape(mat.shape[0])
+        mat.setflags(write=False)
+        off.setflags(write=False)
+
+        return super(LinearStage, cls).__new__(cls, mat, off)
+
+    def then(self, other: 'LinearStage' = None) -> 'LinearStage':
+        """ Compose this stage followed by another one into a single stage. """
+
+        return LinearStage(np.dot(other.matrix, self.matrix), np.dot(other.matrix, self.offset) + other.offset)
+
+    def inverse(self) -> 'LinearStage':
+        """ Provide the stage undoing this one where the matrix needs to be square. """
+
+        inv = np.linalg.inv(self.matrix)
+
+        return LinearStage(inv, -np.dot(inv, self.offset))
+
+    def __call__(self, arr: np.ndarray = None, dtype: np.dtype = None) -> np.ndarray:
+        """
+        Apply the stage to the last axis of an array.
+
+        :param arr: input array with as many channels as the matrix has columns
+        :type arr: :class:`~numpy:numpy.ndarray`
+        :param dtype: floating point type of the result (defaults to the promotion of input and matrix types)
+        :type dtype: :class:`~numpy:numpy.dtype`, optional
+        :return: contiguous array with as many channels as the matrix has rows
+        :rtype: ~numpy:np.ndarray
+        """
+
+        arr = np.asarray(arr)
+        dtype = np.result_type(arr.dtype, self.matrix.dtype) if dtype is None else np.dtype(dtype)
+
+        # cast once so that the product is computed by BLAS in the target precision
+        flat = arr.reshape(-1, self.matrix.shape[1]).astype(dtype, copy=False)
+        res = np.matmul(flat, self.matrix.T.astype(dtype, copy=False))
+        if self.offset.any():
+            res += self.offset.astype(dtype)
+
+        return res.reshape(arr.shape[:-1] + (self.matrix.shape[0],))
+
+
+def fuse(*stages: LinearStage) -> LinearStage:
+    """ Compose stages in the order of application into a single stage. """
+
+    return reduce(LinearStage.then, stages)
@@ -19,113 +19,148 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
-from color_space_converter.xyz_converter import XyzConverter, rgb2xyz, xyz2rgb
+from color_space_converter.linear_stage import LinearStage, fuse
+from color_space_converter.matrix_registry import register_matrix, get_matrix
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import XyzConverter, rgb2lin, lin2rgb, xyz_matrix
 
-MAT_LMS = np.array([[0.38971, 0.68898, -0.07868], [-0.22981, 1.18340, 0.04641], [0, 0, 1]])
+MAT_LMS = register_matrix('lms', [[0.38971, 0.68898, -0.07868], [-0.22981, 1.18340, 0.04641], [0, 0, 1]])
 
 # normalized to D65
 MAT_LMS_NORM = np.array([[0.4002, -0.2263, 0], [0.7076, 1.1653, 0], [-0.0808, 0, 0.9182]])
 
+# xyz to LMS and linear RGB to LMS via xyz with Y = 100 for white fused into a single stage
+LMS_STAGE = LinearStage(MAT_LMS)
+LMS_INV_STAGE = LinearStage(get_matrix('lms', inverse=True))
+LIN_LMS_STAGE = fuse(LinearStage(100 * xyz_matrix()), LMS_STAGE)
+register_matrix('lin_lms', LIN_LMS_STAGE.matrix)
+LIN_LMS_INV_STAGE = LinearStage(get_matrix('lin_lms', inverse=True))
+
 
 class LmsConverter(XyzConverter, ConverterBaseclass):
 
     def __init__(self, *args, **kwargs):
         super(LmsConverter, self).__init__(*args, **kwargs)
 
-    def lms_conv(self, img: np.ndarray = None, inverse: bool = False) -> np.ndarray:
+    def lms_conv(self, img: np.ndarray = None, inverse: bool = False, input_range: tuple = None) -> np.ndarray:
         """ Convert RGB color space to LMS color space or vice versa given the inverse option.
 
         :param img: input array in either RGB or HSV color space
         :type img: :class:`~numpy:numpy.ndarray`
         :param inverse: option that determines whether conversion is from rgb2hsv (False) or hsv2rgb (True)
         :type inverse: :class:`boolean`
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
         :return: color space converted array
         :rtype: ~numpy:np.ndarray
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
+        rng = input_range if input_range is not None else self._rng
 
-        if not self._inv:
-            self._arr = rgb2lms(self._arr)
+        if not inv:
+            arr = rgb2lms(arr, input_range=rng)
         else:
-            self._arr = lms2rgb(self._arr)
+            arr = lms2rgb(arr)
 
-        return self._arr
+        return arr
 
 
-def rgb2lms(rgb: np.ndarray = None) -> np.ndarray:
+def rgb2lms(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+            transfer: str = 'sRGB', model=None) -> np.ndarray:
     """ Convert RGB color space to LMS color space
 
     :param rgb: input array in red, green and blue (RGB) space
     :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
     :return: array in long, medium and short (LMS) space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    # store shape
-    shape = rgb.shape
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2lms, rgb, input_range=input_range, transfer=transfer, model=model)
 
-    # convert to xyz space
-    xyz = rgb2xyz(rgb)
+    # other models than sRGB pass through their own xyz matrix
+    if model is not None:
+        return LMS_STAGE(model.rgb2xyz(rgb, input_range=input_range))
 
-    # reshape image to channel vectors
-    xyz = xyz.reshape(-1, 3).T
+    # decode to linear RGB and convert to lms space by a single matrix product
+    lin = rgb2lin(rgb, input_range=input_range, transfer=transfer)
 
-    # convert to lms space
-    lms = np.dot(MAT_LMS, xyz)
+    return LIN_LMS_STAGE(lin)
 
-    # reshape to 2-D image
-    lms = lms.T.reshape(shape)
 
-    return lms
+def xyz2lms(xyz: np.ndarray = None) -> np.ndarray:
+    """ Convert xyz space to LMS color space
 
+    :param xyz: input array in xyz space
+    :type xyz: :class:`~numpy:numpy.ndarray`
+    :return: array in long, medium and short (LMS) space
+    :rtype: ~numpy:np.ndarray
+
+    """
 
-def lms2rgb(lms: np.ndarray = None) -> np.ndarray:
-    """ Convert HSV color space to RGB color space
+    return LMS_STAGE(xyz)
+
+
+def lms2rgb(lms: np.ndarray = None, unique: bool = False, transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert LMS color space to RGB color space
 
     :param lms: input array in long, medium and short (LMS) space
     :type lms: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
     :return: array in red, green and blue (RGB) space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    # store shape
-    shape = lms.shape
-
-    # reshape image to channel vectors
-    lms = lms.reshape(-1, 3).T
-
-    # convert to xyz space
-    xyz = np.dot(np.linalg.inv(MAT_LMS), lms)
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(lms):
+        return unique_conv(lms2rgb, lms, transfer=transfer, model=model)
 
-    # reshape to 2-D image
-    xyz = xyz.T.reshape(shape)
+    # other models than sRGB pass through their own xyz matrix
+    if model is not None:
+        return model.xyz2rgb(LMS_INV_STAGE(lms))
 
-    # convert to rgb space
-    rgb = xyz2rgb(xyz)
+    # convert to linear RGB by a single matrix product and encode
+    lin = LIN_LMS_INV_STAGE(lms)
 
-    return rgb
+    return lin2rgb(lin, transfer=transfer)
 
 
-def lms_conv(img: np.ndarray = None, inverse: bool = False) -> np.ndarray:
+def lms_conv(img: np.ndarray = None, inverse: bool = False, input_range: tuple = None) -> np.ndarray:
     """ Convert RGB color space to LMS color space or vice versa given the inverse option.
 
     :param img: input array in either RGB or HSV color space
     :type img: :class:`~numpy:numpy.ndarray`
     :param inverse: option that determines whether conversion is from rgb2hsv (False) or hsv2rgb (True)
     :type inverse: :class:`boolean`
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
     :return: color space converted array
     :rtype: ~numpy:np.ndarray
 
     """
 
     if not inverse:
-        arr = rgb2lms(img)
+        arr = rgb2lms(img, input_range=input_range)
     else:
         arr = lms2rgb(img)
 
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.lab_converter import REF_X, REF_Y, REF_Z
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import rgb2lin, lin2rgb, lin2xyz, xyz2lin, calc_dtype
+
+# CIE constants for the linear segment near black
+EPSILON = 216 / 24389.
+KAPPA = 24389 / 27.
+
+
+def rgb2luv(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None,
+            transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert RGB color space to CIELUV color space
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in Luv space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2luv, rgb, input_range=input_range, transfer=transfer, model=model)
+
+    if model is not None:
+        return xyz2luv(model.rgb2xyz(rgb, input_range=input_range), ref_white=model.white_xyz)
+
+    return xyz2luv(lin2xyz(rgb2lin(rgb, input_range=input_range, transfer=transfer)))
+
+
+def luv2rgb(luv: np.ndarray = None, unique: bool = False, transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert CIELUV color space to RGB color space
+
+    :param luv: input array in Luv space
+    :type luv: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value (see :func:`rgb2lin`)
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace sRGB with D65 (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(luv):
+        return unique_conv(luv2rgb, luv, transfer=transfer, model=model)
+
+    if model is not None:
+        return model.xyz2rgb(luv2xyz(luv, ref_white=model.white_xyz))
+
+    return lin2rgb(xyz2lin(luv2xyz(luv)), transfer=transfer)
+
+
+def xyz2luv(xyz: np.ndarray = None, ref_white: np.ndarray = None) -> np.ndarray:
+    """ Convert xyz space to CIELUV color space given the reference white
+
+    :param xyz: input array in xyz space
+    :type xyz: :class:`~numpy:numpy.ndarray`
+    :param ref_white: xyz values of the reference white with Y = 100 where None defaults to D65
+    :type ref_white: :class:`~numpy:numpy.ndarray`, optional
+    :return: array in Luv space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    xyz = np.asarray(xyz, dtype=calc_dtype(xyz))
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    ref_x, ref_y, ref_z = (REF_X, REF_Y, REF_Z) if ref_white is None else ref_white
+
+    # chromaticity of reference white and pixels where black maps to the white point
+    den_ref = ref_x + 15 * ref_y + 3 * ref_z
+    den = x + 15 * y + 3 * z
+    den[den == 0] = np.inf
+
+    luv = np.empty_like(xyz)
+    yr = y / ref_y
+    luv[..., 0] = np.where(yr > EPSILON, 116 * np.cbrt(yr) - 16, KAPPA * yr)
+    luv[..., 1] = 13 * luv[..., 0] * (4 * x / den - 4 * ref_x / den_ref)
+    luv[..., 2] = 13 * luv[..., 0] * (9 * y / den - 9 * ref_y / den_ref)
+
+    return luv
+
+
+def luv2xyz(luv: np.ndarray = None, ref_white: np.ndarray = None) -> np.ndarray:
+    """ Convert CIELUV color space to xyz space given the reference white
+
+    :param luv: input array in Luv space
+    :type luv: :class:`~numpy:numpy.ndarray`
+    :param ref_white: xyz values of the reference white with Y = 100 where None defaults to D65
+    :type ref_white: :class:`~numpy:numpy.ndarray`, optional
+    :return: array in xyz space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    luv = np.asarray(luv, dtype=calc_dtype(luv))
+    lum = luv[..., 0]
+    ref_x, ref_y, ref_z = (REF_X, REF_Y, REF_Z) if ref_white is None else ref_white
+
+    # chromaticity from opponent axes where zero lightness yields black
+    den_ref = ref_x + 15 * ref_y + 3 * ref_z
+    den = np.where(lum == 0, np.inf, 13 * lum)
+    u = luv[..., 1] / den + 4 * ref_x / den_ref
+    v = luv[..., 2] / den + 9 * ref_y / den_ref
+
+    xyz = np.empty_like(luv)
+    xyz[..., 1] = ref_y * np.where(lum > KAPPA * EPSILON, ((lum + 16) / 116) ** 3, lum / KAPPA)
+    scale = np.divide(xyz[..., 1], 4 * v, out=np.zeros_like(v), where=v != 0)
+    xyz[..., 0] = 9 * u * scale
+    xyz[..., 2] = (12 - 3 * u - 20 * v) * scale
+
+    return xyz
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+# forward matrices by name which converter modules register on import and their inverses derived on first request
+_FORWARD = {}
+_INVERSE = {}
+
+
+def register_matrix(name: str = None, mat: np.ndarray = None) -> np.ndarray:
+    """
+    Register a forward matrix whose inverse is derived once on first request by :func:`get_matrix`.
+
+    :param name: unique matrix name, e.g. 'yuv_hdtv'
+    :type name: str
+    :param mat: matrix mapping input channels (columns) to output channels (rows)
+    :type mat: :class:`~numpy:numpy.ndarray`
+    :return: read-only copy of the matrix
+    :rtype: ~numpy:np.ndarray
+    """
+
+    mat = np.array(mat, dtype='float64', ndmin=2)
+    mat.setflags(write=False)
+    _FORWARD[name] = mat
+    _INVERSE.pop(name, None)
+
+    return mat
+
+
+def get_matrix(name: str = None, inverse: bool = False) -> np.ndarray:
+    """
+    Provide a registered matrix or its exact inverse, which is computed only once.
+
+    :param name: registered matrix name (see :func:`matrix_names`)
+    :type name: str
+    :param inverse: option to obtain the inverse matrix
+    :type inverse: bool, optional
+    :return: read-only matrix
+    :rtype: ~numpy:np.ndarray
+    """
+
+    if name not in _FORWARD:
+        raise BaseException('Matrix %r not registered. Available matrices are %s' % (name, ', '.join(_FORWARD)))
+
+    mat = _FORWARD[name]
+    if not inverse:
+        return mat
+
+    if name not in _INVERSE:
+        if mat.shape[0] != mat.shape[1]:
+            raise BaseException('Matrix %r of shape %s is not invertible' % (name, mat.shape))
+        inv = np.linalg.inv(mat)
+        inv.setflags(write=False)
+        _INVERSE[name] = inv
+
+    return _INVERSE[name]
+
+
+def has_matrix(name: str = None) -> bool:
+    """ Check whether a matrix is registered, e.g. to derive it only once """
+
+    return name in _FORWARD
+
+
+def matrix_names() -> list:
+    """ Provide the names of all registered matrices for inspection """
+
+    return sorted(_FORWARD)
+
+
+def round_trip_error(name: str = None) -> float:
+    """ Maximum absolute deviation of a registered matrix times its inverse from the identity """
+
+    mat = get_matrix(name)
+
+    return float(np.abs(np.dot(get_matrix(name, inverse=True), mat) - np.eye(len(mat))).max())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.converter_baseclass import as_array
+from color_space_converter.gry_converter import rgb2gry
+from color_space_converter.hsv_converter import hue_chroma
+from color_space_converter.ictcp_converter import lin2ictcp
+from color_space_converter.jzazbz_converter import xyz2jzazbz
+from color_space_converter.lab_converter import xyz2lab
+from color_space_converter.lch_converter import lab2lch
+from color_space_converter.lms_converter import xyz2lms
+from color_space_converter.luv_converter import xyz2luv
+from color_space_converter.oklab_converter import lin2oklab
+from color_space_converter.registry import METHODS, get_converter
+from color_space_converter.transfer_functions import srgb_decode
+from color_space_converter.xyz_converter import normalize_input, lin2xyz, input_bounds, input_white
+from color_space_converter.yuv_converter import rgb2yuv
+
+# number of pixels processed at once such that intermediates of a tile stay in cache
+TILE_SIZE = 2**16
+
+
+class StageCache(dict):
+
+    def __init__(self, rgb: np.ndarray = None, input_range: tuple = None, standard: str = 'HDTV', white: float = 1.):
+        """
+
+        Intermediates of an image tile which are computed once on first request. Stages are looked up in
+        :data:`STAGES` while other registered methods fall back to their converter.
+
+        :param rgb: input tile in RGB space
+        :param input_range: lower and upper input values mapped to 0 and 1
+        :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+        :param white: nominal RGB maximum of spaces preserving the input scale (see :func:`rgb2hsl`)
+        """
+
+        super(StageCache, self).__init__(rgb=rgb)
+        self.rng = input_range
+        self.stn = standard
+        self.white = white
+
+    def __missing__(self, key: str) -> np.ndarray:
+
+        if key in STAGES:
+            self[key] = STAGES[key](self)
+        else:
+            self[key] = get_converter(key)(self['rgb'], standard=self.stn, input_range=self.rng, white=self.white)
+
+        return self[key]
+
+    def target(self, method: str = None) -> np.ndarray:
+        """
+        This function provides a target space from the shared stages unless its method has been registered anew, in
+        which case the registered converter is used while the stage remains available as intermediate of others.
+
+        :param method: registered color space
+        :return: converted tile
+        """
+
+        conv = get_converter(method)
+        if method in STAGES and conv.forward is BUILTINS.get(method):
+            return self[method]
+
+        return conv(self['rgb'], standard=self.stn, input_range=self.rng, white=self.white)
+
+
+def hcm2hsv(cache: StageCache = None) -> np.ndarray:
+    """ compose HSV from the shared hue, maximum and chroma """
+
+    hue, maxv, chroma = cache['hcm']
+
+    return np.stack([hue, chroma / (maxv + np.spacing(1)), maxv], axis=-1)
+
+
+def hcm2hsi(cache: StageCache = None) -> np.ndarray:
+    """ compose HSI from the shared hue, maximum and chroma """
+
+    hue, maxv, chroma = cache['hcm']
+    inty = np.mean(cache['flt'], axis=-1)
+
+    return np.stack([hue, (inty - (maxv - chroma)) / (inty + np.spacing(1)), inty], axis=-1)
+
+
+def hcm2hsl(cache: StageCache = None) -> np.ndarray:
+    """ compose HSL from the shared hue, maximum and chroma """
+
+    hue, maxv, chroma = cache['hcm']
+    mid = 2 * maxv - chroma
+    white = cache.white
+
+    return np.stack([hue, chroma / (white + np.spacing(white) - np.abs(mid - white)), mid / 2], axis=-1)
+
+
+# stages computing an intermediate or target space from a tile's cache
+STAGES = {
+    # shared intermediates
+    'flt': lambda c: np.asarray(c['rgb'], dtype='float'),
+    'hcm': lambda c: hue_chroma(c['flt']),
+    'nrm': lambda c: normalize_input(c['rgb'], input_range=c.rng),
+    'lin': lambda c: srgb_decode(c['nrm']),
+    'xyz': lambda c: lin2xyz(c['lin']),
+    # target spaces
+    'gry': lambda c: rgb2gry(c['rgb'], standard=c.stn),
+    'yuv': lambda c: rgb2yuv(c['rgb'], standard=c.stn),
+    'hsv': hcm2hsv,
+    'hsi': hcm2hsi,
+    'hsl': hcm2hsl,
+    'lab': lambda c: xyz2lab(c['xyz']),
+    'lch': lambda c: lab2lch(c['lab']),
+    'lms': lambda c: xyz2lms(c['xyz']),
+    'luv': lambda c: xyz2luv(c['xyz']),
+    'jzazbz': lambda c: xyz2jzazbz(c['xyz']),
+    'oklab': lambda c: lin2oklab(c['lin']),
+    'oklch': lambda c: lab2lch(c['oklab']),
+    'ictcp': lambda c: lin2ictcp(c['lin']),
+}
+
+# forward functions of built-in spaces whose stages are only used as long as these remain registered
+BUILTINS = {method: get_converter(method).forward for method in METHODS if method in STAGES}
+
+
+def convert_many(img: np.ndarray = None, methods: list = None, standard: str = 'HDTV', input_range: tuple = None,
+                 tile_size: int = TILE_SIZE) -> dict:
+    """
+    Convert an image to several color spaces in a single traversal. The image is processed in tiles of rows where
+    intermediates such as the float cast, channel maximum and chroma, linear RGB and xyz are computed once per tile
+    and shared by all targets. The input range is resolved from the entire image beforehand so that results match
+    those of :func:`convert`.
+
+    :param img: input array in RGB space (or any object supported by :func:`as_array`)
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param methods: registered color spaces where None selects all of them
+    :type methods: list, optional
+    :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+    :type standard: :class:`string`
+    :param input_range: lower and upper input values mapped to 0 and 1 (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param tile_size: approximate number of pixels per tile
+    :type tile_size: int, optional
+    :return: converted arrays by method
+    :rtype: dict
+    """
+
+    # add third image dimension for monochromatic images
+    arr = as_array(img)
+    arr = arr[..., np.newaxis] if arr.ndim == 2 else arr
+
+    methods = list(METHODS) if methods is None else list(methods)
+    for method in methods:
+        get_converter(method)
+
+    # resolve input range of the entire image and the white of spaces preserving the input scale
+    rng = input_bounds(arr, input_range)
+    white = input_white(arr, input_range)
+
+    # number of rows per tile
+    step = max(1, tile_size // max(1, int(np.prod(arr.shape[1:-1]))))
+
+    res = dict()
+    for i in range(0, arr.shape[0], step):
+        cache = StageCache(arr[i:i+step], input_range=rng, standard=standard, white=white)
+        for method in methods:
+            out = cache.target(method)
+            if method not in res:
+                res[method] = np.empty(arr.shape[:-1] + out.shape[-1:], dtype='float')
+            res[method][i:i+step] = out
+
+    return res
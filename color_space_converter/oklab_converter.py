@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.matrix_registry import register_matrix, get_matrix
+from color_space_converter.unique_colors import low_cardinality, unique_conv
+from color_space_converter.xyz_converter import rgb2lin, lin2rgb, calc_dtype
+
+# https://bottosson.github.io/posts/oklab/
+
+# linear sRGB to cone response
+MAT_OKLAB_LMS = np.array([[0.4122214708, 0.5363325363, 0.0514459929],
+                          [0.2119034982, 0.6806995451, 0.1073969566],
+                          [0.0883024619, 0.2817188376, 0.6299787005]])
+register_matrix('oklab_lms', MAT_OKLAB_LMS)
+
+# non-linear cone response to lightness and opponent axes
+MAT_OKLAB = np.array([[0.2104542553, 0.7936177850, -0.0040720468],
+                      [1.9779984951, -2.4285922050, 0.4505937099],
+                      [0.0259040371, 0.7827717662, -0.8086757660]])
+register_matrix('oklab', MAT_OKLAB)
+
+
+def rgb2oklab(rgb: np.ndarray = None, unique: bool = False, input_range: tuple = None) -> np.ndarray:
+    """ Convert RGB color space to Oklab color space
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: array in Oklab space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2oklab, rgb, input_range=input_range)
+
+    return lin2oklab(rgb2lin(rgb, input_range=input_range))
+
+
+def oklab2rgb(lab: np.ndarray = None, unique: bool = False) -> np.ndarray:
+    """ Convert Oklab color space to RGB color space
+
+    :param lab: input array in Oklab space
+    :type lab: :class:`~numpy:numpy.ndarray`
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(lab):
+        return unique_conv(oklab2rgb, lab)
+
+    return lin2rgb(oklab2lin(lab))
+
+
+def lin2oklab(lin: np.ndarray = None) -> np.ndarray:
+    """ Convert linear RGB to Oklab color space
+
+    :param lin: linear RGB array ranging from 0 to 1 (see :func:`rgb2lin`)
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :return: array in Oklab space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    dtype = calc_dtype(lin)
+    lms = np.cbrt(np.matmul(lin, MAT_OKLAB_LMS.T.astype(dtype)))
+
+    return np.matmul(lms, MAT_OKLAB.T.astype(dtype))
+
+
+def oklab2lin(lab: np.ndarray = None) -> np.ndarray:
+    """ Convert Oklab color space to linear RGB
+
+    :param lab: input array in Oklab space
+    :type lab: :class:`~numpy:numpy.ndarray`
+    :return: linear RGB array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    dtype = calc_dtype(lab)
+    lms = np.matmul(lab, get_matrix('oklab', inverse=True).T.astype(dtype))
+    lms *= lms * lms
+
+    return np.matmul(lms, get_matrix('oklab_lms', inverse=True).T.astype(dtype))
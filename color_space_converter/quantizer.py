@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+
+class ColorQuantizer(object):
+
+    def __init__(self, palette: np.ndarray = None, grid: int = 32, bounds: tuple = None, chunk_size: int = 2**18):
+        """
+
+        The color quantizer maps colors to their nearest palette color in terms of the Euclidean distance, which makes
+        it suitable for perceptual spaces such as Lab (where the distance equals the CIE76 color difference) or YUV.
+        A uniform grid is laid over the palette once, where each cell stores the palette colors that may be nearest
+        to any point inside that cell. A query then only compares against the few candidates of its cell instead of
+        the entire palette. The approximate mode instead returns the palette color nearest to the cell center.
+
+        :param palette: palette array with shape (K, 3) in the space that queries are provided in
+        :param grid: number of grid cells along each axis
+        :param bounds: lower and upper corner of the grid (e.g. the value range of the space) defaulting to palette bounds
+        :param chunk_size: maximum number of distances computed at once
+        """
+
+        self._pal = np.asarray(palette, dtype='float').reshape(-1, 3)
+        self._num = grid
+        self._chunk = chunk_size
+
+        if self._pal.shape[0] == 0:
+            raise BaseException('Palette must contain at least one color')
+
+        # grid bounds and cell size where queries outside the grid are compared with the entire palette
+        self._lo = self._pal.min(axis=0) if bounds is None else np.asarray(bounds[0], dtype='float')
+        self._hi = self._pal.max(axis=0) if bounds is None else np.asarray(bounds[1], dtype='float')
+        self._size = np.maximum(self._hi - self._lo, np.spacing(1)) / self._num
+
+        self._cand, self._cnt = self.build_cells()
+
+        # palette with an additional color at infinity addressed by padded candidate entries (-1)
+        self._pts = np.vstack([self._pal, np.full((1, 3), np.inf)])
+
+    def build_cells(self) -> (np.ndarray, np.ndarray):
+        """
+        This function determines the candidate list of each cell and its palette color closest to the cell center.
+        A palette color is a candidate if its minimum distance to the cell does not exceed the smallest maximum
+        distance of any palette color to that cell, which guarantees that the nearest color is among the candidates.
+        Candidate lists are sorted by distance to the cell center and padded with -1 to the longest list.
+        """
+
+        # squared distances are separable so that per axis terms of shape (cells along axis, K) are computed once
+        lo = (self._lo[:, np.newaxis] + np.arange(self._num) * self._size[:, np.newaxis])[..., np.newaxis]
+        hi = lo + self._size[:, np.newaxis, np.newaxis]
+        pal = self._pal.T[:, np.newaxis, :]
+        min_axs = np.square(np.maximum(np.maximum(lo - pal, pal - hi), 0))
+        max_axs = np.square(np.maximum(np.abs(pal - lo), np.abs(pal - hi)))
+        cen_axs = np.square((lo + hi) / 2 - pal)
+
+        # extract candidates for one slab of cells along the first axis at a time to keep temporary memory bounded
+        num = np.empty((self._num, self._num**2), dtype=np.intp)
+        slabs = []
+        for i in range(self._num):
+            min_dist = min_axs[0, i] + min_axs[1, :, np.newaxis] + min_axs[2, np.newaxis]
+            max_dist = max_axs[0, i] + max_axs[1, :, np.newaxis] + max_axs[2, np.newaxis]
+            mask = (min_dist <= np.min(max_dist, axis=-1, keepdims=True)).reshape(-1, self._pal.shape[0])
+            cent = (cen_axs[0, i] + cen_axs[1, :, np.newaxis] + cen_axs[2, np.newaxis]).reshape(mask.shape)
+
+            # order candidates by distance to cell center where non-candidates are moved to the end
+            cent[~mask] = np.inf
+            num[i] = np.count_nonzero(mask, axis=-1)
+            cand = np.argpartition(cent, num[i].max() - 1, axis=-1)[:, :num[i].max()]
+            slabs.append(np.take_along_axis(cand, np.argsort(np.take_along_axis(cent, cand, axis=-1)), axis=-1))
+
+        # pad candidate lists with -1 to the longest list
+        num = num.ravel()
+        table = np.full((num.size, num.max()), -1, dtype=np.intp)
+        for i, cand in enumerate(slabs):
+            table[i*self._num**2:(i+1)*self._num**2, :cand.shape[1]] = cand
+        table[np.arange(table.shape[1]) >= num[:, np.newaxis]] = -1
+
+        return table, num
+
+    def query(self, vecs: np.ndarray = None, exact: bool = True) -> (np.ndarray, np.ndarray):
+        """
+        This function finds the nearest palette color for each color vector. Points in cells with a single candidate
+        are resolved by lookup while the remaining points are grouped by the candidate count of their cell so that
+        distances are only computed for a minimum of padded candidates.
+
+        :param vecs: color vectors with shape (N, 3)
+        :param exact: option that determines whether the nearest color is guaranteed (True) or approximated (False)
+        :return: palette indices and squared distances both of length N
+        """
+
+        vecs = np.asarray(vecs, dtype='float').reshape(-1, 3)
+
+        # locate cells where points outside the grid are treated separately
+        ijk = np.floor((vecs - self._lo) / self._size).astype(np.intp)
+        out = np.any((vecs < self._lo) | (vecs > self._hi), axis=-1)
+        np.clip(ijk, 0, self._num - 1, out=ijk)
+        cell = (ijk[:, 0] * self._num + ijk[:, 1]) * self._num + ijk[:, 2]
+
+        # closest candidate to cell center serves as approximation and as result for single candidate cells
+        idx = self._cand[cell, 0]
+
+        if exact:
+            # compare inside points with candidates of their cell grouped by power of two candidate counts
+            width = np.where(out, 0, 2**np.ceil(np.log2(self._cnt[cell])).astype(np.intp))
+            for w in np.unique(width[width > 1]):
+                pts = np.flatnonzero(width == w)
+                step = max(1, self._chunk // w)
+                for i in range(0, len(pts), step):
+                    sel = pts[i:i+step]
+                    cand = self._cand[cell[sel], :w]
+                    dist = np.sum(np.square(vecs[sel, np.newaxis, :] - self._pts[cand]), axis=-1)
+                    idx[sel] = cand[np.arange(len(sel)), np.argmin(dist, axis=-1)]
+
+            # compare outside points with the entire palette
+            pts = np.flatnonzero(out)
+            idx[pts] = nearest_brute(vecs[pts], self._pal, chunk_size=self._chunk)[0]
+
+        return idx, np.sum(np.square(vecs - self._pal[idx]), axis=-1)
+
+    def quantize(self, img: np.ndarray = None, exact: bool = True, index: bool = False) -> np.ndarray:
+        """
+        This function replaces each pixel by its nearest palette color or alternatively provides the index map.
+
+        :param img: input array with channels in the last dimension
+        :param exact: option that determines whether the nearest color is guaranteed (True) or approximated (False)
+        :param index: option that determines whether palette indices (True) or colors (False) are returned
+        :return: quantized image or palette index map
+        """
+
+        idx = np.empty(img.shape[:-1], dtype=np.intp)
+        vecs = img.reshape(-1, img.shape[-1])
+        out = idx.reshape(-1)
+
+        # process image in chunks to keep temporary memory bounded
+        for i in range(0, vecs.shape[0], self._chunk):
+            out[i:i+self._chunk] = self.query(vecs[i:i+self._chunk], exact=exact)[0]
+
+        return idx if index else self._pal[idx]
+
+    @property
+    def palette(self):
+        """ getter for palette colors """
+        return self._pal
+
+
+def nearest_brute(vecs: np.ndarray = None, palette: np.ndarray = None, chunk_size: int = 2**18) \
+        -> (np.ndarray, np.ndarray):
+    """ Find the nearest palette color for each color vector by comparing against all palette colors in chunks
+
+    :param vecs: color vectors with shape (N, 3)
+    :type vecs: :class:`~numpy:numpy.ndarray`
+    :param palette: palette array with shape (K, 3)
+    :type palette: :class:`~numpy:numpy.ndarray`
+    :param chunk_size: maximum number of distances computed at once
+    :type chunk_size: int, optional
+    :return: palette indices and squared distances both of length N
+    :rtype: (~numpy:np.ndarray, ~numpy:np.ndarray)
+
+    """
+
+    vecs = np.asarray(vecs, dtype='float').reshape(-1, 3)
+    palette = np.asarray(palette, dtype='float').reshape(-1, 3)
+    idx = np.empty(vecs.shape[0], dtype=np.intp)
+
+    # expand squared distance to make use of matrix multiplication where the query norm does not affect the minimum
+    norm = np.sum(np.square(palette), axis=-1)
+    step = max(1, chunk_size // palette.shape[0])
+    for i in range(0, vecs.shape[0], step):
+        idx[i:i+step] = np.argmin(norm - 2 * np.dot(vecs[i:i+step], palette.T), axis=-1)
+
+    return idx, np.sum(np.square(vecs - palette[idx]), axis=-1)
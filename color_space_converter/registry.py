@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+from bisect import insort
+
+from color_space_converter.converter_baseclass import as_array
+from color_space_converter.gamut import map_gamut
+from color_space_converter.gry_converter import rgb2gry, gry2ch3
+from color_space_converter.hsv_converter import rgb2hsv, hsv2rgb, rgb2hsl, hsl2rgb, rgb2hsi, hsi2rgb
+from color_space_converter.lab_converter import rgb2lab, lab2rgb
+from color_space_converter.lms_converter import rgb2lms, lms2rgb
+from color_space_converter.xyz_converter import rgb2xyz, xyz2rgb
+from color_space_converter.yuv_converter import rgb2yuv, yuv2rgb
+from color_space_converter.oklab_converter import rgb2oklab, oklab2rgb
+from color_space_converter.luv_converter import rgb2luv, luv2rgb
+from color_space_converter.lch_converter import rgb2lch, lch2rgb, rgb2oklch, oklch2rgb
+from color_space_converter.ictcp_converter import rgb2ictcp, ictcp2rgb
+from color_space_converter.jzazbz_converter import rgb2jzazbz, jzazbz2rgb
+
+# registered converters by method name and sorted method names kept in sync
+CONVERTERS = {}
+METHODS = []
+
+
+class Converter(object):
+
+    __slots__ = ('name', 'forward', 'backward', 'fwd_opts', 'inv_opts')
+
+    def __init__(self, name: str, forward, backward, fwd_opts: tuple = (), inv_opts: tuple = ()):
+        """
+
+        Stateless converter pairing the forward conversion from RGB with its inverse. Objects hold no image data so
+        that a single instance can be shared across requests and threads.
+
+        :param name: method name
+        :param forward: function converting from RGB
+        :param backward: function converting to RGB
+        :param fwd_opts: keyword arguments passed on to the forward function
+        :param inv_opts: keyword arguments passed on to the backward function
+        """
+
+        self.name = name
+        self.forward = forward
+        self.backward = backward
+        self.fwd_opts = tuple(fwd_opts)
+        self.inv_opts = tuple(inv_opts)
+
+    def __call__(self, img: np.ndarray = None, inverse: bool = False, **kwargs) -> np.ndarray:
+        """
+        This function converts an image where options not supported by the respective direction are ignored.
+
+        :param img: input array (or any object supported by :func:`as_array`)
+        :param inverse: option that determines whether conversion is to RGB (True) or from RGB (False)
+        :param kwargs: options such as 'standard' or 'input_range' where None values are skipped while inverse
+                       conversions additionally accept 'gamut', 'dtype' and 'white' (see :func:`map_gamut`)
+        :return: color space converted array
+        """
+
+        fun, opts = (self.backward, self.inv_opts) if inverse else (self.forward, self.fwd_opts)
+
+        # add third image dimension for monochromatic images
+        img = as_array(img)
+        img = img[..., np.newaxis] if img.ndim == 2 else img
+
+        res = fun(img, **{key: kwargs[key] for key in opts if kwargs.get(key) is not None})
+
+        # bring RGB into gamut and quantize within the result unless it shares memory with the input
+        if inverse and (kwargs.get('gamut') is not None or kwargs.get('dtype') is not None):
+            gamut = kwargs.get('gamut') or 'clip'
+            opts = {'transfer': kwargs['transfer']} if gamut == 'chroma' and kwargs.get('transfer') is not None else {}
+            res = map_gamut(res, method=gamut, dtype=kwargs.get('dtype'), white=kwargs.get('white') or 1.,
+                            inplace=not np.may_share_memory(res, img), **opts)
+
+        return res
+
+    def __repr__(self) -> str:
+        return '%s(%r)' % (self.__class__.__name__, self.name)
+
+
+def register(name: str, forward, backward, fwd_opts: tuple = (), inv_opts: tuple = ()) -> Converter:
+    """
+    Register a color space so that it is available to :class:`ColorSpaceConverter`, the command line interface and
+    :func:`get_converter`. Existing names are replaced.
+
+    :param name: method name
+    :type name: :class:`str`
+    :param forward: function converting from RGB taking an image as first argument
+    :param backward: function converting to RGB taking an image as first argument
+    :param fwd_opts: keyword arguments passed on to the forward function, e.g. ('standard', 'input_range')
+    :type fwd_opts: tuple, optional
+    :param inv_opts: keyword arguments passed on to the backward function
+    :type inv_opts: tuple, optional
+    :return: registered converter
+    :rtype: :class:`Converter`
+    """
+
+    if not isinstance(name, str) or not callable(forward) or not callable(backward):
+        raise BaseException('Registration requires a method name and callable forward and backward functions')
+
+    if name not in CONVERTERS:
+        insort(METHODS, name)
+    CONVERTERS[name] = Converter(name, forward, backward, fwd_opts, inv_opts)
+
+    return CONVERTERS[name]
+
+
+def unregister(name: str) -> None:
+    """
+    Remove a registered color space.
+
+    :param name: method name
+    :type name: :class:`str`
+    """
+
+    if CONVERTERS.pop(name, None) is not None:
+        METHODS.remove(name)
+
+
+def get_converter(name: str) -> Converter:
+    """
+    Look up the converter of a method name.
+
+    :param name: method name
+    :type name: :class:`str`
+    :return: registered converter
+    :rtype: :class:`Converter`
+    """
+
+    try:
+        return CONVERTERS[name]
+    except (KeyError, TypeError):
+        raise BaseException('Conversion method \'%s\' not recognized' % name)
+
+
+# built-in color spaces
+register('gry', rgb2gry, gry2ch3, fwd_opts=('standard',))
+register('hsi', rgb2hsi, hsi2rgb)
+register('hsl', rgb2hsl, hsl2rgb, fwd_opts=('white',), inv_opts=('white',))
+register('hsv', rgb2hsv, hsv2rgb)
+register('lab', rgb2lab, lab2rgb, fwd_opts=('input_range', 'transfer', 'model'), inv_opts=('transfer', 'model'))
+register('lms', rgb2lms, lms2rgb, fwd_opts=('input_range', 'transfer', 'model'), inv_opts=('transfer', 'model'))
+register('xyz', rgb2xyz, xyz2rgb, fwd_opts=('standard', 'norm', 'input_range', 'transfer', 'model'),
+         inv_opts=('standard', 'norm', 'transfer', 'model'))
+register('yuv', rgb2yuv, yuv2rgb, fwd_opts=('standard',), inv_opts=('standard',))
+register('oklab', rgb2oklab, oklab2rgb, fwd_opts=('input_range',))
+register('oklch', rgb2oklch, oklch2rgb, fwd_opts=('input_range',))
+register('luv', rgb2luv, luv2rgb, fwd_opts=('input_range', 'transfer', 'model'), inv_opts=('transfer', 'model'))
+register('lch', rgb2lch, lch2rgb, fwd_opts=('input_range', 'transfer', 'model'), inv_opts=('transfer', 'model'))
+register('ictcp', rgb2ictcp, ictcp2rgb, fwd_opts=('input_range',))
+register('jzazbz', rgb2jzazbz, jzazbz2rgb, fwd_opts=('input_range', 'transfer', 'model'),
+         inv_opts=('transfer', 'model'))
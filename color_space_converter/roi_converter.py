@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+
+from color_space_converter.top_level import ColorSpaceConverter
+from color_space_converter.registry import get_converter
+
+
+class RoiConverter(object):
+
+    def __init__(self, method: str = 'yuv', inverse: bool = False, standard: str = 'HDTV', input_range: tuple = None,
+                 tile_size: int = 64):
+        """
+
+        The region-of-interest converter keeps a persistent converted frame and only reconverts regions that changed
+        between consecutive frames. Forward conversions taking an input range (e.g. 'lab', 'lms' and 'xyz') normalize
+        by the frame maximum if no input range is given. For those, the maximum of each tile is tracked so that the
+        frame maximum is updated from the dirty tiles only. Once the maximum changes, the entire frame is reconverted
+        as every pixel depends on it.
+
+        :param method: describing target color space
+        :param inverse: option that determines whether conversion is forward (False) or backward (True)
+        :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' for the full range of the input
+                            type or None (or 'auto') to normalize by the frame maximum
+        :param tile_size: edge length of tiles for which the maximum is tracked
+        """
+
+        self._met = method
+        self._inv = inverse
+        self._stn = standard
+        self._rng = input_range
+        self._tile = tile_size
+
+        # persistent state
+        self._out = None
+        self._max = None
+        self._tile_max = None
+
+    @property
+    def tracks_max(self) -> bool:
+        """ whether the conversion depends on the frame maximum """
+        return not self._inv and self._rng in (None, 'auto') and 'input_range' in get_converter(self._met).fwd_opts
+
+    def convert(self, img: np.ndarray = None) -> np.ndarray:
+        """
+        This function converts an image or region given the current configuration and normalization.
+
+        :param img: input array with channels in the last dimension
+        :return: color space converted array
+        """
+
+        rng = (0, self._max) if self.tracks_max else self._rng
+
+        return ColorSpaceConverter(img, method=self._met, inverse=self._inv, standard=self._stn, input_range=rng).main()
+
+    def reset(self, frame: np.ndarray = None) -> np.ndarray:
+        """
+        This function converts an entire frame into a newly allocated output buffer.
+
+        :param frame: input frame with shape (H, W, C)
+        :return: converted frame
+        """
+
+        if self.tracks_max:
+            rows = np.arange(0, frame.shape[0], self._tile)
+            cols = np.arange(0, frame.shape[1], self._tile)
+            self._tile_max = tile_maxima(frame, rows, cols)
+            self._max = self._tile_max.max()
+
+        self._out = self.convert(frame)
+
+        return self._out
+
+    def update(self, frame: np.ndarray = None, rects: list = None, mask: np.ndarray = None) -> np.ndarray:
+        """
+        This function reconverts dirty regions of a frame into the existing output buffer. The entire frame is
+        converted for the first call, for changes in shape or if neither rectangles nor a mask are provided.
+
+        :param frame: input frame with shape (H, W, C) holding all current pixel values
+        :param rects: dirty rectangles as (x, y, width, height) tuples
+        :param mask: boolean array with shape (H, W) marking changed pixels
+        :return: converted frame (updated in place)
+        """
+
+        if self._out is None or self._out.shape[:2] != frame.shape[:2] or (rects is None and mask is None):
+            return self.reset(frame)
+
+        # clip rectangles to frame as slices
+        rects = [(slice(max(y, 0), max(y+h, 0)), slice(max(x, 0), max(x+w, 0))) for x, y, w, h in rects or []]
+
+        # update frame maximum from dirty tiles and reconvert everything once the maximum changes
+        if self.tracks_max:
+            dirty = np.zeros(self._tile_max.shape, dtype=bool)
+            for rs, cs in rects:
+                dirty[rs.start//self._tile:-(-rs.stop//self._tile), cs.start//self._tile:-(-cs.stop//self._tile)] = True
+            if mask is not None:
+                dirty |= tile_maxima(mask, *[np.arange(0, n, self._tile) for n in mask.shape]).astype(bool)
+            for ty, tx in zip(*np.nonzero(dirty)):
+                self._tile_max[ty, tx] = frame[ty*self._tile:(ty+1)*self._tile, tx*self._tile:(tx+1)*self._tile].max()
+            if self._tile_max.max() != self._max:
+                return self.reset(frame)
+
+        # reconvert rectangles
+        for rs, cs in rects:
+            if frame[rs, cs].size > 0:
+                self._out[rs, cs] = self.convert(frame[rs, cs])
+
+        # reconvert masked pixels as a single column image
+        if mask is not None and np.any(mask):
+            self._out[mask] = self.convert(frame[mask][:, np.newaxis, :])[:, 0, :]
+
+        return self._out
+
+    @property
+    def out(self):
+        """ getter for persistent converted frame """
+        return self._out
+
+
+def tile_maxima(arr: np.ndarray = None, rows: np.ndarray = None, cols: np.ndarray = None) -> np.ndarray:
+    """ Compute the maximum of each tile across all channels
+
+    :param arr: input array with shape (H, W) or (H, W, C)
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :param rows: start indices of tile rows
+    :type rows: :class:`~numpy:numpy.ndarray`
+    :param cols: start indices of tile columns
+    :type cols: :class:`~numpy:numpy.ndarray`
+    :return: tile maxima with shape (len(rows), len(cols))
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    arr = arr.max(axis=2) if arr.ndim == 3 else arr
+
+    return np.maximum.reduceat(np.maximum.reduceat(arr, rows, axis=0), cols, axis=1)
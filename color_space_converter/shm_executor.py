@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+from color_space_converter.top_level import convert
+
+# blocks attached by a worker process where the least recently used are closed first
+_ATTACHED = OrderedDict()
+
+
+def _attach(name: str = None, limit: int = 8) -> shared_memory.SharedMemory:
+    """ Attach a shared memory block once per worker process. """
+
+    if name in _ATTACHED:
+        _ATTACHED.move_to_end(name)
+        return _ATTACHED[name]
+    while len(_ATTACHED) >= limit:
+        _ATTACHED.popitem(last=False)[1].close()
+    _ATTACHED[name] = shared_memory.SharedMemory(name=name)
+
+    return _ATTACHED[name]
+
+
+def _convert_frames(desc: tuple = None) -> int:
+    """ Convert frames of an input block into an output block both given by (name, shape, dtype) descriptors. """
+
+    src_desc, dst_desc, start, stop, kwargs, limit = desc
+    src = np.ndarray(src_desc[1], dtype=src_desc[2], buffer=_attach(src_desc[0], limit).buf)
+    dst = np.ndarray(dst_desc[1], dtype=dst_desc[2], buffer=_attach(dst_desc[0], limit).buf)
+    for i in range(start, stop):
+        dst[i] = convert(src[i], **kwargs)
+    del src, dst
+
+    return stop - start
+
+
+class SharedBlock(object):
+
+    # removed blocks whose memory is still referenced by arrays
+    pending = []
+
+    def __init__(self, nbytes: int = 0):
+        """
+
+        Shared memory block holding a batch of frames which is created by the executor and reused across batches.
+        Arrays provided by :meth:`view` derive from a single byte array so that its reference count tells whether
+        the memory is still in use.
+
+        :param nbytes: capacity in bytes
+        """
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+        self._raw = np.ndarray((self.shm.size,), dtype='uint8', buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def size(self) -> int:
+        return self.shm.size
+
+    def view(self, shape: tuple = None, dtype: np.dtype = None) -> np.ndarray:
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return self._raw[:nbytes].view(dtype).reshape(shape)
+
+    def in_use(self) -> bool:
+        # references held by the attribute and the argument only
+        return sys.getrefcount(self._raw) > 2
+
+    def close(self) -> None:
+        """ Remove the block and detach it once no array references its memory anymore. """
+
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        SharedBlock.pending.append(self)
+        SharedBlock.release()
+
+    @staticmethod
+    def release() -> None:
+        """ Detach removed blocks that are no longer referenced. """
+
+        for block in [block for block in SharedBlock.pending if not block.in_use()]:
+            SharedBlock.pending.remove(block)
+            block._raw = None
+            block.shm.close()
+
+
+class SharedMemoryExecutor(object):
+
+    def __init__(self, workers: int = None, slots: int = 2, method: str = 'yuv', **kwargs):
+        """
+
+        Process pool converting batches of frames which are passed to workers in shared memory. Workers receive block
+        descriptors only and write results into a shared output block such that neither inputs nor results are
+        pickled. Input and output blocks form a ring of slots reused by subsequent batches.
+
+        :param workers: number of worker processes (defaults to the number of CPUs)
+        :param slots: number of batches whose results stay valid at once
+        :param method: registered color space
+        :param kwargs: further arguments of :func:`convert`, e.g. inverse, standard or input_range
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = max(1, slots)
+        self.kwargs = dict(kwargs, method=method)
+        # workers share the resource tracker of this process so that blocks are not reported as leaked by them
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.ensure_running()
+        self._pool = multiprocessing.get_context().Pool(self.workers)
+        self._ring = [[None, None] for _ in range(self.slots)]
+        self._next = 0
+
+    def _block(self, slot: int = 0, io: int = 0, nbytes: int = 0) -> SharedBlock:
+        """ Provide a ring block of at least the given size where smaller ones are replaced. """
+
+        block = self._ring[slot][io]
+        if block is None or block.size < nbytes:
+            if block is not None:
+                block.close()
+            block = self._ring[slot][io] = SharedBlock(nbytes)
+
+        return block
+
+    def empty(self, shape: tuple = None, dtype: np.dtype = 'uint8') -> np.ndarray:
+        """
+        Allocate a batch in the input block of the next slot, e.g. to decode frames into, so that :meth:`map` skips
+        copying it to shared memory.
+
+        :param shape: batch shape with frames along the first axis
+        :param dtype: data type of the frames
+        :return: array in shared memory
+        """
+
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        return self._block(self._next, 0, nbytes).view(shape, dtype)
+
+    def map(self, batch: np.ndarray = None, **kwargs) -> np.ndarray:
+        """
+        Convert a batch of frames in worker processes. The result resides in shared memory and stays valid until the
+        slot is reused by the batch after the next ``slots - 1`` calls or the executor is closed, so that it needs to
+        be copied to be kept longer.
+
+        :param batch: frames stacked along the first axis (or a sequence of equally shaped frames)
+        :param kwargs: arguments of :func:`convert` overriding those of the executor
+        :return: converted frames stacked along the first axis
+        :rtype: np.ndarray
+        """
+
+        kwargs = dict(self.kwargs, **kwargs)
+        slot, self._next = self._next, (self._next + 1) % self.slots
+
+        # copy frames into the input block unless they have been allocated there by empty()
+        batch = batch if isinstance(batch, np.ndarray) else np.stack(batch)
+        src = self._block(slot, 0, batch.nbytes)
+        if not np.shares_memory(batch, src.view((src.size,), 'uint8')):
+            src.view(batch.shape, batch.dtype)[...] = batch
+
+        # probe output shape and type of a frame by a single pixel
+        probe = convert(batch[0][:1, :1], **kwargs)
+        shape = (len(batch),) + batch.shape[1:3] + probe.shape[2:]
+        dst = self._block(slot, 1, int(np.prod(shape)) * probe.dtype.itemsize)
+
+        # distribute contiguous frame ranges among workers
+        bounds = np.linspace(0, len(batch), min(len(batch), self.workers) + 1).astype(int)
+        limit = 4 * self.slots
+        descs = [((src.name, batch.shape, batch.dtype.str), (dst.name, shape, probe.dtype.str), int(a), int(b), kwargs,
+                  limit) for a, b in zip(bounds[:-1], bounds[1:])]
+        self._pool.map(_convert_frames, descs)
+
+        SharedBlock.release()
+
+        return dst.view(shape, probe.dtype)
+
+    def close(self) -> None:
+        """ Stop the workers and remove all shared memory blocks. """
+
+        self._pool.close()
+        self._pool.join()
+        for block in [block for pair in self._ring for block in pair if block is not None]:
+            block.close()
+        self._ring = [[None, None] for _ in range(self.slots)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
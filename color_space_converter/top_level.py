@@ -21,23 +21,131 @@ __license__ = """
 """
 
 import numpy as np
+from functools import lru_cache
 
-from color_space_converter.hsv_converter import HsvConverter
-from color_space_converter.yuv_converter import YuvConverter
-from color_space_converter.xyz_converter import XyzConverter
-from color_space_converter.lab_converter import LabConverter
-from color_space_converter.lms_converter import LmsConverter
-from color_space_converter.gry_converter import GryConverter
+from color_space_converter.xyz_converter import input_bounds, input_white
+from color_space_converter.converter_baseclass import ConverterBaseclass, as_array
+from color_space_converter.registry import METHODS, get_converter
 
-METHODS = sorted(['gry', 'hsv', 'lab', 'lms', 'xyz', 'yuv'])
-FILE_EXTS = ['png', 'jpeg', 'jpg', 'bmp', 'tiff']
+FILE_EXTS = ['png', 'jpeg', 'jpg', 'bmp', 'tiff', 'gif']
+
+# formats written without quantization
+FLOAT_EXTS = ['npy', 'exr']
+
+# number of pixels processed at once by the output stage
+TILE_SIZE = 2**16
+
+# hue channels in degrees, which a grid of RGB values does not cover entirely
+HUE_CHANNELS = {'hsi': 0, 'hsl': 0, 'hsv': 0, 'lch': 2, 'oklch': 2}
 
 
 def normalize_img(img: np.ndarray = None) -> np.ndarray:
     return np.uint8((img-np.min(img))/(np.max(img)-np.min(img)) * (2**8-1))
 
 
-class ColorSpaceConverter(LabConverter, LmsConverter, HsvConverter, YuvConverter, XyzConverter, GryConverter):
+def encode_img(img: np.ndarray = None, policy: str = 'minmax', dtype: np.dtype = 'uint8', bounds: tuple = None,
+               percentiles: tuple = (.5, 99.5), tile_size: int = TILE_SIZE) -> np.ndarray:
+    """
+    Output stage mapping an image to the full range of an unsigned integer type. Bounds are determined by the policy
+    and values are scaled, rounded and clipped tile by tile with the result written directly into the output buffer
+    so that temporary memory is limited to a tile.
+
+    :param img: input array
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param policy: 'minmax' for global extrema found in a single pass, 'percentile' for percentiles of a subsample
+                   or 'fixed' for given bounds (see :func:`fixed_range`)
+    :type policy: :class:`str`
+    :param dtype: unsigned integer type such as 'uint8' or 'uint16'
+    :type dtype: :class:`~numpy:numpy.dtype`, optional
+    :param bounds: lower and upper values (scalars or per channel) mapped to zero and the type maximum for 'fixed'
+    :type bounds: tuple, optional
+    :param percentiles: lower and upper percentile for 'percentile'
+    :type percentiles: tuple, optional
+    :param tile_size: number of pixels processed at once
+    :type tile_size: int, optional
+    :return: quantized array
+    :rtype: np.ndarray
+    """
+
+    dtype = np.dtype(dtype)
+    if not np.issubdtype(dtype, np.unsignedinteger):
+        raise BaseException('Output type \'%s\' not supported' % dtype)
+
+    # pixel rows with channels in the last dimension
+    arr = np.ascontiguousarray(img)
+    flat = arr.reshape(-1, arr.shape[-1] if arr.ndim > 2 else 1)
+
+    if policy == 'minmax':
+        ext = np.array([[np.min(flat[i:i+tile_size]), np.max(flat[i:i+tile_size])]
+                        for i in range(0, len(flat), tile_size)])
+        lo, hi = ext[:, 0].min(), ext[:, 1].max()
+    elif policy == 'percentile':
+        sub = flat.ravel()[::max(1, flat.size // 2**20)]
+        lo, hi = np.percentile(sub, percentiles)
+    elif policy == 'fixed' and bounds is not None:
+        lo, hi = (np.asarray(b, dtype='float') for b in bounds)
+    else:
+        raise BaseException('Output policy \'%s\' not recognized or bounds missing' % policy)
+
+    # scale per channel where constant channels map to zero
+    vmax = np.iinfo(dtype).max
+    scale = np.divide(vmax, hi - lo, out=np.zeros(np.broadcast(lo, hi).shape), where=hi > lo)
+
+    out = np.empty(arr.shape, dtype=dtype)
+    out_flat = out.reshape(flat.shape)
+    buf = np.empty((min(tile_size, len(flat)), flat.shape[-1]))
+    for i in range(0, len(flat), tile_size):
+        tile, tmp = flat[i:i+tile_size], buf[:len(flat[i:i+tile_size])]
+        np.subtract(tile, lo, out=tmp)
+        np.multiply(tmp, scale, out=tmp)
+        np.clip(tmp, 0, vmax, out=tmp)
+        np.rint(tmp, out=out_flat[i:i+tile_size], casting='unsafe')
+
+    return out
+
+
+@lru_cache(maxsize=None)
+def fixed_range(method: str = 'yuv', inverse: bool = False, standard: str = 'HDTV', white: float = 1.,
+                num: int = 17) -> tuple:
+    """
+    Determine per channel bounds of a registered color space by converting a grid spanning the RGB cube. Spaces that
+    preserve the input scale (e.g. 'yuv' or 'hsv') are covered by the nominal RGB maximum, which is not needed by
+    normalized spaces. Inverse conversions range from zero to the maximum of the round trip.
+
+    :param method: registered color space
+    :type method: :class:`str`
+    :param inverse: option that determines whether bounds refer to RGB (True) or the color space (False)
+    :type inverse: :class:`boolean`
+    :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+    :type standard: :class:`string`
+    :param white: nominal RGB maximum, e.g. 255 for 8-bit input
+    :type white: float, optional
+    :param num: number of grid points per axis
+    :type num: int, optional
+    :return: lower and upper values per channel
+    :rtype: tuple
+    """
+
+    val = np.linspace(0, white, num)
+    grid = np.stack(np.meshgrid(val, val, val, indexing='ij'), axis=-1).reshape(-1, 1, 3)
+    res = convert(grid, method=method, standard=standard, input_range=(0, white))
+
+    if inverse:
+        res = convert(res, method=method, inverse=True, standard=standard)
+        lo, hi = np.zeros(res.shape[-1]), np.full(res.shape[-1], round(float(res.max()), 6))
+    else:
+        lo, hi = res.min(axis=(0, 1)), res.max(axis=(0, 1))
+        if method in HUE_CHANNELS:
+            lo[HUE_CHANNELS[method]], hi[HUE_CHANNELS[method]] = 0, 360
+
+    # cached bounds are shared
+    lo.setflags(write=False)
+    hi.setflags(write=False)
+
+    return lo, hi
+
+
+class ColorSpaceConverter(ConverterBaseclass):
 
     def __init__(self, *args, **kwargs):
         super(ColorSpaceConverter, self).__init__(*args, **kwargs)
@@ -45,11 +153,30 @@ class ColorSpaceConverter(LabConverter, LmsConverter, HsvConverter, YuvConverter
         self._met = kwargs['method'] if 'method' in kwargs else 'default'
         self._met = 'yuv' if self._met == 'default' else self._met
 
-    def main(self, img: np.ndarray = None, method: str = None, inverse: str = False, standard: str = None) -> np.ndarray:
+    def __getattr__(self, name: str):
+        """ provide legacy per-method functions (e.g. lab_conv) for all registered color spaces """
+
+        if not name.endswith('_conv') or name[:-5] not in METHODS:
+            raise AttributeError('%r object has no attribute %r' % (self.__class__.__name__, name))
+
+        conv = get_converter(name[:-5])
+
+        def fun(img: np.ndarray = None, inverse: bool = False, input_range: tuple = None, **kwargs):
+            # use inputs if present (kept local for reentrancy) and forward method options such as 'standard' or 'norm'
+            arr = img if img is not None else self._arr
+            inv = inverse if inverse else self._inv
+            rng = input_range if input_range is not None else self._rng
+
+            return conv(arr, inverse=inv, input_range=rng, **kwargs)
+
+        return fun
+
+    def main(self, img: np.ndarray = None, method: str = None, inverse: str = False, standard: str = None,
+             input_range: tuple = None, white: float = None) -> np.ndarray:
         """
         The main function and high-level entry point performing the color space conversion. Valid methods are
 
-        :param img: input array in either RGB or xyz color space
+        :param img: input array in either RGB or xyz color space (or any object supported by :func:`as_array`)
         :type img: :class:`~numpy:numpy.ndarray`
         :param method: describing target color space
         :type method: :class:`str`
@@ -57,34 +184,66 @@ class ColorSpaceConverter(LabConverter, LmsConverter, HsvConverter, YuvConverter
         :type inverse: :class:`boolean`
         :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
         :type standard: :class:`string`
+        :param input_range: lower and upper input values mapped to 0 and 1 for conversions via xyz, 'dtype' for the
+                            full range of the input type or None (or 'auto') to normalize by the image maximum
+        :type input_range: tuple, optional
+        :param white: nominal RGB maximum of spaces preserving the input scale, which inverse 'hsl' conversions of
+                      integer input require (see :func:`convert`)
+        :type white: float, optional
         :return: Resulting image after color mapping
         :rtype: np.ndarray
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
-        self._stn = standard if standard else 'HDTV'
-        self._met = method if method is not None else self._met
-
-        # color transfer methods (to be iterated through)
-        if self._met == METHODS[0]:
-            funs = [self.gry_conv]
-        elif self._met == METHODS[1]:
-            funs = [self.hsv_conv]
-        elif self._met == METHODS[2]:
-            funs = [self.lab_conv]
-        elif self._met == METHODS[3]:
-            funs = [self.lms_conv]
-        elif self._met == METHODS[4]:
-            funs = [self.xyz_conv]
-        elif self._met == METHODS[5]:
-            funs = [self.yuv_conv]
-        else:
-            raise BaseException('Conversion method \'%s\' not recognized' % self._met)
-
-        # proceed with the color conversion
-        for fun in funs:
-            self._arr = fun(self._arr.astype('float'))
-
-        return self._arr
+        # use inputs if present while the configuration of the instance remains unchanged
+        return convert(img if img is not None else self._arr,
+                       method=method if method is not None else self._met,
+                       inverse=inverse if inverse else self._inv,
+                       standard=standard if standard else self._stn,
+                       input_range=input_range if input_range is not None else self._rng,
+                       white=white)
+
+
+def convert(img: np.ndarray = None, method: str = 'yuv', inverse: bool = False, standard: str = 'HDTV',
+            input_range: tuple = None, gamut: str = None, dtype: np.dtype = None, white: float = None,
+            model=None) -> np.ndarray:
+    """
+    Reentrant color space conversion holding all per-call data in local variables so that it is safe to be called
+    concurrently, e.g. by a shared :class:`ColorSpaceConverter` instance.
+
+    :param img: input array (or any object supported by :func:`as_array`)
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param method: registered color space
+    :type method: :class:`str`
+    :param inverse: option that determines whether conversion is to RGB (True) or from RGB (False)
+    :type inverse: :class:`boolean`
+    :param standard: option that determines whether head- and footroom are excluded ('HDTV') or considered otherwise
+    :type standard: :class:`string`
+    :param input_range: lower and upper input values mapped to 0 and 1 (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param gamut: gamut handling of inverse conversions with either 'clip', 'soft' or 'chroma' (see :func:`map_gamut`)
+    :type gamut: str, optional
+    :param dtype: unsigned integer type inverse conversions are quantized to, e.g. 'uint8' or 'uint16'
+    :type dtype: :class:`~numpy:numpy.dtype`, optional
+    :param white: nominal maximum of RGB values, which is 1 except for spaces preserving the input scale (e.g. 'yuv'),
+                  also serving as the reference of the HSL saturation (see :func:`rgb2hsl`), which forward conversions
+                  derive from the upper input bound or the input type unless given
+    :type white: float, optional
+    :param model: color model of the RGB values for spaces derived from xyz (see :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: Resulting image after color mapping
+    :rtype: np.ndarray
+    """
+
+    # look up registered color space
+    conv = get_converter(method)
+
+    # resolve type-dependent input range
+    arr = as_array(img)
+    rng = input_bounds(arr, input_range) if input_range == 'dtype' else input_range
+    white = input_white(arr, input_range) if white is None and not inverse else white
+
+    # proceed with the color conversion where converters cast to float themselves to avoid an extra copy
+    res = conv(arr, inverse=inverse, standard=standard, input_range=rng, gamut=gamut, dtype=dtype, white=white,
+               model=model)
+
+    return res if inverse and dtype is not None else np.asarray(res, dtype='float')
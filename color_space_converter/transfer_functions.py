@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import numpy as np
+from functools import lru_cache
+
+# IEC 61966-2-1 sRGB thresholds in encoded and linear domain
+SRGB_THRESH = 0.04045
+SRGB_THRESH_LIN = 0.0031308
+
+# SMPTE ST 2084 perceptual quantizer (PQ) constants
+PQ_M1 = 2610 / 16384.
+PQ_M2 = 2523 / 4096. * 128
+PQ_C1 = 3424 / 4096.
+PQ_C2 = 2413 / 4096. * 32
+PQ_C3 = 2392 / 4096. * 32
+
+# peak luminance in cd/m^2 that PQ maps to 1
+PQ_PEAK = 10000.
+
+# ITU-R BT.2100 hybrid log-gamma (HLG) constants
+HLG_A = 0.17883277
+HLG_B = 0.28466892
+HLG_C = 0.55991073
+
+
+def srgb_decode(rgb: np.ndarray = None) -> np.ndarray:
+    """ Decode normalized values by the piecewise sRGB curve
+
+    :param rgb: normalized array ranging from 0 to 1
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :return: linear RGB array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # values below the threshold (including negative ones outside the input range) are scaled linearly
+    dec = np.power((np.maximum(rgb, SRGB_THRESH) + 0.055) / 1.055, 2.4)
+
+    return np.where(rgb > SRGB_THRESH, dec, rgb / 12.92)
+
+
+def srgb_encode(lin: np.ndarray = None) -> np.ndarray:
+    """ Encode linear RGB values by the piecewise sRGB curve
+
+    :param lin: linear RGB array
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # values below the threshold are scaled linearly
+    enc = 1.055 * np.power(np.maximum(lin, SRGB_THRESH_LIN), 1 / 2.4) - 0.055
+
+    return np.where(lin > SRGB_THRESH_LIN, enc, lin * 12.92)
+
+
+def pq_encode(lum: np.ndarray = None, m2: float = PQ_M2) -> np.ndarray:
+    """ Apply the inverse EOTF of SMPTE ST 2084 (PQ) to luminance values normalized by the peak of 10000 cd/m^2
+
+    :param lum: normalized luminance where negative values are clipped
+    :type lum: :class:`~numpy:numpy.ndarray`
+    :param m2: exponent of the curve (altered by Jzazbz)
+    :type m2: float, optional
+    :return: PQ encoded values
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    val = np.power(np.maximum(lum, 0), PQ_M1)
+
+    return np.power((PQ_C1 + PQ_C2 * val) / (1 + PQ_C3 * val), m2)
+
+
+def pq_decode(enc: np.ndarray = None, m2: float = PQ_M2) -> np.ndarray:
+    """ Apply the EOTF of SMPTE ST 2084 (PQ) yielding luminance values normalized by the peak of 10000 cd/m^2
+
+    :param enc: PQ encoded values where values outside the range of 0 to 1 are clipped
+    :type enc: :class:`~numpy:numpy.ndarray`
+    :param m2: exponent of the curve (altered by Jzazbz)
+    :type m2: float, optional
+    :return: normalized luminance
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    val = np.power(np.clip(enc, 0, 1), 1 / m2)
+
+    return np.power(np.maximum(val - PQ_C1, 0) / (PQ_C2 - PQ_C3 * val), 1 / PQ_M1)
+
+
+def hlg_encode(lin: np.ndarray = None) -> np.ndarray:
+    """ Apply the OETF of ITU-R BT.2100 hybrid log-gamma (HLG) to normalized scene linear values
+
+    :param lin: scene linear values ranging from 0 to 1 where negative values are clipped
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :return: HLG encoded values
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    lin = np.maximum(lin, 0)
+
+    # square root segment below 1/12 and logarithmic segment above
+    enc = HLG_A * np.log(np.maximum(12 * lin - HLG_B, 1e-12)) + HLG_C
+
+    return np.where(lin > 1 / 12., enc, np.sqrt(3 * lin))
+
+
+def hlg_decode(enc: np.ndarray = None) -> np.ndarray:
+    """ Apply the inverse OETF of ITU-R BT.2100 hybrid log-gamma (HLG) yielding normalized scene linear values
+
+    :param enc: HLG encoded values where negative values are clipped
+    :type enc: :class:`~numpy:numpy.ndarray`
+    :return: scene linear values
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    enc = np.maximum(enc, 0)
+
+    return np.where(enc > .5, (np.exp((enc - HLG_C) / HLG_A) + HLG_B) / 12., np.square(enc) / 3.)
+
+
+def linear(arr: np.ndarray = None) -> np.ndarray:
+    """ Pass values through for data that is linear already """
+    return arr
+
+
+# decoding and encoding pairs of transfer functions
+TRANSFERS = {
+    'sRGB': (srgb_decode, srgb_encode),
+    'PQ': (pq_decode, pq_encode),
+    'HLG': (hlg_decode, hlg_encode),
+    'linear': (linear, linear),
+}
+
+
+@lru_cache(maxsize=None)
+def get_transfer(transfer='sRGB') -> tuple:
+    """ Provide decoding and encoding functions of a transfer given by its name or a gamma value
+
+    :param transfer: name of the transfer function (see :data:`TRANSFERS`) or gamma value
+    :return: decoding and encoding function
+    :rtype: tuple
+
+    """
+
+    if isinstance(transfer, str):
+        if transfer not in TRANSFERS:
+            raise BaseException('Transfer function \'%s\' not recognized' % transfer)
+        return TRANSFERS[transfer]
+
+    gamma = float(transfer)
+
+    return lambda x: np.power(np.maximum(x, 0), gamma), lambda x: np.power(np.maximum(x, 0), 1. / gamma)
+
+
+@lru_cache(maxsize=32)
+def decode_lut(transfer='sRGB', dtype: np.dtype = np.uint16, lo: float = 0, hi: float = 1) -> np.ndarray:
+    """ Tabulate the decoded value of each code of an unsigned integer type after mapping lo and hi to 0 and 1
+
+    :param transfer: name of the transfer function (see :data:`TRANSFERS`) or gamma value
+    :param dtype: unsigned integer type of at most 16 bits
+    :type dtype: :class:`~numpy:numpy.dtype`
+    :param lo: input value mapped to 0
+    :type lo: float
+    :param hi: input value mapped to 1
+    :type hi: float
+    :return: read-only lookup table in double precision
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # normalize codes the same way as arrays are (see rgb2lin)
+    codes = np.arange(np.iinfo(dtype).max + 1, dtype=dtype)
+    nrm = (codes - lo) * (1. / (hi - lo)) if lo != 0 else codes * (1. / hi)
+
+    lut = get_transfer(transfer)[0](nrm)
+    lut.setflags(write=False)
+
+    return lut
+
+
+def has_lut(arr: np.ndarray = None) -> bool:
+    """ Determine whether an array is decoded by table lookup, which is the case for unsigned types up to 16 bits
+
+    :param arr: input array
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :return: True if a lookup table applies
+    :rtype: bool
+
+    """
+
+    return np.issubdtype(arr.dtype, np.unsignedinteger) and arr.dtype.itemsize <= 2
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# minimum number of pixels for which the cardinality heuristic considers the unique color path
+MIN_PIXELS = 2**16
+
+# number of pixels sampled by the cardinality heuristic
+NUM_SAMPLES = 2**12
+
+# maximum ratio of distinct colors to pixels that is considered as low cardinality
+MAX_RATIO = 1/16.
+
+# maximum number of idle lookup tables kept for reuse across calls and threads (about 80 MB each for 24-bit keys)
+POOL_SIZE = 2
+
+# idle lookup tables shared by all threads to avoid allocating the full key space each time
+_POOL = []
+_POOL_LOCK = threading.Lock()
+
+
+@contextmanager
+def lookup_tables(size: int = 2**24) -> (np.ndarray, np.ndarray):
+    """ Borrow presence and index lookup tables covering at least the given key space from a bounded pool. The
+    presence table is all False when borrowed and must be cleared by the caller before returning, which is done here
+    if the caller raises. The index table holds arbitrary values and is only read at keys written before within the
+    same call. Threads exceeding the pool allocate tables of their own, which are released afterwards.
+
+    :param size: number of keys the tables need to cover
+    :type size: int
+    :return: context manager providing the presence table and index table
+    :rtype: (~numpy:np.ndarray, ~numpy:np.ndarray)
+
+    """
+
+    with _POOL_LOCK:
+        tables = next((tables for tables in _POOL if tables[0].size >= size), None)
+        if tables is not None:
+            _POOL.remove(tables)
+    if tables is None:
+        tables = np.zeros(size, dtype=bool), np.empty(size, dtype=np.int32)
+
+    try:
+        yield tables[0][:size], tables[1][:size]
+    except BaseException:
+        tables[0][:size] = False
+        raise
+    finally:
+        # keep the largest tables once the pool is full
+        with _POOL_LOCK:
+            _POOL.append(tables)
+            _POOL.sort(key=lambda tables: tables[0].size, reverse=True)
+            del _POOL[POOL_SIZE:]
+
+
+def color_keys(flat: np.ndarray = None) -> (np.ndarray, int):
+    """ Pack each color vector into a single scalar key. This is only feasible for integer-valued channels of at most
+    16 bits, which includes float arrays holding such values (e.g. after casting an 8-bit image to float).
+
+    :param flat: input array of color vectors with shape (N, C) and C <= 4
+    :type flat: :class:`~numpy:numpy.ndarray`
+    :return: key vector of length N and number of bits per channel or None if colors cannot be packed
+    :rtype: (~numpy:np.ndarray, int)
+
+    """
+
+    if flat.shape[-1] > 4 or flat.dtype.kind not in 'uif' or flat.size == 0:
+        return None
+
+    # validate that channel values are non-negative integers of at most 16 bits
+    lo, hi = flat.min(), flat.max()
+    if lo < 0 or hi > 2**16-1:
+        return None
+    vals = flat.astype(np.uint16, copy=False)
+    if flat.dtype.kind == 'f' and not np.array_equal(vals, flat):
+        return None
+
+    # pack channels into keys using as few bits as possible
+    bits = 8 if hi <= 2**8-1 else 16
+    keys = np.zeros(flat.shape[0], dtype=np.uint32 if bits * flat.shape[-1] <= 32 else np.uint64)
+    for ch in range(flat.shape[-1]):
+        keys <<= bits
+        keys |= vals[:, ch]
+
+    return keys, bits
+
+
+def unique_colors(img: np.ndarray = None) -> (np.ndarray, np.ndarray):
+    """ Determine the unique colors of an image and the index mapping each pixel to its unique color.
+
+    :param img: input image array with channels in the last dimension
+    :type img: :class:`~numpy:numpy.ndarray`
+    :return: unique colors with shape (K, C) and inverse index with shape (N,)
+    :rtype: (~numpy:np.ndarray, ~numpy:np.ndarray)
+
+    """
+
+    # reshape image to color vectors
+    flat = img.reshape(-1, img.shape[-1])
+    chs = flat.shape[-1]
+
+    packed = color_keys(flat)
+
+    # sort rows as a fallback for colors that cannot be packed into scalar keys
+    if packed is None:
+        rows = np.ascontiguousarray(flat).view(np.dtype((np.void, flat.dtype.itemsize * chs))).ravel()
+        _, index, inverse = np.unique(rows, return_index=True, return_inverse=True)
+        return flat[index], inverse.ravel()
+
+    keys, bits = packed
+
+    # use lookup table with a linear pass for small key spaces (e.g. 8-bit RGB) and sort keys otherwise
+    if bits * chs <= 24:
+        with lookup_tables(2**(bits * chs)) as (present, table):
+            present[keys] = True
+            uniq = np.flatnonzero(present).astype(keys.dtype)
+            present[uniq] = False
+            table[uniq] = np.arange(len(uniq), dtype=table.dtype)
+            inverse = table[keys].astype(np.intp)
+    else:
+        uniq, inverse = np.unique(keys, return_inverse=True)
+
+    # unpack colors from keys
+    colors = np.empty((len(uniq), chs), dtype=flat.dtype)
+    for ch in range(chs):
+        colors[:, chs-1-ch] = (uniq >> (bits * ch)) & (2**bits-1)
+
+    return colors, inverse.ravel()
+
+
+def low_cardinality(img: np.ndarray = None, min_pixels: int = MIN_PIXELS, num_samples: int = NUM_SAMPLES,
+                    max_ratio: float = MAX_RATIO) -> bool:
+    """ Heuristic estimating whether an image contains few enough distinct colors for the unique color path to pay off.
+    A random pixel sample is drawn and the image is classified as low cardinality if the sample's ratio of unique
+    colors is small. Images whose colors cannot be packed into scalar keys are rejected as sorting rows is slower
+    than any dense conversion.
+
+    :param img: input image array with channels in the last dimension
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param min_pixels: number of pixels below which a dense conversion is always preferred
+    :type min_pixels: int, optional
+    :param num_samples: number of randomly drawn pixels
+    :type num_samples: int, optional
+    :param max_ratio: maximum ratio of estimated distinct colors to pixels regarded as low cardinality
+    :type max_ratio: float, optional
+    :return: whether unique color conversion is expected to be faster
+    :rtype: bool
+
+    """
+
+    if not isinstance(img, np.ndarray) or img.ndim < 2:
+        return False
+
+    # reshape image to color vectors
+    flat = img.reshape(-1, img.shape[-1])
+
+    if flat.shape[0] < max(min_pixels, num_samples):
+        return False
+
+    # draw reproducible pixel sample
+    idxs = np.random.default_rng(seed=0).integers(0, flat.shape[0], size=num_samples)
+    packed = color_keys(flat[idxs])
+
+    if packed is None:
+        return False
+
+    # estimate number of distinct colors from sample frequencies (Chao1 estimator)
+    counts = np.unique(packed[0], return_counts=True)[1]
+    f1, f2 = np.count_nonzero(counts == 1), np.count_nonzero(counts == 2)
+    num_est = len(counts) + f1 * (f1 - 1) / (2. * (f2 + 1))
+
+    return num_est <= max_ratio * flat.shape[0]
+
+
+def unique_conv(fun, img: np.ndarray = None, **kwargs) -> np.ndarray:
+    """ Apply a conversion function to the unique colors of an image only and scatter the results back to all pixels.
+    This yields the same result as the dense conversion for converters operating on each pixel independently.
+
+    :param fun: conversion function taking an image array as first argument
+    :type fun: callable
+    :param img: input image array with channels in the last dimension
+    :type img: :class:`~numpy:numpy.ndarray`
+    :param kwargs: keyword arguments passed to the conversion function
+    :return: color space converted array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # store shape
+    shape = img.shape
+
+    # find unique colors and index
+    colors, inverse = unique_colors(img)
+
+    # convert palette as an image with a single column
+    palette = fun(colors[:, np.newaxis, :], **kwargs)
+
+    # scatter converted palette to pixels
+    arr = palette.reshape(colors.shape[0], -1).take(inverse, axis=0)
+
+    return arr.reshape(shape[:-1] + (-1,))
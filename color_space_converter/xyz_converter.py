@@ -19,6 +19,9 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
+from color_space_converter.matrix_registry import register_matrix, get_matrix
+from color_space_converter.transfer_functions import get_transfer, decode_lut, has_lut
+from color_space_converter.unique_colors import low_cardinality, unique_conv
 
 # https://web.archive.org/web/20120502065620/http://cookbooks.adobe.com/post_Useful_color_equations__RGB_to_LAB_converter-14227.html
 
@@ -28,14 +31,20 @@ MAT_ADB = np.array([[0.4124, 0.3576, 0.1805], [0.2126, 0.7152, 0.0722], [0.0193,
 # Int. Telecom. Union standard XYZitu601-1 (D65) from Reinhard et al. paper (2001)
 MAT_ITU = np.array([[0.4306, 0.3415, 0.1784], [0.2220, 0.7067, 0.0713], [0.0202, 0.1295, 0.9394]])
 
+register_matrix('xyz_adobe', MAT_ADB)
+register_matrix('xyz_itu', MAT_ITU)
+
+# ITU matrix normalized such that R = G = B = 1 maps to X = Y = Z = 1
+register_matrix('xyz_itu_norm', np.transpose(np.dot(np.ones(3), np.linalg.inv(MAT_ITU))*MAT_ITU.T))
+
 
 class XyzConverter(ConverterBaseclass):
 
     def __init__(self, *args, **kwargs):
         super(XyzConverter, self).__init__(*args, **kwargs)
 
-    def xyz_conv(self, img: np.ndarray = None, inverse: bool = False, standard: str = 'Adobe', norm: bool = False) \
-            -> np.ndarray:
+    def xyz_conv(self, img: np.ndarray = None, inverse: bool = False, standard: str = 'Adobe', norm: bool = False,
+                 input_range: tuple = None) -> np.ndarray:
         """ Convert RGB color space to xyz color space or vice versa given the inverse option.
 
         :param img: input array in either RGB or xyz color space
@@ -46,24 +55,28 @@ class XyzConverter(ConverterBaseclass):
         :type standard: str, optional
         :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
         :type norm: bool, optional
+        :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+        :type input_range: tuple, optional
         :return: color space converted array
         :rtype: ~numpy:np.ndarray
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
+        rng = input_range if input_range is not None else self._rng
 
-        if not self._inv:
-            self._arr = rgb2xyz(self._arr, standard=standard, norm=norm)
+        if not inv:
+            arr = rgb2xyz(arr, standard=standard, norm=norm, input_range=rng)
         else:
-            self._arr = xyz2rgb(self._arr, standard=standard, norm=norm)
+            arr = xyz2rgb(arr, standard=standard, norm=norm)
 
-        return self._arr
+        return arr
 
 
-def rgb2xyz(rgb: np.ndarray = None, standard: str = 'Adobe', norm: bool = False) -> np.ndarray:
+def rgb2xyz(rgb: np.ndarray = None, standard: str = 'Adobe', norm: bool = False, unique: bool = False,
+            input_range: tuple = None, transfer: str = 'sRGB', model=None) -> np.ndarray:
     """ Convert RGB color space to xyz color space
 
     :param rgb: input array in red, green and blue (RGB) space
@@ -72,44 +85,161 @@ def rgb2xyz(rgb: np.ndarray = None, standard: str = 'Adobe', norm: bool = False)
     :type standard: str, optional
     :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
     :type norm: bool, optional
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' for the full range of the input type
+                        (0 to 1 for floats) or None (or 'auto') to normalize by the image maximum
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace standard, norm and transfer (see
+                  :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
     :return: array in xyz space
     :rtype: ~numpy:np.ndarray
 
     """
 
-    # store shape
-    shape = rgb.shape
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(rgb):
+        return unique_conv(rgb2xyz, rgb, standard=standard, norm=norm, input_range=input_range, transfer=transfer,
+                           model=model)
+
+    if model is not None:
+        return model.rgb2xyz(rgb, input_range=input_range)
+
+    return lin2xyz(rgb2lin(rgb, input_range=input_range, transfer=transfer), standard=standard, norm=norm)
+
+
+def xyz2rgb(xyz: np.ndarray = None, standard: str = 'Adobe', norm: bool = False, unique: bool = False,
+            transfer: str = 'sRGB', model=None) -> np.ndarray:
+    """ Convert xyz color space to RGB color space
+
+    :param xyz: input array in xyz space
+    :type xyz: :class:`~numpy:numpy.ndarray`
+    :param standard: option that determines which standard (Adobe or ITU) is used
+    :type standard: str, optional
+    :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
+    :type norm: bool, optional
+    :param unique: option to convert unique colors only where None enables a cardinality heuristic
+    :type unique: bool, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value
+    :type transfer: str, optional
+    :param model: color model whose primaries, white and transfer replace standard, norm and transfer (see
+                  :class:`ColorModel`)
+    :type model: :class:`ColorModel`, optional
+    :return: array in red, green and blue (RGB) space
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    # convert unique colors only and scatter results back (if option set)
+    if unique or unique is None and low_cardinality(xyz):
+        return unique_conv(xyz2rgb, xyz, standard=standard, norm=norm, transfer=transfer, model=model)
+
+    if model is not None:
+        return model.xyz2rgb(xyz)
+
+    return lin2rgb(xyz2lin(xyz, standard=standard, norm=norm), transfer=transfer)
+
+
+def xyz_matrix(standard: str = 'Adobe', norm: bool = False) -> np.ndarray:
+    """ Provide the matrix converting linear RGB to xyz space
+
+    :param standard: option that determines which standard (Adobe or ITU) is used
+    :type standard: str, optional
+    :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
+    :type norm: bool, optional
+    :return: 3x3 matrix
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    return get_matrix(xyz_matrix_name(standard, norm))
+
+
+def xyz_matrix_name(standard: str = 'Adobe', norm: bool = False) -> str:
+    """ Provide the registered name of the matrix converting linear RGB to xyz space (see :func:`get_matrix`) where
+    standards other than 'ITU' (e.g. the headroom standards 'HDTV' and 'SDTV' shared by all spaces) select Adobe """
+
+    return 'xyz_itu_norm' if norm else 'xyz_itu' if standard == 'ITU' else 'xyz_adobe'
+
+
+def rgb2lin(rgb: np.ndarray = None, input_range: tuple = None, transfer: str = 'sRGB') -> np.ndarray:
+    """ Normalize and decode RGB values to linear RGB, which is the intermediate shared by all xyz-based spaces.
+    Single and double precision inputs keep their precision while others are promoted (see :func:`calc_dtype`).
+    Unsigned integers of up to 16 bits (e.g. 10 or 12-bit HDR data) are decoded by a cached lookup table.
+
+    :param rgb: input array in red, green and blue (RGB) space
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value
+    :type transfer: str, optional
+    :return: linear RGB array ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    if has_lut(rgb):
+        lo, hi = input_bounds(rgb, input_range)
+        return decode_lut(transfer, rgb.dtype, float(lo), float(hi))[rgb]
+
+    return get_transfer(transfer)[0](normalize_input(rgb, input_range=input_range))
+
+
+def normalize_input(rgb: np.ndarray = None, input_range: tuple = None) -> np.ndarray:
+    """ Map the input range to 0 and 1 in floating point precision (see :func:`calc_dtype`)
+
+    :param rgb: input array
+    :type rgb: :class:`~numpy:numpy.ndarray`
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
+    :return: normalized array
+    :rtype: ~numpy:np.ndarray
+
+    """
+
+    rgb = np.asarray(rgb, dtype=calc_dtype(rgb)) if np.issubdtype(rgb.dtype, np.floating) else rgb
+    lo, hi = input_bounds(rgb, input_range)
+
+    return (rgb - lo) * (1. / (hi - lo)) if lo != 0 else rgb * (1. / hi)
 
-    # choose method
-    mat = MAT_ADB if standard == 'Adobe' else MAT_ITU
 
-    # normalize Matrix such that R = G = B = 1 maps to X = Y = Z = 1
-    mat = np.transpose(np.dot(np.ones(3), np.linalg.inv(MAT_ITU))*MAT_ITU.T) if norm else mat
+def lin2rgb(lin: np.ndarray = None, transfer: str = 'sRGB') -> np.ndarray:
+    """ Encode linear RGB values by a transfer function
+
+    :param lin: linear RGB array
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :param transfer: transfer function with either 'sRGB', 'PQ', 'HLG', 'linear' or a gamma value
+    :type transfer: str, optional
+    :return: array in red, green and blue (RGB) space ranging from 0 to 1
+    :rtype: ~numpy:np.ndarray
 
-    # normalize input
-    rgb = rgb / np.max(rgb)
+    """
 
-    for ch in range(rgb.shape[2]):
-        mask = rgb[..., ch] > 0.04045
-        rgb[..., ch][mask] = np.power((rgb[..., ch] + 0.055) / 1.055, 2.4)[mask]
-        rgb[..., ch][~mask] /= 12.92
+    return get_transfer(transfer)[1](lin)
 
-    rgb *= 100
 
-    # reshape image to channel vectors
-    rgb = rgb.reshape(-1, 3).T
+def lin2xyz(lin: np.ndarray = None, standard: str = 'Adobe', norm: bool = False) -> np.ndarray:
+    """ Convert linear RGB to xyz space with Y = 100 for white
 
-    # convert to xyz space
-    xyz = np.dot(mat, rgb)
+    :param lin: linear RGB array ranging from 0 to 1
+    :type lin: :class:`~numpy:numpy.ndarray`
+    :param standard: option that determines which standard (Adobe or ITU) is used
+    :type standard: str, optional
+    :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
+    :type norm: bool, optional
+    :return: array in xyz space
+    :rtype: ~numpy:np.ndarray
 
-    # reshape to 2-D image
-    xyz = xyz.T.reshape(shape)
+    """
 
-    return xyz
+    return np.matmul(lin, (100 * xyz_matrix(standard, norm).T).astype(calc_dtype(lin)))
 
 
-def xyz2rgb(xyz: np.ndarray = None, standard: str = 'Adobe', norm: bool = False) -> np.ndarray:
-    """ Convert HSV color space to RGB color space
+def xyz2lin(xyz: np.ndarray = None, standard: str = 'Adobe', norm: bool = False) -> np.ndarray:
+    """ Convert xyz space to linear RGB
 
     :param xyz: input array in xyz space
     :type xyz: :class:`~numpy:numpy.ndarray`
@@ -117,45 +247,35 @@ def xyz2rgb(xyz: np.ndarray = None, standard: str = 'Adobe', norm: bool = False)
     :type standard: str, optional
     :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
     :type norm: bool, optional
-    :return: array in red, green and blue (RGB) space
+    :return: linear RGB array
     :rtype: ~numpy:np.ndarray
 
     """
 
-    # store shape
-    shape = xyz.shape
-
-    # choose method
-    mat = MAT_ADB if standard == 'Adobe' else MAT_ITU
+    xyz = np.asarray(xyz, dtype=calc_dtype(xyz))
 
-    # normalize Matrix such that R = G = B = 1 maps to X = Y = Z = 1
-    mat = np.transpose(np.dot(np.ones(3), np.linalg.inv(MAT_ITU))*MAT_ITU.T) if norm else mat
+    inv = get_matrix(xyz_matrix_name(standard, norm), inverse=True)
 
-    # invert matrix
-    mat_inv = np.linalg.inv(mat)
+    return np.matmul(xyz, (inv.T / 100).astype(xyz.dtype))
 
-    # de-normalize input
-    xyz = xyz.astype('float') / 100
 
-    # reshape image to channel vectors
-    xyz = xyz.reshape(-1, 3).T
+def calc_dtype(arr: np.ndarray = None) -> np.dtype:
+    """ Determine the floating point type for computations where integer inputs map to double precision
 
-    # convert to rgb space
-    rgb = np.dot(mat_inv, xyz)
+    :param arr: input array
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :return: single or double precision type
+    :rtype: ~numpy:np.dtype
 
-    # reshape to 2-D image
-    rgb = rgb.T.reshape(shape)
+    """
 
-    for ch in range(rgb.shape[2]):
-        mask = rgb[..., ch] > 0.0031308
-        rgb[..., ch][mask] = 1.055 * np.power(rgb[..., ch][mask], 1 / 2.4) - 0.055
-        rgb[..., ch][~mask] *= 12.92
+    arr = np.asarray(arr)
 
-    return rgb
+    return np.result_type(arr.dtype, np.float32) if np.issubdtype(arr.dtype, np.floating) else np.dtype('float')
 
 
-def xyz_conv(img: np.ndarray = None, inverse: bool = False, standard: str = 'Adobe', norm: bool = False) \
-        -> np.ndarray:
+def xyz_conv(img: np.ndarray = None, inverse: bool = False, standard: str = 'Adobe', norm: bool = False,
+             input_range: tuple = None) -> np.ndarray:
     """ Convert RGB color space to xyz color space or vice versa given the inverse option.
 
     :param img: input array in either RGB or xyz color space
@@ -166,14 +286,57 @@ def xyz_conv(img: np.ndarray = None, inverse: bool = False, standard: str = 'Ado
     :type standard: str, optional
     :param norm: option that determines whether matrix is normalized to allow for R=G=B=1 to X=Y=Z=1 mappings
     :type norm: bool, optional
+    :param input_range: lower and upper input values mapped to 0 and 1, 'dtype' or None (see :func:`rgb2xyz`)
+    :type input_range: tuple, optional
     :return: color space converted array
     :rtype: ~numpy:np.ndarray
 
     """
 
     if not inverse:
-        arr = rgb2xyz(img, standard=standard, norm=norm)
+        arr = rgb2xyz(img, standard=standard, norm=norm, input_range=input_range)
     else:
         arr = xyz2rgb(img, standard=standard, norm=norm)
 
     return arr
+
+
+def input_bounds(arr: np.ndarray = None, input_range: tuple = None) -> tuple:
+    """ Determine lower and upper input values that are mapped to 0 and 1 before linearization
+
+    :param arr: input array
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :param input_range: lower and upper input values, 'dtype' for the full range of the input type (0 to 1 for floats)
+                        or None (or 'auto') to use the maximum of the array
+    :type input_range: tuple, optional
+    :return: lower and upper input value
+    :rtype: tuple
+
+    """
+
+    if input_range is None or input_range == 'auto':
+        return 0, np.max(arr)
+    elif input_range == 'dtype':
+        return (0, np.iinfo(arr.dtype).max) if np.issubdtype(arr.dtype, np.integer) else (0, 1)
+    elif isinstance(input_range, str) or len(input_range) != 2:
+        raise BaseException('Input range \'%s\' not recognized' % str(input_range))
+
+    return input_range[0], input_range[1]
+
+
+def input_white(arr: np.ndarray = None, input_range: tuple = None) -> float:
+    """ Determine the nominal RGB maximum of spaces preserving the input scale (e.g. 'hsl') from the upper input bound
+    if given or from the full range of the input type otherwise
+
+    :param arr: input array
+    :type arr: :class:`~numpy:numpy.ndarray`
+    :param input_range: lower and upper input values, 'dtype' or None (or 'auto') to use the input type
+    :type input_range: tuple, optional
+    :return: nominal RGB maximum
+    :rtype: float
+
+    """
+
+    auto = input_range is None or isinstance(input_range, str) and input_range == 'auto'
+
+    return float(input_bounds(arr, 'dtype' if auto else input_range)[1])
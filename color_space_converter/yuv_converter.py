@@ -19,14 +19,24 @@ __license__ = """
 import numpy as np
 
 from color_space_converter.converter_baseclass import ConverterBaseclass
+from color_space_converter.linear_stage import LinearStage
+from color_space_converter.matrix_registry import register_matrix, get_matrix
 
 # excludes foot- and headroom
-YUV_MAT_BT709 = np.array([[0.2126, 0.7152, 0.0722], [-0.09991, -0.33609, 0.436], [0.615, -0.55861, -0.05639]])
-YUV_MAT_BT709_INV = np.array([[1.0, 0.0, 1.28033], [1.0, -0.21482, -0.38059], [1.0, 2.12798, 0.0]])
+YUV_MAT_BT709 = register_matrix('yuv_hdtv', [[0.2126, 0.7152, 0.0722], [-0.09991, -0.33609, 0.436],
+                                             [0.615, -0.55861, -0.05639]])
 
 # includes foot- and headroom
-YUV_MAT_BT601 = np.array([[0.299, 0.587, 0.114], [-0.14713, -0.28886, 0.436], [0.615, -0.51499, -0.10001]])
-YUV_MAT_BT601_INV = np.array([[1.0, 0.0, 1.13983], [1.0, -0.39465, -0.58060], [1.0, 2.03211, 0.0]])
+YUV_MAT_BT601 = register_matrix('yuv_sdtv', [[0.299, 0.587, 0.114], [-0.14713, -0.28886, 0.436],
+                                             [0.615, -0.51499, -0.10001]])
+
+# exact inverses for lossless round trips
+YUV_MAT_BT709_INV = get_matrix('yuv_hdtv', inverse=True)
+YUV_MAT_BT601_INV = get_matrix('yuv_sdtv', inverse=True)
+
+# forward and inverse stages by standard
+YUV_STAGES = {'HDTV': LinearStage(YUV_MAT_BT709), 'SDTV': LinearStage(YUV_MAT_BT601)}
+YUV_INV_STAGES = {'HDTV': LinearStage(YUV_MAT_BT709_INV), 'SDTV': LinearStage(YUV_MAT_BT601_INV)}
 
 
 class YuvConverter(ConverterBaseclass):
@@ -49,16 +59,16 @@ class YuvConverter(ConverterBaseclass):
 
         """
 
-        # override if inputs present
-        self._arr = img if img is not None else self._arr
-        self._inv = inverse if inverse else self._inv
+        # use inputs if present (kept local for reentrancy)
+        arr = img if img is not None else self._arr
+        inv = inverse if inverse else self._inv
 
-        if not self._inv:
-            self._arr = rgb2yuv(rgb=self._arr, standard=standard)
+        if not inv:
+            arr = rgb2yuv(rgb=arr, standard=standard)
         else:
-            self._arr = yuv2rgb(yuv=self._arr, standard=standard)
+            arr = yuv2rgb(yuv=arr, standard=standard)
 
-        return self._arr
+        return arr
 
 
 def yuv2rgb(yuv: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
@@ -73,22 +83,10 @@ def yuv2rgb(yuv: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
 
     """
 
-    # store shape
-    shape = yuv.shape
-
     # choose standard
-    yuv_mat = YUV_MAT_BT709_INV if standard == 'HDTV' else YUV_MAT_BT601_INV
-
-    # reshape image to channel vectors
-    yuv = yuv.reshape(-1, 3).T
-
-    # convert to yuv
-    yuv = np.dot(yuv_mat, yuv)
+    stage = YUV_INV_STAGES['HDTV' if standard == 'HDTV' else 'SDTV']
 
-    # reshape to 2-D image
-    yuv = yuv.T.reshape(shape)
-
-    return yuv
+    return stage(yuv)
 
 
 def rgb2yuv(rgb: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
@@ -103,22 +101,10 @@ def rgb2yuv(rgb: np.ndarray = None, standard: str = 'HDTV') -> np.ndarray:
 
     """
 
-    # store shape
-    shape = rgb.shape
-
     # choose standard
-    yuv_mat = YUV_MAT_BT709 if standard == 'HDTV' else YUV_MAT_BT601
-
-    # reshape image to channel vectors
-    rgb = rgb.reshape(-1, 3).T
-
-    # convert to yuv
-    yuv = np.dot(yuv_mat, rgb)
-
-    # reshape to 2-D image
-    yuv = yuv.T.reshape(shape)
+    stage = YUV_STAGES['HDTV' if standard == 'HDTV' else 'SDTV']
 
-    return yuv
+    return stage(rgb)
 
 
 def yuv_conv(img: np.ndarray = None, inverse: bool = False, standard: str = 'HDTV') -> np.ndarray:
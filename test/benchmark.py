@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from color_space_converter import rgb2lab, rgb2hsv, hsv2rgb, convert, convert_many, rgb2lin, rgb2xyz
+from color_space_converter.gamut import map_gamut
+from color_space_converter.quantizer import ColorQuantizer, nearest_brute
+from color_space_converter.top_level import normalize_img
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+
+def best_time(fun, *args, repeat=3, **kwargs):
+    """ measure best run time of a function call in seconds """
+
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fun(*args, **kwargs)
+        times.append(time.perf_counter() - t)
+
+    return min(times)
+
+
+def peak_bytes(fun, *args, **kwargs):
+    """ measure peak memory allocated during a function call in bytes excluding its returned result """
+
+    tracemalloc.start()
+    res = fun(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return peak - getattr(res, 'nbytes', 0)
+
+
+def bench_quantizer(size=1024, num=300, grid=32):
+    """ compare grid index quantization against brute force nearest color search """
+
+    rng = np.random.default_rng(seed=0)
+    pal = rgb2lab(rng.integers(0, 2**8, (num, 1, 3)).astype('float')).reshape(-1, 3)
+    img = rgb2lab(rng.integers(0, 2**8, (size, size, 3)).astype('float'))
+    vecs = img.reshape(-1, 3)
+
+    # naive search computing the full difference tensor per chunk
+    def naive(step=2**10):
+        return [np.argmin(np.sum(np.square(vecs[i:i+step, np.newaxis] - pal), axis=-1), axis=-1)
+                for i in range(0, vecs.shape[0], step)]
+
+    quantizer = ColorQuantizer(pal, grid=grid)
+    ref = nearest_brute(vecs, pal)[1]
+    res = {
+        'build': best_time(ColorQuantizer, pal, grid=grid),
+        'naive': best_time(naive, repeat=1),
+        'brute': best_time(nearest_brute, vecs, pal),
+        'exact': best_time(quantizer.quantize, img, exact=True, index=True),
+        'approx': best_time(quantizer.quantize, img, exact=False, index=True),
+    }
+
+    print('Quantizer with %s palette colors on %sx%s pixels:' % (num, size, size))
+    for key, val in res.items():
+        print('  %-8s %8.3f s' % (key, val))
+    for exact in (True, False):
+        dst = quantizer.query(vecs, exact=exact)[1]
+        print('  %-8s %8.3f %% nearest' % ('exact' if exact else 'approx', 100 * np.mean(np.isclose(dst, ref))))
+
+    return res
+
+
+def bench_hsv(size=2048):
+    """ compare HSV conversion against the former boolean mask scatter implementation """
+
+    def rgb2hsv_mask(rgb):
+        rgb = rgb.astype('float')
+        maxv, maxc = np.amax(rgb, axis=2), np.argmax(rgb, axis=2)
+        minv, minc = np.amin(rgb, axis=2), np.argmin(rgb, axis=2)
+        hsv = np.zeros(rgb.shape, dtype='float')
+        hsv[maxc == minc, 0] = np.zeros(hsv[maxc == minc, 0].shape)
+        hsv[maxc == 0, 0] = (((rgb[..., 1] - rgb[..., 2]) * 60.0 / (maxv - minv + np.spacing(1))) % 360.0)[maxc == 0]
+        hsv[maxc == 1, 0] = (((rgb[..., 2] - rgb[..., 0]) * 60.0 / (maxv - minv + np.spacing(1))) + 120.0)[maxc == 1]
+        hsv[maxc == 2, 0] = (((rgb[..., 0] - rgb[..., 1]) * 60.0 / (maxv - minv + np.spacing(1))) + 240.0)[maxc == 2]
+        hsv[maxv == 0, 1] = np.zeros(hsv[maxv == 0, 1].shape)
+        hsv[maxv != 0, 1] = (1 - minv / (maxv + np.spacing(1)))[maxv != 0]
+        hsv[..., 2] = maxv
+        return hsv
+
+    def hsv2rgb_mask(hsv):
+        hi = (np.floor(hsv[..., 0] / 60.0) % 6).astype('uint8')
+        v = hsv[..., 2].astype('float')
+        f = (hsv[..., 0] / 60.0) - np.floor(hsv[..., 0] / 60.0)
+        p, q, t = v * (1.0 - hsv[..., 1]), v * (1.0 - (f * hsv[..., 1])), v * (1.0 - ((1.0 - f) * hsv[..., 1]))
+        rgb = np.zeros(hsv.shape)
+        for k, chs in enumerate([(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)]):
+            rgb[hi == k, :] = np.dstack(chs)[hi == k, :]
+        return rgb
+
+    img = np.random.default_rng(seed=0).integers(0, 2**8, (size, size, 3)).astype('float')
+    hsv = rgb2hsv(img)
+    funs = {'rgb2hsv': (rgb2hsv_mask, rgb2hsv, img), 'hsv2rgb': (hsv2rgb_mask, hsv2rgb, hsv)}
+
+    print('HSV on %sx%s pixels (temporary memory peak and time of former vs. current):' % (size, size))
+    res = {}
+    for key, (old, new, arr) in funs.items():
+        res[key] = [peak_bytes(old, arr), peak_bytes(new, arr), best_time(old, arr), best_time(new, arr)]
+        print('  %-8s %8.1f MB %8.1f MB %8.3f s %8.3f s' % ((key,) + tuple(v / 2**20 for v in res[key][:2]) +
+                                                          tuple(res[key][2:])))
+
+    return res
+
+
+def bench_many(size=2048, methods=('gry', 'yuv', 'hsv', 'lab', 'oklab', 'ictcp')):
+    """ compare a multi-output conversion against independent conversions per method """
+
+    img = np.random.default_rng(seed=0).integers(0, 2**8, (size, size, 3), dtype='uint8')
+
+    def separate():
+        return {m: convert(img, method=m) for m in methods}
+
+    res = {'separate': best_time(separate), 'many': best_time(convert_many, img, methods)}
+
+    print('Conversion of %sx%s pixels to %s:' % (size, size, ', '.join(methods)))
+    for key, val in res.items():
+        print('  %-8s %8.3f s' % (key, val))
+
+    return res
+
+
+def bench_hdr(shape=(2160, 3840), bits=10, transfer='PQ'):
+    """ compare table lookup decoding of integer HDR frames against the vectorized kernel on floats """
+
+    img = np.random.default_rng(seed=0).integers(0, 2**bits, shape + (3,), dtype='uint16')
+    rng = (0, 2**bits - 1)
+    flt, half = img.astype('float'), (img / rng[1]).astype('float16')
+
+    res = {
+        'lin kernel': best_time(rgb2lin, flt, input_range=rng, transfer=transfer),
+        'lin lut': best_time(rgb2lin, img, input_range=rng, transfer=transfer),
+        'lin half': best_time(rgb2lin, half, input_range=(0, 1), transfer=transfer),
+        'xyz kernel': best_time(rgb2xyz, flt, input_range=rng, transfer=transfer),
+        'xyz lut': best_time(rgb2xyz, img, input_range=rng, transfer=transfer),
+    }
+
+    print('Decoding of %sx%s pixels with %s-bit %s:' % (shape[1], shape[0], bits, transfer))
+    for key, val in res.items():
+        print('  %-10s %8.3f s' % (key, val))
+
+    return res
+
+
+def bench_gamut(size=2048, method='lab'):
+    """ compare the output stage of gamut handling and quantization against global normalization """
+
+    rgb = np.random.default_rng(seed=0).integers(0, 2**8, (size, size, 3), dtype='uint8')
+    res = convert(convert(rgb, method=method, input_range='dtype'), method=method, inverse=True)
+
+    stats = {'normalize': (best_time(normalize_img, res), peak_bytes(normalize_img, res))}
+    for gamut in ('clip', 'soft', 'chroma'):
+        stats[gamut] = (best_time(map_gamut, res, gamut, 'uint8'), peak_bytes(map_gamut, res, gamut, 'uint8'))
+
+    print('Output stage of %sx%s pixels after inverse %s conversion to uint8:' % (size, size, method))
+    for key, val in stats.items():
+        print('  %-10s %8.3f s %8.1f MB' % (key, val[0], val[1] / 2**20))
+
+    return stats
+
+
+def bench_linear(size=2048):
+    """ compare transposed matrix products of chained stages against fused single-product stages """
+
+    from color_space_converter.linear_stage import LinearStage, fuse
+    from color_space_converter.lms_converter import MAT_LMS
+    from color_space_converter.xyz_converter import xyz_matrix
+    from color_space_converter.yuv_converter import YUV_MAT_BT709
+
+    def legacy(img, *mats):
+        arr = img.reshape(-1, 3).T
+        for mat in mats:
+            arr = np.dot(mat, arr)
+        return np.ascontiguousarray(arr.T.reshape(img.shape))
+
+    lin = np.random.default_rng(seed=0).random((size, size, 3))
+    rgb = (lin * 255).astype('uint8')
+    yuv, lms = LinearStage(YUV_MAT_BT709), fuse(LinearStage(100 * xyz_matrix()), LinearStage(MAT_LMS))
+
+    stats = {'yuv legacy': (best_time(legacy, rgb, YUV_MAT_BT709), peak_bytes(legacy, rgb, YUV_MAT_BT709)),
+             'yuv stage': (best_time(yuv, rgb), peak_bytes(yuv, rgb)),
+             'lms legacy': (best_time(legacy, lin, 100 * xyz_matrix(), MAT_LMS),
+                            peak_bytes(legacy, lin, 100 * xyz_matrix(), MAT_LMS)),
+             'lms fused': (best_time(lms, lin), peak_bytes(lms, lin))}
+
+    print('Matrix stages of %sx%s pixels:' % (size, size))
+    for key, val in stats.items():
+        print('  %-10s %8.3f s %8.1f MB' % (key, val[0], val[1] / 2**20))
+
+    return stats
+
+
+def _convert_lab(img):
+    return convert(img, method='lab')
+
+
+def bench_shm(frames=32, shape=(1080, 1920), workers=4):
+    """ compare a process pool pickling frames and results against the shared memory executor """
+
+    import multiprocessing
+    from color_space_converter.shm_executor import SharedMemoryExecutor
+
+    batch = np.random.default_rng(seed=0).integers(0, 2**8, (frames,) + shape + (3,), dtype='uint8')
+
+    with multiprocessing.Pool(workers) as pool:
+        stats = {'pickled': best_time(pool.map, _convert_lab, list(batch))}
+    with SharedMemoryExecutor(workers, method='lab') as ex:
+        stats['shared'] = best_time(ex.map, batch)
+        buf = ex.empty(batch.shape, batch.dtype)
+        buf[...] = batch
+        stats['in place'] = best_time(ex.map, buf)
+
+    print('Lab conversion of %s frames of %sx%s pixels by %s processes:' % (frames, shape[1], shape[0], workers))
+    for key, val in stats.items():
+        print('  %-10s %8.3f s' % (key, val))
+
+    return stats
+
+
+BENCHMARKS = {'quantizer': bench_quantizer, 'hsv': bench_hsv, 'many': bench_many, 'hdr': bench_hdr,
+              'gamut': bench_gamut, 'shm': bench_shm,
+              'linear': bench_linear}
+
+
+if __name__ == '__main__':
+
+    # run benchmarks given by name or all of them
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+__author__ = "Christopher Hahne"
+__email__ = "inbox@christopherhahne.de"
+__license__ = """
+    Copyright (c) 2020 Christopher Hahne <inbox@christopherhahne.de>
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+
+from color_space_converter.top_level import convert, METHODS
+from color_space_converter.xyz_converter import input_white
+
+import getopt
+import json
+import os
+import sys
+import time
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regression_baseline.json')
+
+DTYPES = ('uint8', 'uint16', 'float32', 'float64')
+STANDARDS = ('HDTV', 'SDTV')
+
+# accuracy records may exceed their baseline by this relative and absolute amount
+ERROR_RTOL = 1e-3
+ERROR_ATOL = 1e-10
+
+
+def test_sets():
+    """ synthetic RGB images ranging from 0 to 1 """
+
+    # 8-bit RGB cube sampled in steps of 5 including both ends
+    lvl = np.arange(0, 256, 5) / 255.
+    cube = np.stack(np.meshgrid(lvl, lvl, lvl, indexing='ij'), axis=-1).reshape(len(lvl)**2, len(lvl), 3)
+
+    # smooth ramps along rows, columns and the diagonal
+    y, x = np.mgrid[0:64, 0:1024]
+    ramp = np.stack([x / 1023., y / 63., 1 - (x / 1023. + y / 63.) / 2], axis=-1)
+
+    # uniform random colors
+    rand = np.random.default_rng(seed=0).random((256, 256, 3))
+
+    return {'cube': cube, 'gradient': ramp, 'random': rand}
+
+
+def cast(img, dtype):
+    """ cast normalized image to the data type where integers span their full range """
+
+    if np.dtype(dtype).kind == 'u':
+        return np.rint(img * np.iinfo(dtype).max).astype(dtype)
+
+    return img.astype(dtype)
+
+
+def round_trip(img, method, standard):
+    """ convert forward and backward where integers are normalized by their type, which is also the white of 'hsl' """
+
+    rng = 'dtype' if img.dtype.kind == 'u' else (0, 1)
+    res = convert(img, method=method, standard=standard, input_range=rng)
+
+    return convert(res, method=method, standard=standard, inverse=True, white=input_white(img, rng))
+
+
+def measure(name, img, method, standard, dtype, repeat=3):
+    """ measure round-trip errors relative to white and throughput in mega pixels per second """
+
+    arr = cast(img, dtype)
+
+    # gray is not invertible so that its luma replicated to 3 channels serves as reference
+    ref = arr.astype('float64')
+    if method == 'gry':
+        ref = convert(ref, method='gry', standard=standard)
+        ref = np.repeat(ref, 3, axis=-1)
+
+    # spaces either return normalized RGB or preserve the input scale, which the white round trip tells apart
+    white = round_trip(cast(np.ones((1, 1, 3)), dtype), method, standard).max()
+    scale = np.iinfo(dtype).max if np.dtype(dtype).kind == 'u' else 1.
+    ref = ref / scale * white
+
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        res = round_trip(arr, method, standard)
+        times.append(time.perf_counter() - t)
+
+    err = np.abs(res - ref) / white
+
+    return {'max_error': float(err.max()), 'mean_error': float(err.mean()),
+            'mpix_per_s': round(arr.shape[0] * arr.shape[1] / min(times) / 1e6, 2)}
+
+
+def run(methods=None, dtypes=DTYPES, standards=STANDARDS, sets=None, repeat=3, verbose=True):
+    """ collect accuracy and throughput records keyed by 'set/method/standard/dtype' """
+
+    imgs = test_sets()
+    records = {}
+    for name in sets or imgs:
+        for method in methods or METHODS:
+            for standard in standards:
+                for dtype in dtypes:
+                    key = '/'.join([name, method, standard, dtype])
+                    records[key] = measure(name, imgs[name], method, standard, dtype, repeat=repeat)
+                    if verbose:
+                        print('%-32s max %.3e mean %.3e %8.2f MPix/s' % ((key,) + tuple(records[key].values())))
+
+    return records
+
+
+def compare(records, baseline, tolerance=.5):
+    """ list regressions of accuracy beyond float tolerances or of throughput beyond the given fraction """
+
+    failures = []
+    for key, rec in records.items():
+        ref = baseline.get(key)
+        if ref is None:
+            continue
+        for metric in ('max_error', 'mean_error'):
+            if rec[metric] > ref[metric] * (1 + ERROR_RTOL) + ERROR_ATOL:
+                failures.append('%s %s %.3e exceeds baseline %.3e' % (key, metric, rec[metric], ref[metric]))
+        if tolerance is not None and rec['mpix_per_s'] < ref['mpix_per_s'] * (1 - tolerance):
+            failures.append('%s throughput %.2f below baseline %.2f MPix/s' % (key, rec['mpix_per_s'],
+                                                                              ref['mpix_per_s']))
+
+    return failures
+
+
+def load_baseline(path=BASELINE_PATH):
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(baseline, path=BASELINE_PATH):
+    """ write one record per line for readable diffs """
+
+    lines = ['"%s": %s' % (key, json.dumps(baseline[key])) for key in sorted(baseline)]
+    with open(path, 'w') as f:
+        f.write('{\n' + ',\n'.join(lines) + '\n}\n')
+
+
+def usage():
+
+    print("Usage: python -m test.regression <options> (from the repository root)\n")
+    print("Options:")
+    print("               --methods=<str>    Comma-separated methods (defaults to all)")
+    print("               --dtypes=<str>     Comma-separated input types (defaults to %s)" % ','.join(DTYPES))
+    print("               --sets=<str>       Comma-separated test sets of 'cube', 'gradient' and 'random'")
+    print("               --tolerance=<float> Accepted fraction of throughput loss (default 0.5)")
+    print("               --update           Write the records as new baseline")
+    print("-h,            --help             Print this help message")
+    print("")
+
+
+def main(argv):
+
+    opts, _ = getopt.getopt(argv, "h", ["help", "methods=", "dtypes=", "sets=", "tolerance=", "update"])
+    cfg = {'methods': None, 'dtypes': DTYPES, 'sets': None, 'tolerance': .5, 'update': False}
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            usage()
+            return 0
+        if opt in ("--methods", "--dtypes", "--sets"):
+            cfg[opt[2:]] = arg.split(',')
+        if opt == "--tolerance":
+            cfg['tolerance'] = float(arg)
+        if opt == "--update":
+            cfg['update'] = True
+
+    records = run(cfg['methods'], cfg['dtypes'], sets=cfg['sets'])
+
+    # merge records into the baseline so that partial runs refresh their entries only
+    if cfg['update']:
+        baseline = load_baseline() if os.path.exists(BASELINE_PATH) else {}
+        baseline.update(records)
+        save_baseline(baseline)
+        print('Baseline of %s records written to %s' % (len(baseline), BASELINE_PATH))
+        return 0
+
+    failures = compare(records, load_baseline(), cfg['tolerance'])
+    for failure in failures:
+        print('REGRESSION ' + failure)
+    print('%s regression(s) in %s records' % (len(failures), len(records)))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+
+    sys.exit(main(sys.argv[1:]))
@@ -20,8 +20,17 @@ __license__ = """
 
 """
 
-from color_space_converter.top_level import ColorSpaceConverter, METHODS, normalize_img
+from color_space_converter.top_level import ColorSpaceConverter, METHODS, normalize_img, convert, encode_img, fixed_range
 from color_space_converter import gry_conv, hsv_conv, lab_conv, lms_conv, xyz_conv, yuv_conv
+from color_space_converter import rgb2hsl, hsl2rgb, rgb2hsi, hsi2rgb
+from color_space_converter import rgb2hsv, hsv2rgb, rgb2lab, lab2rgb, rgb2lms, lms2rgb, rgb2xyz, xyz2rgb
+from color_space_converter import low_cardinality, unique_colors, delta_e, nearest_color, rgb2yuv, rgb2gry
+from color_space_converter import ColorQuantizer, nearest_brute
+from color_space_converter import lin2oklab, lin2ictcp, xyz2jzazbz, rgb2luv, lab2lch, rgb2lin, lin2xyz
+from color_space_converter import convert_many, ColorModel, adaptation_matrix, pq_decode, hlg_encode, hlg_decode
+from color_space_converter import map_gamut, get_matrix
+from color_space_converter.color_model import model_matrix
+from color_space_converter import RoiConverter, BufferLayout, as_array, register, unregister, get_converter
 
 import unittest
 import os, sys
@@ -83,17 +92,512 @@ class ColorSpaceConverterTester(unittest.TestCase):
 
         return True
 
-    @idata(([m, ref] for m, ref in zip(METHODS+['wrong_arg'], (16971, 255, 515, 2000, 583, 474, 0))))
+    @idata(([p, d, f] for p, d, f in [['minmax', 8, 'png'], ['percentile', 16, 'png'], ['fixed', 16, 'tiff'],
+                                     ['fixed', 8, 'png'], ['minmax', 8, 'npy']]))
+    @unpack
+    def test_cli_output(self, policy, depth, fmt):
+        """ validate output policies, bit depths and floating point formats of the CLI """
+
+        from color_space_converter.bin.cli import main
+
+        # run cli command
+        sys.argv = sys.argv[:1] + ['-s', os.path.join(self.dat_path, self.fn_img), '-m', 'lab', '--policy', policy,
+                                   '--depth', str(depth), '--format', fmt]
+        ret = main()
+
+        # compare with output stage of the dense conversion
+        fp = os.path.join(self.dat_path, 'chelsea_lab.' + fmt)
+        res = np.load(fp) if fmt == 'npy' else imageio.imread(fp)
+        obj = ColorSpaceConverter(imageio.imread(os.path.join(self.dat_path, self.fn_img)), method='lab')
+        bounds = fixed_range('lab', False, 'HDTV', 255.) if policy == 'fixed' else None
+        ref = obj.main() if fmt == 'npy' else encode_img(obj.main(), policy, 'uint%s' % depth, bounds)
+
+        # pillow reads the most significant byte of 16-bit RGB PNGs
+        ref = ref >> 8 if depth == 16 and fmt == 'png' else ref
+
+        # assertion
+        self.assertEqual(True, ret)
+        self.assertEqual(ref.dtype if fmt != 'png' else np.uint8, res.dtype)
+        self.assertEqual(True, np.array_equal(res, ref))
+
+        return True
+
+    def test_encode_img(self):
+        """ validate the tiled output stage against a direct computation """
+
+        img = convert(self.ref_img, method='lab', input_range='dtype')
+        lo, hi = np.min(img), np.max(img)
+        ref = np.uint8(np.rint((img - lo) / (hi - lo) * 255))
+        res = encode_img(img, tile_size=1000)
+        bounds = fixed_range('lab')
+
+        # assertion
+        self.assertEqual(True, np.abs(res.astype(int) - ref).max() <= 1)
+        self.assertEqual(True, np.abs(encode_img(img, 'minmax', 'uint16') / 257. - ref).max() <= 1)
+        self.assertEqual(True, encode_img(img, 'percentile').max() == 255 and encode_img(img[..., 0]).ndim == 2)
+        self.assertEqual(True, np.array_equal(encode_img(img, 'fixed', bounds=bounds)[..., 0],
+                                              np.uint8(np.rint(np.clip(img[..., 0], 0, 100) * 2.55))))
+        self.assertRaises(BaseException, encode_img, img, 'fixed')
+
+        return True
+
+    def test_cli_recursive(self):
+        """ validate recursive conversion into a mirrored tree and incremental re-runs by the manifest """
+
+        from color_space_converter.bin.cli import main
+        import shutil
+
+        # create source tree of small images
+        src, dst = os.path.join(self.dat_path, 'tree'), os.path.join(self.dat_path, 'tree_out')
+        shutil.rmtree(src, ignore_errors=True), shutil.rmtree(dst, ignore_errors=True)
+        for rel in ['a.png', 'sub/b.png', 'sub/deep/c.png', 'skip/d.png', 'sub/e.jpg']:
+            os.makedirs(os.path.dirname(os.path.join(src, rel)), exist_ok=True)
+            imageio.imwrite(os.path.join(src, rel), self.ref_img[:32, :32])
+
+        def run(*args):
+            sys.argv = sys.argv[:1] + ['-s', src, '-o', dst, '-m', 'lab', '-r', '--include=*.png', '--exclude=skip']
+            sys.argv += list(args)
+            return main()
+
+        def mtimes():
+            return {r: os.stat(os.path.join(dst, r)).st_mtime_ns for r in
+                    ['a_lab.png', 'sub/b_lab.png', 'sub/deep/c_lab.png']}
+
+        # initial run mirrors included files only
+        self.assertEqual(True, run())
+        ref = mtimes()
+        self.assertEqual(False, os.path.exists(os.path.join(dst, 'skip')) or os.path.exists(os.path.join(dst, 'sub',
+                                                                                                         'e_lab.jpg')))
+
+        # re-run skips unchanged and touched files while modified files and changed settings are converted
+        os.utime(os.path.join(src, 'sub', 'b.png'))
+        imageio.imwrite(os.path.join(src, 'a.png'), self.ref_img[:16, :16])
+        self.assertEqual(True, run())
+        res = mtimes()
+        self.assertEqual(True, res['sub/b_lab.png'] == ref['sub/b_lab.png'] and res['a_lab.png'] != ref['a_lab.png'])
+        self.assertEqual(True, res['sub/deep/c_lab.png'] == ref['sub/deep/c_lab.png'])
+        self.assertEqual((16, 16, 3), imageio.imread(os.path.join(dst, 'a_lab.png')).shape)
+        self.assertEqual(True, run('--standard=SDTV') and mtimes()['sub/deep/c_lab.png'] != res['sub/deep/c_lab.png'])
+
+        # resume after an interrupted run where the manifest lacks the last record
+        fp = os.path.join(dst, '.color_space_converter.jsonl')
+        with open(fp) as f:
+            lines = f.readlines()
+        with open(fp, 'w') as f:
+            f.writelines(lines[:-1] + [lines[-1][:10]])
+        res = mtimes()
+        self.assertEqual(True, run('--standard=SDTV'))
+        self.assertEqual(1, sum(mtimes()[r] != res[r] for r in res))
+
+        # in-place runs of several methods neither take outputs of each other as inputs nor forget their own
+        shutil.rmtree(dst)
+        dst = src
+        for method in ('lab', 'yuv'):
+            self.assertEqual(True, run('-m', method))
+        res = mtimes()
+        self.assertEqual(True, run('-m', 'lab') and mtimes() == res)
+        names = [name for _, _, files in os.walk(src) for name in files]
+        self.assertEqual(True, 'a_yuv.png' in names and not any(name.count('_') > 1 for name in names
+                                                                  if not name.startswith('.')))
+
+        return True
+
+    @data('lab', 'hsv', 'yuv')
+    def test_color_stats(self, method):
+        """ validate tiled statistics against the converted image and subsampled means against their error bound """
+
+        from color_space_converter import color_stats
+
+        img = np.tile(self.ref_img, (2, 2, 1))
+        ref = convert(img, method=method, input_range='dtype').reshape(-1, 3)
+        res = color_stats(img, method=method, input_range='dtype', bins=512, tile_size=2**14)
+
+        # exact moments and extrema except for circular hue statistics
+        lin = [c for c in range(3) if method != 'hsv' or c != 0]
+        self.assertEqual(True, np.allclose(res['mean'][lin], ref.mean(0)[lin]) and np.allclose(res['std'][lin],
+                                                                                               ref.std(0)[lin]))
+        self.assertEqual(True, np.allclose(res['min'], ref.min(0)) and np.allclose(res['max'], ref.max(0)))
+        self.assertEqual((len(ref), (3, 512)), (res['count'], res['histogram'][0].shape))
+        self.assertEqual(True, np.all(res['histogram'][0].sum(1) == len(ref)))
+
+        # percentiles within a bin width
+        width = np.diff(res['histogram'][1][:, :2], axis=1).ravel()
+        for p in (5, 50, 95):
+            self.assertEqual(True, np.all(np.abs(res['percentiles'][p] - np.percentile(ref, p, axis=0)) <= width))
+
+        # subsampled means lie within a few bounds of the confidence interval
+        sub = color_stats(img, method=method, input_range='dtype', sample=.1, seed=3, tile_size=2**14)
+        self.assertEqual((len(ref), True), (sub['total'], sub['count'] < len(ref) / 5))
+        self.assertEqual(True, np.all(np.abs(sub['mean'] - ref.mean(0))[lin] <= 3 * sub['mean_error'][lin]))
+
+        return True
+
+    def test_color_histogram(self):
+        """ validate merging, serialization and joint counts of histogram sketches against a single pass """
+
+        from color_space_converter import ColorHistogram
+        import json, pickle
+
+        whole = ColorHistogram('hsv', bins=36, input_range=(0, 255), joint=True).update(self.ref_img)
+        parts = [ColorHistogram('hsv', bins=36, input_range=(0, 255), joint=True).update(img, tile_size=999)
+                 for img in np.array_split(self.ref_img, 3, axis=0)]
+
+        # sketches of parts sent as JSON merge to the sketch of the whole image
+        msgs = [json.dumps(part.to_dict()) for part in parts]
+        total = ColorHistogram.from_dict(json.loads(msgs[0]))
+        for msg in msgs[1:]:
+            total += ColorHistogram.from_dict(json.loads(msg))
+        self.assertEqual(True, np.array_equal(total.counts, whole.counts))
+        self.assertEqual(True, np.array_equal(total.acc['joint'], whole.acc['joint']))
+        res, ref = total.stats(), whole.stats()
+        self.assertEqual(True, all(np.allclose(res[k], ref[k]) for k in ('mean', 'std', 'min', 'max')))
+
+        # counts match the converted image where the joint histogram marginalizes to the channel histograms
+        hsv = convert(self.ref_img, method='hsv', input_range='dtype').reshape(-1, 3)
+        self.assertEqual(True, np.array_equal(whole.counts[2], np.histogram(hsv[:, 2], 36, (0, 255))[0]))
+        self.assertEqual(True, np.array_equal(whole.acc['joint'].sum(axis=(0, 1)), whole.counts[2]))
+        self.assertEqual((hsv.shape[0], 36**3 * 8), (whole.count, whole.acc['joint'].nbytes))
+
+        # sketches pickle for process pools and refuse merging different settings
+        self.assertEqual(True, np.array_equal(pickle.loads(pickle.dumps(parts[0] + parts[1])).counts,
+                                              parts[0].counts + parts[1].counts))
+        self.assertRaises(BaseException, whole.merge, ColorHistogram('hsv', bins=18, input_range=(0, 255), joint=True))
+        self.assertRaises(BaseException, whole.merge, ColorHistogram('hsv', bins=36, joint=True))
+
+        # the range of the input type is mapped to the bounds of the sketch so that darker images yield lower values
+        hist = ColorHistogram('hsv', bins=36).update(self.ref_img)
+        deep = ColorHistogram('hsv', bins=36).update(self.ref_img.astype('uint16') * 257)
+        self.assertEqual(True, np.allclose(hist.stats()['mean'], deep.stats()['mean']))
+        self.assertEqual(True, hist.counts[2, -1] < hist.count / 10 and np.all(hist.acc['max'] <= [360, 1, 1]))
+        half = ColorHistogram('hsv', bins=36).update(self.ref_img // 2)
+        self.assertEqual(True, half.stats()['mean'][2] < .6 * hist.stats()['mean'][2])
+        self.assertRaises(BaseException, ColorHistogram, 'hsv', input_range='auto')
+
+        return True
+
+    def test_regression(self):
+        """ validate round-trip accuracy of all methods and input types against the recorded baseline """
+
+        from test.regression import run, compare, load_baseline
+
+        records = run(sets=['random'], repeat=1, verbose=False)
+        failures = compare(records, load_baseline(), tolerance=None)
+        self.assertEqual([], failures)
+        self.assertEqual(len(METHODS) * 2 * 4, len(records))
+
+        return True
+
+    def test_matrix_registry(self):
+        """ validate registered matrices regarding exact inverses, caching and lossless round trips """
+
+        from color_space_converter.matrix_registry import get_matrix, matrix_names, round_trip_error
+        from color_space_converter.yuv_converter import yuv2rgb, YUV_MAT_BT709_INV
+
+        # inverses are derived once and shared read-only
+        for name in matrix_names():
+            if name.startswith('gry'):
+                self.assertRaises(BaseException, get_matrix, name, True)
+                continue
+            self.assertEqual(True, round_trip_error(name) < 1e-12, msg=name)
+            self.assertEqual(True, get_matrix(name, True) is get_matrix(name, True))
+            self.assertEqual(False, get_matrix(name, inverse=True).flags.writeable)
+        self.assertRaises(BaseException, get_matrix, 'unknown')
+
+        self.assertEqual(True, get_matrix('yuv_hdtv', True) is YUV_MAT_BT709_INV)
+
+        # round trips reproduce the input up to float precision
+        for standard in ('HDTV', 'SDTV'):
+            res = yuv2rgb(rgb2yuv(self.ref_img, standard), standard)
+            self.assertEqual(True, np.abs(res - self.ref_img).max() < 1e-9)
+        for fwd, inv in [(rgb2lms, lms2rgb), (rgb2xyz, xyz2rgb)]:
+            res = inv(fwd(self.ref_img[:64, :64], input_range='dtype'))
+            self.assertEqual(True, np.abs(res - self.ref_img[:64, :64] / 255.).max() < 1e-9)
+
+        return True
+
+    def test_linear_stage(self):
+        """ validate composition, inversion and layout of affine stages against chained matrix products """
+
+        from color_space_converter.linear_stage import LinearStage, fuse
+        from color_space_converter.lms_converter import MAT_LMS, LIN_LMS_STAGE
+        from color_space_converter.xyz_converter import lin2xyz
+
+        lin = np.random.default_rng(seed=1).random((16, 8, 3))
+        a, b = LinearStage(MAT_LMS, [1, 2, 3]), LinearStage(np.arange(6).reshape(2, 3), [.5, -.5])
+        ref = np.einsum('ij,hwj->hwi', b.matrix, np.einsum('ij,hwj->hwi', a.matrix, lin) + a.offset) + b.offset
+        res = fuse(a, b)(lin)
+        self.assertEqual((True, (16, 8, 2), True), (np.allclose(res, ref), res.shape, res.flags.c_contiguous))
+        self.assertEqual(True, np.allclose(a.inverse()(a(lin)), lin))
+
+        # fused lms stage matches the xyz intermediate while keeping the promoted type of the legacy functions
+        self.assertEqual(True, np.allclose(LIN_LMS_STAGE(lin), np.dot(lin2xyz(lin), MAT_LMS.T)))
+        self.assertEqual((np.float64, np.float32), (rgb2yuv(self.ref_img).dtype, a(lin, 'float32').dtype))
+        self.assertEqual((128, 128, 1), rgb2gry(self.ref_img[:128, :128]).shape)
+
+        return True
+
+    def test_shm_executor(self):
+        """ validate batch conversion through shared memory regarding results, ring reuse and block lifetime """
+
+        from color_space_converter.shm_executor import SharedMemoryExecutor, SharedBlock
+
+        batch = np.stack([np.roll(self.ref_img[:64, :64], 5*i, axis=1) for i in range(5)])
+        with SharedMemoryExecutor(workers=2, slots=2, method='lab', input_range='dtype') as ex:
+            res = ex.map(batch)
+            ref = [convert(frame, method='lab', input_range='dtype') for frame in batch]
+            self.assertEqual((True, (5, 64, 64, 3)), (np.allclose(res, ref), res.shape))
+
+            # frames allocated in shared memory are converted in place with overriding arguments
+            buf = ex.empty(batch.shape[:-1], 'uint8')
+            buf[...] = batch[..., 0]
+            gry = ex.map(buf, method='gry', inverse=True)
+            self.assertEqual(True, np.allclose(gry[2], convert(batch[2, ..., 0], method='gry', inverse=True)))
+
+            # larger batches replace ring blocks while results still in use remain valid
+            sub = res[1]
+            res = ex.map(np.concatenate([batch] * 3))
+            self.assertEqual(True, np.allclose(sub, ref[1]) and np.allclose(res[12], ref[2]))
+            self.assertEqual(1, len(SharedBlock.pending))
+            del sub
+            ex.map(batch[:1])
+            self.assertEqual(0, len(SharedBlock.pending))
+
+        return True
+
+    def test_pipeline(self):
+        """ validate concurrent stages regarding results, bounded buffering, statistics and error propagation """
+
+        from color_space_converter.bin.pipeline import Stage, run_pipeline
+        from color_space_converter.bin.cli import main
+        import threading, time
+
+        # items pass all stages once while the number of items between first and last stage is bounded by the depth
+        out, flight, peak, lock = [], [0], [0], threading.Lock()
+
+        def first(x):
+            with lock:
+                flight[0] += 1
+                peak[0] = max(peak[0], flight[0])
+            return x
+
+        def middle(x):
+            if x % 5:
+                return x**2
+            with lock:
+                flight[0] -= 1
+
+        def last(x):
+            time.sleep(.002)
+            with lock:
+                flight[0] -= 1
+                out.append(x)
+
+        stages = [Stage('read', first, 3), Stage('convert', middle, 2), Stage('write', last)]
+        stats = run_pipeline(range(100), stages, depth=2)
+        self.assertEqual(sorted(x**2 for x in range(100) if x % 5), sorted(out))
+        self.assertEqual([100, 100, 80], [s['count'] for s in stats['stages']])
+        self.assertEqual(True, peak[0] <= 2*2 + 3 + 2 + 1)
+        self.assertEqual(True, stats['stages'][-1]['utilization'] > stats['stages'][0]['utilization'])
+
+        # queue depths of stages take precedence over the depth of the pipeline
+        out[:], flight[0], peak[0] = [], 0, 0
+        stages = [Stage('read', first, 3), Stage('convert', middle, 2, depth=1), Stage('write', last, depth=1)]
+        run_pipeline(range(100), stages, depth=50)
+        self.assertEqual((80, True), (len(out), peak[0] <= 1 + 1 + 3 + 2 + 1))
+
+        # failures in any stage stop the pipeline and raise in the calling thread
+        def fail(x):
+            if x == 7:
+                raise BaseException('stage failure')
+            return x
+
+        with self.assertRaises(BaseException):
+            run_pipeline(range(1000), [Stage('read', lambda x: x, 2), Stage('convert', fail, 2), Stage('write', last)])
+
+        # pipelined command line conversion matches the sequential one
+        src = os.path.join(self.dat_path, 'pipe')
+        os.makedirs(src, exist_ok=True)
+        for i in range(6):
+            imageio.imwrite(os.path.join(src, 'img%s.png' % i), np.roll(self.ref_img[:48, :48], 8*i, axis=0))
+        sys.argv = sys.argv[:1] + ['-s', src, '-m', 'hsv', '--workers=3,2,3', '--queue=1,1,2', '--force']
+        self.assertEqual(True, main())
+        for i in range(6):
+            sys.argv = sys.argv[:1] + ['-s', os.path.join(src, 'img%s.png' % i), '-m', 'hsv', '--workers=1,1,1']
+            ret = imageio.imread(os.path.join(src, 'img%s_hsv.png' % i))
+            self.assertEqual(True, main())
+            self.assertEqual(True, np.array_equal(ret, imageio.imread(os.path.join(src, 'img%s_hsv.png' % i))))
+
+        return True
+
+    def test_server(self):
+        """ validate health, metrics and conversion endpoints of the server over TCP and unix sockets """
+
+        from color_space_converter.bin.server import create_server
+        from color_space_converter.top_level import convert
+        import http.client, io, json, socket, threading
+
+        class UnixConnection(http.client.HTTPConnection):
+            def connect(self):
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(self.host)
+
+        fp = os.path.join(self.dat_path, 'serve.png')
+        imageio.imwrite(fp, self.ref_img[:32, :32])
+        sock_path = os.path.join(self.dat_path, 'serve.sock')
+        for address in [('127.0.0.1', 0), sock_path]:
+            server = create_server(address, limit=1, timeout=0, root=self.dat_path, max_bytes=2**20)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+            def request(method, url, body=None, headers=None):
+                con = UnixConnection(sock_path) if isinstance(address, str) else \
+                    http.client.HTTPConnection(*server.server_address[:2])
+                con.request(method, url, body, headers or {'Content-Type': 'application/json'})
+                res = con.getresponse()
+                ret = res.status, res.read()
+                con.close()
+                return ret
+
+            try:
+                self.assertEqual(200, request('GET', '/health')[0])
+
+                # file jobs write outputs as done by the command line interface
+                code, body = request('POST', '/convert', json.dumps({'src': fp, 'method': 'lab', 'format': 'npy'}))
+                self.assertEqual((200, os.path.join(self.dat_path, 'serve_lab.npy')), (code, json.loads(body)['dst']))
+                self.assertEqual(True, np.allclose(np.load(json.loads(body)['dst']), convert(self.ref_img[:32, :32],
+                                                                                            method='lab')))
+
+                # npy payloads return the float result
+                buf = io.BytesIO()
+                np.save(buf, self.ref_img[:8, :8])
+                code, body = request('POST', '/convert?method=hsv&range=0,255', buf.getvalue(),
+                                     {'Content-Type': 'application/octet-stream'})
+                ref = convert(self.ref_img[:8, :8], method='hsv', input_range=(0, 255))
+                self.assertEqual((200, True), (code, np.allclose(np.load(io.BytesIO(body)), ref)))
+
+                # invalid jobs and jobs beyond the concurrency limit are rejected
+                self.assertEqual(400, request('POST', '/convert', json.dumps({'src': fp, 'method': 'xyz123'}))[0])
+                server.metrics.acquire()
+                self.assertEqual(503, request('POST', '/convert', json.dumps({'src': fp}))[0])
+                server.metrics.release()
+                # the manually held slot counts as a job
+                metrics = json.loads(request('GET', '/metrics')[1])
+                self.assertEqual((3, 1, 1, 0), tuple(metrics[k] - (k == 'jobs') for k in
+                                                     ['jobs', 'failed', 'rejected', 'active']))
+
+                # paths outside of the root directory and oversized bodies are refused
+                for params in [{'src': os.path.join(self.dat_path, '..', 'unit_test.py')}, {'src': '../unit_test.py'},
+                               {'src': fp, 'dst': os.path.join(self.dat_path, '..', 'serve_lab.npy')}]:
+                    self.assertEqual(403, request('POST', '/convert', json.dumps(params))[0])
+                self.assertEqual(413, request('POST', '/convert', b'{}', {'Content-Length': str(2**20 + 1)})[0])
+                self.assertEqual(400, request('POST', '/convert', b'', {'Content-Length': '-1'})[0])
+
+                # simple requests any web page may send and settings of wrong types are refused
+                self.assertEqual(415, request('POST', '/convert', json.dumps({'src': fp}),
+                                              {'Content-Type': 'text/plain'})[0])
+                for params in [{'inverse': 'false'}, {'depth': True}, {'range': '0,255'}, {'method': 1}]:
+                    self.assertEqual(400, request('POST', '/convert', json.dumps(dict(params, src=fp)))[0])
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        # hosts other than loopback need to be allowed explicitly
+        self.assertRaises(BaseException, create_server, ('0.0.0.0', 0))
+
+        return True
+
+    def test_server_shared(self):
+        """ validate that shared memory jobs leave the client's block intact after the server exited """
+
+        from color_space_converter.top_level import convert
+        from multiprocessing import shared_memory
+        import http.client, io, json, socket, subprocess, time
+
+        class UnixConnection(http.client.HTTPConnection):
+            def connect(self):
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(self.host)
+
+        # serve from a separate process whose resource tracker would unlink tracked blocks on exit
+        sock_path = os.path.join(self.dat_path, 'serve_shm.sock')
+        cmd = 'import sys; from color_space_converter.bin.server import create_server; ' \
+              'create_server(sys.argv[1]).serve_forever()'
+        if os.path.exists(sock_path):
+            os.remove(sock_path)
+        proc = subprocess.Popen([sys.executable, '-c', cmd, sock_path], cwd=os.path.dirname(self.dir_path))
+        img = self.ref_img[:16, :16]
+        shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+        try:
+            np.ndarray(img.shape, img.dtype, buffer=shm.buf)[...] = img
+            for _ in range(100):
+                if os.path.exists(sock_path):
+                    break
+                time.sleep(.1)
+
+            con = UnixConnection(sock_path)
+            con.request('POST', '/convert', json.dumps({'shm': shm.name, 'shape': img.shape, 'dtype': img.dtype.str,
+                                                        'method': 'hsv', 'range': [0, 255]}),
+                        {'Content-Type': 'application/json'})
+            res = con.getresponse()
+            self.assertEqual(200, res.status)
+            ret = np.load(io.BytesIO(res.read()))
+            con.close()
+            self.assertEqual(True, np.allclose(ret, convert(img, method='hsv', input_range=(0, 255))))
+
+            # the block remains attachable once the server and its resource tracker are gone
+            proc.terminate()
+            proc.wait()
+            time.sleep(.5)
+            shared_memory.SharedMemory(name=shm.name).close()
+        finally:
+            proc.kill()
+            proc.wait()
+            shm.close()
+            shm.unlink()
+            if os.path.exists(sock_path):
+                os.remove(sock_path)
+
+        return True
+
+    @data(*METHODS)
+    def test_cli_indexed(self, method):
+        """ validate that paletted images are converted in indexed form matching the dense conversion """
+
+        from color_space_converter.bin.cli import main
+        from PIL import Image
+
+        # save paletted image
+        fp = os.path.join(self.dat_path, 'chelsea_indexed.png')
+        Image.fromarray(self.ref_img).quantize(64).save(fp)
+
+        # run cli command
+        sys.argv = sys.argv[:1] + ['-s', fp, '-m', method]
+        ret = main()
+
+        # compare with dense conversion
+        res = Image.open(os.path.join(self.dat_path, 'chelsea_indexed_' + method + '.png'))
+        ref = encode_img(ColorSpaceConverter(imageio.imread(fp), method=method).main())
+
+        # assertion
+        self.assertEqual(True, ret)
+        self.assertEqual('P', res.mode)
+        self.assertEqual(True, np.array_equal(np.asarray(res.convert('RGB')), ref * np.ones(3, dtype=ref.dtype)))
+
+        return True
+
+    @idata(([m, ref] for m, ref in [['gry', 16971], ['hsi', None], ['hsl', None], ['hsv', None], ['ictcp', 2000],
+                                   ['jzazbz', 2600], ['lab', 515], ['lch', 515], ['lms', 2000], ['luv', 515],
+                                   ['oklab', 2900], ['oklch', 2900], ['xyz', 583], ['yuv', None], ['wrong_arg', 0]]))
     @unpack
     def test_match_method_imageio(self, method=None, ref_val=0):
-        """ compare original images with forward and backward processed images while providing output files """
+        """ compare original images with forward and backward processed images while providing output files where
+        methods without reference histogram distance are expected to reproduce the original image """
 
         try:
             # convert to corresponding color space
             img_conv = ColorSpaceConverter(self.ref_img.copy(), method=method).main()
 
-            # convert back to RGB space
-            img_inv = ColorSpaceConverter(img_conv, method=method, inverse=True).main()
+            # convert back to RGB space where 'hsl' saturation refers to the 8-bit white
+            img_inv = ColorSpaceConverter(img_conv, method=method, inverse=True).main(white=255)
 
         # catch unsupported methods
         except BaseException as e:
@@ -108,7 +612,10 @@ class ColorSpaceConverterTester(unittest.TestCase):
         print('Avg. histogram distance for %s is %s' % (method, round(dist_val, 3)))
 
         # assertion
-        self.assertEqual(True, ref_val >= dist_val)
+        if ref_val is None:
+            self.assertEqual(True, np.allclose(self.ref_img, img_inv))
+        else:
+            self.assertEqual(True, ref_val >= dist_val)
 
         # save color space result
         fp = os.path.join(self.dat_path, self.fn_img.split('.')[0] + '_' + method + '.png')
@@ -152,6 +659,527 @@ class ColorSpaceConverterTester(unittest.TestCase):
 
         return True
 
+    @idata([[{'standard': 'ITU'}, False], [{'norm': True}, False], [{'standard': 'ITU'}, True], [{'norm': True}, True]])
+    @unpack
+    def test_legacy_xyz_options(self, opts, inverse):
+        """ validate that xyz options of the legacy class API reach the converter """
+
+        img = self.ref_img.astype('float')
+
+        # compare instance method with procedural counterpart
+        res_obj = ColorSpaceConverter().xyz_conv(img.copy(), inverse=inverse, **opts)
+        res_prd = xyz_conv(img.copy(), inverse=inverse, **opts)
+        res_def = xyz_conv(img.copy(), inverse=inverse)
+
+        # assertion
+        self.assertEqual(True, np.allclose(res_obj, res_prd))
+        self.assertEqual(False, np.allclose(res_obj, res_def))
+
+        return True
+
+    @data(rgb2hsv, hsv2rgb, rgb2lab, lab2rgb, rgb2lms, lms2rgb, rgb2xyz, xyz2rgb)
+    def test_unique_colors(self, fun):
+        """ validate that converting unique colors only yields the same result as the dense conversion """
+
+        # posterize image to few distinct colors
+        img = (self.ref_img // 64 * 64).astype('float')
+
+        # compare dense and unique color conversions
+        res_dense = fun(img.copy())
+        res_uniq = fun(img.copy(), unique=True)
+
+        # assertion
+        self.assertEqual(True, np.allclose(res_dense, res_uniq))
+        self.assertEqual(True, low_cardinality(np.repeat(img, 2, axis=0)))
+        self.assertEqual(False, low_cardinality(np.random.rand(*img.shape)))
+
+        return True
+
+    def test_unique_colors_reuse(self):
+        """ validate that the reused lookup tables do not leak colors or indices between calls """
+
+        for img in (self.ref_img // 64 * 64, self.ref_img[::2, ::2] // 32 * 32, self.ref_img[:1, :1]):
+            colors, inverse = unique_colors(img)
+            ref_colors, ref_inverse = np.unique(img.reshape(-1, 3), axis=0, return_inverse=True)
+            self.assertEqual(True, np.array_equal(colors, ref_colors))
+            self.assertEqual(True, np.array_equal(inverse, ref_inverse.ravel()))
+
+        # failures while borrowing leave no stale presence flags and concurrent threads keep the pool bounded
+        from color_space_converter.unique_colors import lookup_tables, _POOL, POOL_SIZE
+        from multiprocessing.pool import ThreadPool
+        with self.assertRaises(IndexError):
+            with lookup_tables(2**24) as (present, table):
+                present[self.ref_img.reshape(-1)] = True
+                raise IndexError
+        self.assertEqual(True, all(not np.any(tables[0]) for tables in _POOL))
+        img = self.ref_img // 64 * 64
+        with ThreadPool(4) as pool:
+            res = pool.map(unique_colors, [img] * 8)
+        ref_colors = np.unique(img.reshape(-1, 3), axis=0)
+        self.assertEqual(True, all(np.array_equal(colors, ref_colors) for colors, _ in res))
+        self.assertEqual(True, len(_POOL) <= POOL_SIZE and all(not np.any(tables[0]) for tables in _POOL))
+
+        return True
+
+    @idata([[[50.0000, 2.6772, -79.7751], [50.0000, 0.0000, -82.7485], 2.0425],
+            [[50.0000, 0.0000, 0.0000], [50.0000, -1.0000, 2.0000], 2.3669],
+            [[50.0000, 2.4900, -0.0010], [50.0000, -2.4900, 0.0011], 7.2195],
+            [[50.0000, -0.0010, 2.4900], [50.0000, 0.0009, -2.4900], 4.8045],
+            [[22.7233, 20.0904, -46.6940], [23.0331, 14.9730, -42.5619], 2.0373],
+            [[2.0776, 0.0795, -1.1350], [0.9033, -0.0636, -0.5514], 0.9082]])
+    @unpack
+    def test_delta_e2000(self, lab1, lab2, ref_val):
+        """ validate CIEDE2000 against test data from Sharma et al. """
+
+        dist_val = delta_e(np.array(lab1), np.array(lab2), method='2000')
+
+        # assertion
+        self.assertAlmostEqual(ref_val, dist_val, places=4)
+
+        return True
+
+    def test_delta_e_palette_flag(self):
+        """ validate that color vectors are compared pairwise unless the palette flag is set """
+
+        lab1 = np.random.rand(4, 3) * 50
+        lab2 = np.random.rand(4, 3) * 50
+
+        res_pair = delta_e(lab1, lab2, method='76')
+        res_pal = delta_e(lab1, lab2, method='76', palette=True)
+
+        # assertion
+        self.assertEqual(res_pair.shape, (4,))
+        self.assertEqual(res_pal.shape, (4, 4))
+        self.assertEqual(True, np.allclose(np.diagonal(res_pal), res_pair))
+
+        return True
+
+    @data('76', '94', '2000')
+    def test_nearest_color(self, method):
+        """ validate that nearest palette colors match the minimum of the full distance matrix """
+
+        # choose palette from image colors
+        img = self.ref_img[::4, ::4].astype('float')
+        pal = np.random.rand(16, 3) * 255
+
+        # compute nearest colors and full distance matrix
+        idx, dst = nearest_color(img, pal, method=method, space='rgb', chunk_size=2**10, input_range=(0, 255))
+        mat = delta_e(img, pal, method=method, space='rgb', chunk_size=2**10, palette=True, input_range=(0, 255))
+
+        # assertion
+        self.assertEqual(mat.shape, img.shape[:-1] + (16,))
+        self.assertEqual(True, np.array_equal(np.argmin(mat, axis=-1), idx))
+        self.assertEqual(True, np.allclose(np.min(mat, axis=-1), dst))
+
+        # RGB differences of a pixel pair neither depend on other pixels nor on the chunk size
+        ref = delta_e(rgb2lab(self.ref_img, input_range='dtype'), rgb2lab(self.ref_img[::-1], input_range='dtype'),
+                      method=method)
+        res = delta_e(self.ref_img, self.ref_img[::-1], method=method, space='rgb', chunk_size=999)
+        self.assertEqual(True, np.allclose(res, ref))
+        self.assertEqual(True, np.allclose(delta_e(self.ref_img[:1, :1], self.ref_img[-1:, :1], method=method,
+                                                   space='rgb'), ref[:1, :1]))
+
+        return True
+
+    @idata([[rgb2lab, 16], [rgb2lab, 300], [rgb2yuv, 64]])
+    @unpack
+    def test_quantizer(self, fun, num):
+        """ validate that grid index quantization finds the nearest palette colors """
+
+        # palette from random colors in the same space as the image
+        img = fun(self.ref_img.astype('float'))
+        pal = fun(np.random.randint(0, 2**8, (num, 1, 3)).astype('float')).reshape(-1, 3)
+        quantizer = ColorQuantizer(pal, grid=16)
+
+        # compare exact and approximate results with brute force search
+        ref = nearest_brute(img.reshape(-1, 3), pal)[1]
+        res_exact = quantizer.query(img.reshape(-1, 3), exact=True)[1]
+        res_approx = quantizer.query(img.reshape(-1, 3), exact=False)[1]
+        idx = quantizer.quantize(img, index=True)
+
+        # assertion
+        self.assertEqual(True, np.allclose(ref, res_exact))
+        self.assertEqual(True, np.all(ref <= res_approx + 1e-9))
+        self.assertEqual(img.shape[:-1], idx.shape)
+        self.assertEqual(True, np.array_equal(quantizer.quantize(img), pal[idx]))
+
+        return True
+
+    @idata(([m, inv] for m in METHODS for inv in (False, True)))
+    @unpack
+    def test_roi_converter(self, method, inverse):
+        """ validate that reconverting dirty regions matches the conversion of the entire frame """
+
+        obj = RoiConverter(method=method, inverse=inverse, tile_size=32)
+        frame = self.ref_img.astype('float') * .5
+        obj.update(frame)
+
+        # change rectangle and scattered pixels
+        frame[10:40, 20:90] = frame[10:40, 20:90][::-1]
+        mask = np.zeros(frame.shape[:2], dtype=bool)
+        mask[100:200:3, 5:140:7] = True
+        frame[mask] = frame[mask][::-1]
+        res = obj.update(frame, rects=[(20, 10, 70, 30)], mask=mask).copy()
+        ref = ColorSpaceConverter(frame.copy(), method=method, inverse=inverse).main()
+
+        # raise frame maximum
+        frame[:5, :5] = 255
+        res_max = obj.update(frame, rects=[(0, 0, 5, 5)])
+        ref_max = ColorSpaceConverter(frame.copy(), method=method, inverse=inverse).main()
+
+        # assertion
+        self.assertEqual(True, np.allclose(ref, res))
+        self.assertEqual(True, np.allclose(ref_max, res_max))
+
+        return True
+
+    @idata(([m, rng] for m in ('lab', 'lms', 'xyz') for rng in ((0, 255), 'dtype')))
+    @unpack
+    def test_input_range(self, method, input_range):
+        """ validate that a fixed input range makes conversions independent of image content """
+
+        # convert image as a whole and in tiles
+        res = ColorSpaceConverter(self.ref_img, method=method, input_range=input_range).main()
+        tiles = [ColorSpaceConverter(self.ref_img[i:i+64], method=method, input_range=input_range).main()
+                 for i in range(0, self.ref_img.shape[0], 64)]
+
+        # convert darkened image
+        res_dark = ColorSpaceConverter(self.ref_img // 2 * 2, method=method, input_range=input_range).main()
+        ref_dark = ColorSpaceConverter(self.ref_img // 2 * 2, method=method, input_range=(0, 255)).main()
+
+        # assertion
+        self.assertEqual(True, np.allclose(res, np.concatenate(tiles)))
+        self.assertEqual(True, np.allclose(res_dark, ref_dark))
+
+        return True
+
+    @data(*METHODS)
+    def test_buffer_input(self, method):
+        """ validate conversion of raw buffers, images and views without copying """
+
+        from PIL import Image
+
+        ref = ColorSpaceConverter(self.ref_img, method=method).main()
+
+        # raw bytes with layout and read-only buffer
+        buf = self.ref_img.tobytes()
+        layout = BufferLayout(self.ref_img.shape, self.ref_img.dtype)
+        arr = as_array(buf, layout)
+        res_buf = ColorSpaceConverter(buf, method=method, layout=layout).main()
+
+        # strided view on a padded buffer with byte offset
+        pad = np.zeros(self.ref_img.shape[:2] + (4,), dtype=self.ref_img.dtype)
+        pad[..., 1:] = self.ref_img
+        layout = BufferLayout(self.ref_img.shape, pad.dtype, pad.strides, pad.itemsize)
+        res_pad = ColorSpaceConverter(bytearray(pad.tobytes()), method=method, layout=layout).main()
+
+        # image exposing the array interface
+        res_pil = ColorSpaceConverter(Image.fromarray(self.ref_img), method=method).main()
+
+        # assertion
+        self.assertEqual(True, np.shares_memory(arr, np.frombuffer(buf, dtype=arr.dtype)))
+        self.assertEqual(False, arr.flags.writeable)
+        self.assertEqual(True, np.allclose(ref, res_buf))
+        self.assertEqual(True, np.allclose(ref, res_pad))
+        self.assertEqual(True, np.allclose(ref, res_pil))
+        self.assertRaises(BaseException, as_array, buf)
+
+        return True
+
+    def test_registry(self):
+        """ validate dispatch of built-in and third-party color spaces through the registry """
+
+        # register inverted RGB as third-party color space
+        conv = register('inv', lambda rgb: 255 - rgb, lambda arr: 255 - arr)
+
+        try:
+            res = ColorSpaceConverter(self.ref_img, method='inv').main()
+            res_leg = ColorSpaceConverter(self.ref_img).inv_conv()
+            res_inv = get_converter('inv')(res, inverse=True)
+            self.assertEqual(True, 'inv' in METHODS and METHODS == sorted(METHODS))
+        finally:
+            unregister('inv')
+
+        # built-in converter objects are stateless and match the legacy class API
+        ref = ColorSpaceConverter(self.ref_img, method='yuv', standard='SDTV').main()
+        res_yuv = get_converter('yuv')(self.ref_img, standard='SDTV')
+
+        # assertion
+        self.assertEqual(True, np.array_equal(res, 255 - self.ref_img) and np.array_equal(res, res_leg))
+        self.assertEqual(True, np.array_equal(res_inv, self.ref_img))
+        self.assertEqual(True, np.allclose(ref, res_yuv))
+        self.assertEqual(False, hasattr(conv, '__dict__'))
+        self.assertEqual(False, 'inv' in METHODS)
+        self.assertRaises(BaseException, get_converter, 'inv')
+
+        return True
+
+    def test_thread_safety(self):
+        """ validate that a single converter instance serves concurrent threads with varying per-call options """
+
+        from multiprocessing.pool import ThreadPool
+
+        # shared instance and varying per-call options
+        obj = ColorSpaceConverter(self.ref_img, method='lab')
+        imgs = [self.ref_img, self.ref_img // 2, self.ref_img[::2, ::2], np.ascontiguousarray(self.ref_img[..., ::-1])]
+        jobs = [(i, m, inv) for i in range(len(imgs)) for m in METHODS for inv in (False, True)] * 4
+        refs = {(i, m, inv): convert(imgs[i].copy(), method=m, inverse=inv) for i, m, inv in set(jobs)}
+
+        def job(args):
+            i, m, inv = args
+            return args, obj.main(imgs[i], method=m, inverse=inv), getattr(obj, m + '_conv')(imgs[i], inverse=inv)
+
+        with ThreadPool(8) as pool:
+            res = pool.map(job, jobs, chunksize=1)
+
+        # assertion
+        self.assertEqual(True, all(np.allclose(refs[k], a) and np.allclose(refs[k], b) for k, a, b in res))
+        self.assertEqual(True, np.allclose(obj.main(), convert(self.ref_img, method='lab')))
+        self.assertEqual(True, all(np.array_equal(img, self.ref_img[..., ::-1]) for img in imgs[3:]))
+
+        return True
+
+    def test_hsl_hsi(self):
+        """ validate HSL and HSI against reference implementations sharing the HSV hue """
+
+        import colorsys
+
+        rgb = np.random.default_rng(seed=0).integers(0, 2**8, (64, 64, 3))
+        rgb[:8] = rgb[:8, :, :1]
+        ref_hsv = np.array([colorsys.rgb_to_hsv(*px) for px in rgb.reshape(-1, 3) / 255.]).reshape(rgb.shape)
+        ref_hls = np.array([colorsys.rgb_to_hls(*px) for px in rgb.reshape(-1, 3) / 255.]).reshape(rgb.shape)
+
+        hsv = rgb2hsv(rgb)
+        hsl = rgb2hsl(rgb, white=255)
+        hsi = rgb2hsi(rgb)
+
+        # assertion
+        self.assertEqual(True, np.allclose(hsv, ref_hsv * [360, 1, 255]))
+        self.assertEqual(True, np.allclose(hsl[..., 0], hsv[..., 0]) and np.allclose(hsi[..., 0], hsv[..., 0]))
+        self.assertEqual(True, np.allclose(hsl[..., 1:], ref_hls[..., 2:0:-1] * [1, 255]))
+        self.assertEqual(True, np.allclose(hsi[..., 2], np.mean(rgb, axis=-1)))
+        self.assertEqual(True, np.allclose(hsv2rgb(hsv), rgb) and np.allclose(hsi2rgb(hsi), rgb))
+        self.assertEqual(True, np.allclose(hsl2rgb(hsl, white=255), rgb))
+        self.assertEqual(True, np.allclose(rgb2hsl(rgb)[..., 2], hsl[..., 2]))
+
+        # saturation of integer input refers to the white of its type or of a given input range
+        img = np.array([[[200, 100, 100], [255, 0, 0], [10, 20, 30]]], dtype='uint8')
+        ref = np.array([colorsys.rgb_to_hls(*px) for px in img[0] / 255.])[np.newaxis, :, 2:0:-1] * [1, 255]
+        self.assertEqual(True, np.allclose(convert(img, method='hsl')[..., 1:], ref))
+        self.assertEqual(True, np.allclose(convert(img.astype('float'), method='hsl', input_range=(0, 255))[..., 1:],
+                                           ref))
+        self.assertEqual(True, np.allclose(convert_many(img, methods=['hsl'])['hsl'][..., 1:], ref))
+        self.assertEqual(True, np.allclose(ColorSpaceConverter(img, method='hsl').main()[..., 1:], ref))
+        lo, hi = fixed_range('hsl', white=255)
+        self.assertEqual(True, np.allclose([lo[1:], hi[1:]], [[0, 0], [1, 255]], atol=1e-6))
+
+        # round trips through the registry preserve the input scale
+        for method in ('hsi', 'hsl', 'hsv'):
+            res = convert(convert(self.ref_img, method=method), method=method, inverse=True, white=255)
+            self.assertEqual(True, np.allclose(res, self.ref_img))
+
+        return True
+
+    def test_perceptual_spaces(self):
+        """ validate Oklab, CIELUV, LCh, ICtCp and Jzazbz against published values and round trips """
+
+        # reference values from Ottosson (Oklab red), Safdar et al. (Jzazbz) and ST 2084 (PQ of 100 cd/m^2)
+        self.assertEqual(True, np.allclose(lin2oklab(np.array([1., 0, 0])), [.627955, .224863, .125846], atol=1e-6))
+        self.assertEqual(True, np.allclose(xyz2jzazbz(np.array([.20654008, .12197225, .05136952])),
+                                           [.00535048, .00924302, .00526007], atol=1e-8))
+        self.assertEqual(True, np.allclose(lin2ictcp(np.ones(3), primaries='BT.2020'), [.508078, 0, 0], atol=1e-6))
+        self.assertEqual(True, np.allclose(rgb2luv(np.full((1, 1, 3), 255)), [100, 0, 0], atol=.05))
+
+        # polar coordinates
+        lab = get_converter('lab')(self.ref_img)
+        lch = get_converter('lch')(self.ref_img)
+        self.assertEqual(True, np.allclose(lch, lab2lch(lab)))
+        self.assertEqual(True, np.allclose(lch[..., 1], np.hypot(lab[..., 1], lab[..., 2])))
+
+        # shared linear intermediate and round trips
+        lin = rgb2lin(self.ref_img, input_range=(0, 255))
+        self.assertEqual(True, np.allclose(get_converter('oklab')(self.ref_img, input_range=(0, 255)), lin2oklab(lin)))
+        self.assertEqual(True, np.allclose(get_converter('jzazbz')(self.ref_img, input_range=(0, 255)),
+                                           xyz2jzazbz(lin2xyz(lin))))
+        for method in ('ictcp', 'jzazbz', 'lch', 'luv', 'oklab', 'oklch'):
+            conv = get_converter(method)
+            res = conv(conv(self.ref_img, input_range=(0, 255)), inverse=True)
+            res_32 = conv(conv(np.float32(self.ref_img / 255.), input_range=(0, 1)), inverse=True)
+            self.assertEqual(True, np.allclose(res * 255, self.ref_img, atol=1e-6))
+            self.assertEqual(True, np.allclose(res_32 * 255, self.ref_img, atol=.05))
+
+        return True
+
+    def test_color_model(self):
+        """ validate configurable primaries, white points and chromatic adaptation """
+
+        srgb, d50 = ColorModel(), ColorModel(reference='D50')
+        rgb = self.ref_img / 255.
+
+        # white maps to reference white and is preserved across gamuts
+        self.assertEqual(True, np.allclose(srgb.xyz_matrix.sum(axis=1), [.950456, 1, 1.089058], atol=1e-6))
+        self.assertEqual(True, np.allclose(d50.lin2xyz(np.ones(3)), d50.white_xyz))
+        self.assertEqual(True, np.allclose(srgb.convert(np.ones(3), ColorModel('Display P3'), input_range=(0, 1)), 1))
+        self.assertEqual(True, np.allclose(adaptation_matrix('D65', 'D50', 'Bradford'),
+                                           [[1.0478543, .0229054, -.0501651], [.0295670, .9904796, -.0170622],
+                                            [-.0092414, .0150547, .7519501]], atol=1e-6))
+
+        # model defaults agree with built-in Lab conversion and custom models with differing whites round trip
+        self.assertEqual(True, np.allclose(srgb.rgb2lab(rgb, input_range=(0, 1)), rgb2lab(rgb, input_range=(0, 1)),
+                                           atol=.05))
+        cust = ColorModel([[.68, .32], [.265, .69], [.15, .06]], white='D65', transfer=2.2, adaptation='CAT02',
+                          reference='D50')
+        self.assertEqual(True, np.allclose(cust.lab2rgb(cust.rgb2lab(rgb, input_range=(0, 1))), rgb))
+        self.assertEqual(True, np.allclose(cust.xyz2rgb(d50.rgb2xyz(rgb, input_range=(0, 1))),
+                                           d50.convert(rgb, cust, input_range=(0, 1))))
+
+        # derived matrices are memoized per model
+        self.assertEqual(True, cust.xyz_matrix is ColorModel(((.68, .32), (.265, .69), (.15, .06)), 'D65', 2.2, 'CAT02',
+                                                             'D50').xyz_matrix)
+        self.assertRaises(BaseException, ColorModel, 'unknown')
+        self.assertEqual(True, cust.xyz_matrix is get_matrix(model_matrix(cust)))
+
+        return True
+
+    @data('xyz', 'lab', 'lms', 'luv', 'lch', 'jzazbz')
+    def test_color_model_converters(self, method):
+        """ validate that xyz-based converters accept color models for other primaries and white points """
+
+        rgb = np.random.default_rng(seed=0).random((16, 16, 3))
+        p3_d50 = ColorModel('Display P3', reference='D50')
+
+        res = convert(rgb, method=method, input_range=(0, 1), model=p3_d50)
+        ref = convert(rgb, method=method, input_range=(0, 1))
+
+        # assertion
+        self.assertEqual(False, np.allclose(res, ref))
+        self.assertEqual(True, np.allclose(convert(res, method=method, inverse=True, model=p3_d50), rgb))
+        if method == 'lab':
+            self.assertEqual(True, np.allclose(res, p3_d50.rgb2lab(rgb, input_range=(0, 1))))
+        if method == 'xyz':
+            self.assertEqual(True, np.allclose(res, p3_d50.rgb2xyz(rgb, input_range=(0, 1))))
+
+        return True
+
+    @data('sRGB', 'PQ', 'HLG', 'linear', 2.2)
+    def test_transfer_below_range(self, transfer):
+        """ validate that codes below the lower input bound are decoded without invalid values or warnings """
+
+        import warnings
+
+        img = np.arange(2**8, dtype='uint8').reshape(16, 16, 1).repeat(3, axis=-1)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            lin = rgb2lin(img, input_range=(16, 235), transfer=transfer)
+            lin_flt = rgb2lin(img.astype('float'), input_range=(16, 235), transfer=transfer)
+
+        # assertion
+        self.assertEqual(True, np.all(np.isfinite(lin)) and np.allclose(lin, lin_flt))
+
+        return True
+
+    @data('sRGB', 'PQ', 'HLG', 'linear', 2.2)
+    def test_transfer_functions(self, transfer):
+        """ validate transfer functions and lookup table decoding of integer inputs against the kernels """
+
+        # reference values from ST 2084 (PQ) and BT.2100 (HLG)
+        self.assertEqual(True, np.allclose(pq_decode(np.array([.5, 1])) * 1e4, [92.245709, 1e4]))
+        self.assertEqual(True, np.allclose(hlg_encode(np.array([0, 1 / 12., 1])), [0, .5, 1]))
+        self.assertEqual(True, np.allclose(hlg_decode(hlg_encode(np.linspace(0, 1, 101))), np.linspace(0, 1, 101)))
+
+        # 10-bit codes stored as 16-bit integers, in double and in half precision
+        img = np.random.default_rng(seed=0).integers(0, 2**10, (16, 16, 3)).astype('uint16')
+        lin = rgb2lin(img, input_range=(0, 1023), transfer=transfer)
+        lin_16 = rgb2lin((img / 1023.).astype('float16'), input_range=(0, 1), transfer=transfer)
+        self.assertEqual(True, lin_16.dtype == np.float32 and np.allclose(lin_16, lin, rtol=1e-2, atol=1e-3))
+        for method in ('xyz', 'lab', 'lms', 'luv', 'lch', 'jzazbz'):
+            conv = get_converter(method)
+            res = conv(img, input_range=(0, 1023), transfer=transfer)
+            ref = conv(img.astype('float'), input_range=(0, 1023), transfer=transfer)
+            self.assertEqual(True, np.allclose(res, ref))
+            self.assertEqual(True, np.allclose(conv(res, inverse=True, transfer=transfer) * 1023, img, atol=1e-2))
+
+        return True
+
+    @data('clip', 'soft', 'chroma')
+    def test_gamut(self, method):
+        """ validate gamut handling and quantization fused into inverse conversions """
+
+        # saturated Lab colors outside of the sRGB gamut next to colors within
+        lab = np.array([[[50, 120, 0], [60, -90, 80], [95, 0, 110], [50, 10, 10]]], dtype='float')
+        res = convert(lab, method='lab', inverse=True, gamut=method)
+        self.assertEqual(True, res.min() >= 0 and res.max() <= 1)
+        self.assertEqual(True, np.allclose(res[0, -1], lab2rgb(lab)[0, -1], atol=1e-6))
+        if method == 'chroma':
+            lch = lab2lch(rgb2lab(res, input_range=(0, 1)))
+            self.assertEqual(True, np.allclose(lch[..., 0], lab[..., 0], atol=.5))
+            self.assertEqual(True, np.allclose(lch[0, :2, 2], lab2lch(lab)[0, :2, 2], atol=3))
+
+        # quantization of round trips where yuv preserves the input scale
+        rgb = self.ref_img
+        res_8 = convert(convert(rgb, method='lab', input_range='dtype'), 'lab', inverse=True, gamut=method, dtype='uint8')
+        res_16 = convert(convert(rgb, method='yuv'), 'yuv', inverse=True, gamut=method, dtype='uint16', white=255)
+        self.assertEqual(True, res_8.dtype == np.uint8 and np.allclose(res_8, rgb, atol=1))
+        self.assertEqual(True, res_16.dtype == np.uint16 and np.allclose(res_16 / 257., rgb, atol=1))
+
+        # chroma reduction searches with the transfer function of the conversion
+        res_pq = get_converter('lab')(lab, inverse=True, transfer='PQ', gamut=method)
+        opts = {'transfer': 'PQ'} if method == 'chroma' else {}
+        ref_pq = map_gamut(lab2rgb(lab, transfer='PQ'), method=method, **opts)
+        self.assertEqual(True, np.allclose(res_pq, ref_pq))
+
+        # white is preserved
+        white = rgb2lab(np.ones((1, 1, 3)), input_range=(0, 1))
+        white = convert(white, 'lab', inverse=True, gamut=method, dtype='uint8')
+        self.assertEqual(True, np.all(white == 255))
+
+        # inputs are left untouched
+        arr = np.array([[[-.5, .5, 1.5]]])
+        self.assertEqual(True, map_gamut(arr, method=method, dtype='uint8').max() <= 255 and arr[0, 0, 2] == 1.5)
+
+        return True
+
+    @data(None, (0, 255), 'dtype')
+    def test_convert_many(self, input_range):
+        """ validate that multi-output conversion in tiles matches independent conversions """
+
+        # register third-party color space without stage
+        register('inv', lambda rgb: 255 - rgb, lambda arr: 255 - arr)
+
+        try:
+            res = convert_many(self.ref_img, input_range=input_range, tile_size=5000)
+            res_all = convert_many(self.ref_img, methods=['lab', 'hsv'], input_range=input_range, tile_size=2**24)
+        finally:
+            unregister('inv')
+
+        # assertion
+        self.assertEqual(True, set(res.keys()) == set(METHODS + ['inv']))
+        for method in METHODS:
+            ref = convert(self.ref_img, method=method, input_range=input_range)
+            self.assertEqual(True, np.allclose(ref, res[method]))
+        self.assertEqual(True, np.array_equal(res['inv'], 255 - self.ref_img))
+        self.assertEqual(True, np.allclose(res['lab'], res_all['lab']) and np.allclose(res['hsv'], res_all['hsv']))
+
+        return True
+
+    def test_convert_many_override(self):
+        """ validate that re-registered built-in spaces take precedence over the shared stages """
+
+        conv = get_converter('lab')
+        register('lab', lambda rgb, **kw: -rgb2lab(rgb, **kw), conv.backward, conv.fwd_opts, conv.inv_opts)
+
+        try:
+            res = convert_many(self.ref_img, methods=['lab', 'lch'])
+        finally:
+            register('lab', conv.forward, conv.backward, conv.fwd_opts, conv.inv_opts)
+
+        # assertion
+        self.assertEqual(True, np.allclose(res['lab'], -rgb2lab(self.ref_img)))
+        self.assertEqual(True, np.allclose(res['lch'], convert(self.ref_img, method='lch')))
+
+        return True
+
 
 if __name__ == '__main__':
     unittest.main()